@@ -0,0 +1,72 @@
+from django.contrib import admin
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from polaris.admin import TransactionAdmin as PolarisTransactionAdmin
+from polaris.models import Transaction
+
+from .integrations.export import csv_chunks, transaction_rows
+from .models import ArchivedTransaction, HotWalletTopUp, Job, PayoutEnvelope
+
+
+@admin.action(description="Download selected transactions as CSV")
+def export_csv(modeladmin, request, queryset):
+    # With "select all", queryset is the whole filtered changelist; it is
+    # streamed in chunks rather than loaded.
+    response = StreamingHttpResponse(csv_chunks(transaction_rows(queryset, 2000)), content_type="text/csv")
+    filename = f"transactions-{timezone.now():%Y%m%d-%H%M%S}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+admin.site.unregister(Transaction)
+
+
+@admin.register(Transaction)
+class TransactionAdmin(PolarisTransactionAdmin):
+    list_filter = ("kind", "status", "started_at", "completed_at")
+    search_fields = ("id", "stellar_transaction_id", "external_transaction_id")
+    actions = [export_csv]
+
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "asset_code", "amount_in", "started_at", "archived_at")
+    list_filter = ("kind", "status", "asset_code")
+    search_fields = ("id", "stellar_account", "stellar_transaction_id", "external_transaction_id")
+    readonly_fields = [f.name for f in ArchivedTransaction._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PayoutEnvelope)
+class PayoutEnvelopeAdmin(admin.ModelAdmin):
+    list_display = ("transaction_id", "tx_hash", "sequence", "status", "created_at", "updated_at")
+    list_filter = ("status",)
+    search_fields = ("transaction_id", "tx_hash")
+    readonly_fields = [f.name for f in PayoutEnvelope._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "priority", "attempts", "run_after", "locked_by", "updated_at")
+    list_filter = ("status", "kind")
+    search_fields = ("id", "kind", "locked_by")
+    readonly_fields = [f.name for f in Job._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(HotWalletTopUp)
+class HotWalletTopUpAdmin(admin.ModelAdmin):
+    list_display = ("id", "asset_code", "amount", "treasury_account", "status", "created_at")
+    list_filter = ("status", "asset_code")
+    search_fields = ("tx_hash",)
+    readonly_fields = [f.name for f in HotWalletTopUp._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -4,12 +4,17 @@ class AnchorConfig(AppConfig):
     name = "anchor"
 
     def ready(self):
+        from django.conf import settings
         from polaris.integrations import register_integrations
 
+        from . import db  # noqa: F401 (connects the transaction change signal)
+        from . import tokens
         from .integrations import (
             # toml_contents,
             AnchorDeposit,
             AnchorWithdraw,
+            AnchorQuote,
+            calculate_fee,
             # AnchorRails,
         )
 
@@ -17,5 +22,9 @@ class AnchorConfig(AppConfig):
             # toml = toml_contents,
             deposit=AnchorDeposit(),
             withdrawal=AnchorWithdraw(),
+            quote=AnchorQuote(),
+            # Without a schedule, Polaris keeps using the fees stored on each Asset
+            fee=calculate_fee if settings.FEE_SCHEDULES else None,
             # rails=AnchorRails(),
         )
+        tokens.install()
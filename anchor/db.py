@@ -0,0 +1,118 @@
+"""
+Routing of read-only SEP-24 polling to a read replica, and change tracking
+for the transactions it reads.
+
+Wallets poll /sep24/transaction(s) while users wait. ``ReplicaReadMiddleware``
+marks those requests, and ``ReplicaRouter`` sends their reads to the
+``replica`` database (configured with REPLICA_DATABASE_URL). Everything
+else, including every write, stays on ``default``.
+
+After a transaction is saved, ``transactions_changed`` pins its account to
+the primary for ``REPLICA_STICKY_SECONDS``, so a wallet never reads a status
+older than one it could already have seen, and bumps the account's version
+counter used for ETags by ``TransactionETagMiddleware``. Pins and versions
+live in the default cache, which must be shared between processes
+(CACHE_URL) for changes made by workers to be seen by the web servers.
+"""
+
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from polaris.models import Transaction
+
+REPLICA = "replica"
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+
+# Cache backends private to one process: a change made by a worker would
+# never reach the web servers' pins and versions.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def replica_enabled() -> bool:
+    return REPLICA in settings.DATABASES
+
+
+def shared_cache() -> bool:
+    """Whether the default cache is shared between processes, as pins and versions require."""
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+
+def _pin_key(account: str) -> str:
+    return f"anchor:primary-pin:{account}"
+
+
+def pin_to_primary(*accounts: str):
+    """Serve reads for ``accounts`` from the primary until the replica has caught up."""
+    if not replica_enabled():
+        return
+    cache.set_many({_pin_key(a): True for a in accounts if a}, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(account: str) -> bool:
+    return bool(cache.get(_pin_key(account)))
+
+
+def _version_key(account: str) -> str:
+    return f"anchor:transaction-version:{account}"
+
+
+def transaction_version(account: str) -> int:
+    """Counter that changes whenever a transaction of ``account`` changes."""
+    key = _version_key(account)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, so an evicted counter never repeats an old value
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def transactions_changed(*accounts: str):
+    """Record that transactions of ``accounts`` changed: pin them to the primary and bump their versions."""
+    accounts = [a for a in accounts if a]
+    pin_to_primary(*accounts)
+    for account in accounts:
+        try:
+            cache.incr(_version_key(account))
+        except ValueError:
+            cache.add(_version_key(account), time.time_ns() // 1000, None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class use_replica:
+    """Context manager routing the reads made inside it to the replica."""
+
+    def __enter__(self):
+        self._token = _use_replica.set(replica_enabled())
+
+    def __exit__(self, *exc):
+        _use_replica.reset(self._token)
+
+
+@receiver(post_save, sender=Transaction)
+def _transaction_saved(sender, instance, **kwargs):
+    transactions_changed(instance.stellar_account, instance.muxed_account)
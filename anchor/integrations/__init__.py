@@ -1,11 +1,14 @@
 from .toml import toml_contents
 from .deposit import AnchorDeposit
 from .withdraw import AnchorWithdraw
+from .rates import AnchorQuote, calculate_fee
 # from .rails import AnchorRails
 
 __all__ = [
     "toml_contents",
     "AnchorDeposit",
     "AnchorWithdraw",
+    "AnchorQuote",
+    "calculate_fee",
     # "AnchorRails",
 ]
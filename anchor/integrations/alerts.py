@@ -0,0 +1,35 @@
+import logging
+import threading
+import time
+from typing import Dict
+
+from django.conf import settings
+from django.core.mail import mail_admins
+
+logger = logging.getLogger(__name__)
+
+_last_sent: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def alert(key: str, subject: str, message: str) -> bool:
+    """
+    Log an operational alert and email it to ``ADMINS``.
+
+    Alerts with the same ``key`` are sent at most once per ``ALERT_INTERVAL``
+    seconds per process, so a check that runs every few minutes does not
+    flood the inbox.
+
+    Returns:
+        True if the alert was sent, False if it was throttled
+    """
+    now = time.monotonic()
+    with _lock:
+        last = _last_sent.get(key)
+        if last is not None and now - last < settings.ALERT_INTERVAL:
+            return False
+        _last_sent[key] = now
+
+    logger.critical(f"{subject}: {message}")
+    mail_admins(subject, message, fail_silently=True)
+    return True
@@ -0,0 +1,94 @@
+import json
+import logging
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from polaris.models import Transaction
+
+from ..models import ArchivedTransaction, TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Never copied into the archive: the channel seed is a secret and is useless
+# once a transaction is terminal.
+EXCLUDED_FIELDS = {"channel_seed"}
+
+
+def _serialize(transaction: Transaction) -> dict:
+    row = {
+        field.attname: getattr(transaction, field.attname)
+        for field in Transaction._meta.concrete_fields
+        if field.name not in EXCLUDED_FIELDS
+    }
+    row["asset_code"] = transaction.asset.code if transaction.asset_id else None
+    return json.loads(json.dumps(row, cls=DjangoJSONEncoder))
+
+
+def _to_archive(transaction: Transaction) -> ArchivedTransaction:
+    return ArchivedTransaction(
+        id=transaction.id,
+        kind=transaction.kind,
+        status=transaction.status,
+        asset_code=transaction.asset.code if transaction.asset_id else None,
+        stellar_account=transaction.stellar_account,
+        amount_in=transaction.amount_in,
+        amount_out=transaction.amount_out,
+        amount_fee=transaction.amount_fee,
+        stellar_transaction_id=transaction.stellar_transaction_id,
+        external_transaction_id=transaction.external_transaction_id,
+        started_at=transaction.started_at,
+        completed_at=transaction.completed_at,
+        data=_serialize(transaction),
+    )
+
+
+def archive_transactions(older_than_days: int, batch_size: int, dry_run: bool = False) -> int:
+    """
+    Move terminal Polaris transactions older than ``older_than_days`` into
+    the ``ArchivedTransaction`` table.
+
+    Each batch is copied and deleted inside its own DB transaction, so the
+    command can be interrupted at any point and re-run safely. Rows already
+    archived by a previous, interrupted run are skipped on insert.
+
+    Args:
+        older_than_days: Only transactions started before now - N days move
+        batch_size: Number of rows copied and deleted per DB transaction
+        dry_run: Count the eligible rows without moving anything
+
+    Returns:
+        Number of transactions archived (or eligible, for a dry run)
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    eligible = Transaction.objects.filter(
+        status__in=TERMINAL_STATUSES,
+        started_at__lt=cutoff,
+    )
+
+    if dry_run:
+        return eligible.count()
+
+    archived = 0
+    while True:
+        with db_transaction.atomic():
+            batch = list(
+                eligible.select_related("asset")
+                .defer(*EXCLUDED_FIELDS, "asset__distribution_seed")
+                .order_by("started_at")
+                .select_for_update(skip_locked=True, of=("self",))[:batch_size]
+            )
+            if not batch:
+                break
+
+            ArchivedTransaction.objects.bulk_create(
+                [_to_archive(t) for t in batch],
+                ignore_conflicts=True,
+            )
+            Transaction.objects.filter(id__in=[t.id for t in batch]).delete()
+
+        archived += len(batch)
+        logger.info(f"Archived {len(batch)} transactions ({archived} total, cutoff {cutoff.isoformat()})")
+
+    return archived
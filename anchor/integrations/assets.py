@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from polaris.models import Asset
+
+from .rates import get_fee_table
+
+logger = logging.getLogger(__name__)
+
+
+class AnchoredAsset(NamedTuple):
+    """
+    Everything the payout and verification paths need to know about one
+    anchored stablecoin.
+    """
+
+    id: int
+    code: str
+    issuer: str
+    hot_wallet_public: str
+    hot_wallet_secret: Optional[str]
+    receiving_account: Optional[str]
+    treasury_account: Optional[str]
+    min_balance: Decimal
+    target_balance: Decimal
+    deposit_fee_fixed: Decimal
+    deposit_fee_percent: Decimal
+    withdrawal_fee_fixed: Decimal
+    withdrawal_fee_percent: Decimal
+
+    def fee(self, operation: str, amount: Decimal) -> Decimal:
+        """
+        Fee for ``operation`` ("deposit" or "withdraw") of ``amount``: the
+        ``FEE_SCHEDULES`` table if the asset has one, else the fixed and
+        percent fees stored on the Polaris Asset.
+        """
+        table = get_fee_table(self.code, operation)
+        if table is not None:
+            return table.fee(amount)
+        if operation == "deposit":
+            return self.deposit_fee_fixed + amount * self.deposit_fee_percent / 100
+        return self.withdrawal_fee_fixed + amount * self.withdrawal_fee_percent / 100
+
+
+def _accounts_for(code: str) -> Dict[str, Optional[str]]:
+    accounts = dict(settings.ANCHOR_ASSETS.get(code, {}))
+    if code == "USDC":
+        # The original single-asset settings still configure USDC
+        accounts.setdefault("hot_wallet_public", settings.USDC_HOT_WALLET_PUBLIC)
+        accounts.setdefault("hot_wallet_secret", settings.USDC_HOT_WALLET_SECRET)
+        accounts.setdefault("receiving_account", settings.USDC_RECEIVING_ADDRESS)
+    return accounts
+
+
+class _Loaded(NamedTuple):
+    expires: float
+    anchored: Dict[int, AnchoredAsset]
+
+
+class AssetRegistry:
+    """
+    Process-wide map of the Polaris assets this anchor serves, built from
+    ``polaris.models.Asset`` plus the per-asset accounts in ``ANCHOR_ASSETS``.
+
+    Loaded with a single query, dropped whenever an Asset is saved or deleted
+    in this process and reloaded after ``ASSET_REGISTRY_TTL`` seconds so edits
+    made by other processes show up. Assets without a hot wallet are left out.
+    """
+
+    def __init__(self):
+        self._loaded: Optional[_Loaded] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> _Loaded:
+        loaded = self._loaded
+        if loaded is not None and time.monotonic() < loaded.expires:
+            return loaded
+        with self._lock:
+            if self._loaded is loaded:
+                fields = (
+                    "id", "code", "issuer", "deposit_fee_fixed", "deposit_fee_percent",
+                    "withdrawal_fee_fixed", "withdrawal_fee_percent",
+                )
+                anchored = {}
+                for asset in Asset.objects.order_by("id").values(*fields):
+                    accounts = _accounts_for(asset["code"])
+                    if not accounts.get("hot_wallet_public"):
+                        # Nothing could pay its deposits out
+                        logger.warning(f"Asset {asset['code']} has no hot wallet in ANCHOR_ASSETS, not anchoring it")
+                        continue
+                    anchored[asset["id"]] = AnchoredAsset(
+                        id=asset["id"],
+                        code=asset["code"],
+                        issuer=asset["issuer"],
+                        hot_wallet_public=accounts.get("hot_wallet_public"),
+                        hot_wallet_secret=accounts.get("hot_wallet_secret"),
+                        receiving_account=accounts.get("receiving_account"),
+                        treasury_account=accounts.get("treasury_account"),
+                        min_balance=Decimal(str(accounts.get("min_balance", 0))),
+                        target_balance=Decimal(str(accounts.get("target_balance", 0))),
+                        deposit_fee_fixed=asset["deposit_fee_fixed"] or Decimal(0),
+                        deposit_fee_percent=asset["deposit_fee_percent"] or Decimal(0),
+                        withdrawal_fee_fixed=asset["withdrawal_fee_fixed"] or Decimal(0),
+                        withdrawal_fee_percent=asset["withdrawal_fee_percent"] or Decimal(0),
+                    )
+                self._loaded = _Loaded(time.monotonic() + settings.ASSET_REGISTRY_TTL, anchored)
+            return self._loaded
+
+    def clear(self):
+        with self._lock:
+            self._loaded = None
+
+    def all(self) -> List[AnchoredAsset]:
+        return list(self._load().anchored.values())
+
+    def get(self, asset_id: int) -> AnchoredAsset:
+        try:
+            return self._load().anchored[asset_id]
+        except KeyError:
+            raise ValueError(f"Asset {asset_id} is not anchored")
+
+    def by_code(self, code: str, issuer: Optional[str] = None) -> AnchoredAsset:
+        for asset in self._load().anchored.values():
+            if asset.code == code and (issuer is None or asset.issuer == issuer):
+                return asset
+        raise ValueError(f"Asset {code}:{issuer} is not anchored")
+
+
+registry = AssetRegistry()
+
+
+@receiver([post_save, post_delete], sender=Asset)
+def _reload_registry(sender, **kwargs):
+    registry.clear()
@@ -0,0 +1,209 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from polaris.models import Transaction
+from stellar_sdk import Server
+
+from ..db import transactions_changed
+from ..models import ScanCursor
+from .assets import registry
+from .horizon import PRIORITY_BACKGROUND, horizon_pool
+from .withdraw import payment_matches
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = "withdrawal_payments"
+PAGE_SIZE = 200
+
+
+class PaymentMatch(NamedTuple):
+    transaction_id: str
+    tx_hash: str
+    amount: str
+    asset_code: str
+    applied: bool
+
+
+def cursor_name(account: str) -> str:
+    """Name of the stored cursor for payments to ``account``."""
+    if account == settings.USDC_RECEIVING_ADDRESS:
+        # Keep the cursor saved before there was one per receiving account
+        return CURSOR_NAME
+    return f"payments:{account}"
+
+
+class OpenWithdrawals:
+    """
+    In-memory index of withdrawals waiting for the user's payment, loaded once
+    per scan. Withdrawals are looked up by memo, or by the sending account
+    for the rare withdrawal that has no memo.
+    """
+
+    def __init__(self, receiving_account: str):
+        withdrawals = Transaction.objects.filter(
+            kind=Transaction.KIND.withdrawal,
+            status=Transaction.STATUS.pending_user_transfer_start,
+            receiving_anchor_account=receiving_account,
+        ).only("id", "asset_id", "stellar_account", "amount_in", "memo", "memo_type")
+
+        self.by_memo: Dict[Tuple[str, str], Transaction] = {}
+        self.by_account: Dict[str, List[Transaction]] = {}
+        for withdrawal in withdrawals:
+            if withdrawal.memo:
+                self.by_memo[(withdrawal.memo_type, withdrawal.memo)] = withdrawal
+            else:
+                self.by_account.setdefault(withdrawal.stellar_account, []).append(withdrawal)
+
+    def __len__(self):
+        return len(self.by_memo) + sum(len(w) for w in self.by_account.values())
+
+    def find(self, payment: Dict) -> Optional[Transaction]:
+        stellar_tx = payment.get("transaction") or {}
+        memo = stellar_tx.get("memo")
+        if memo:
+            return self.by_memo.get((stellar_tx.get("memo_type"), memo))
+        candidates = self.by_account.get(payment.get("from"), [])
+        # Without a memo the match is only safe when it is unambiguous
+        return candidates[0] if len(candidates) == 1 else None
+
+    def remove(self, withdrawal: Transaction):
+        if withdrawal.memo:
+            self.by_memo.pop((withdrawal.memo_type, withdrawal.memo), None)
+        else:
+            self.by_account.pop(withdrawal.stellar_account, None)
+
+
+def _fetch_page(account: str, cursor: Optional[str]) -> List[Dict]:
+    def page(server: Server) -> List[Dict]:
+        builder = server.payments().for_account(account).join("transactions").order(desc=False).limit(PAGE_SIZE)
+        if cursor:
+            builder = builder.cursor(cursor)
+        return builder.call()["_embedded"]["records"]
+
+    return horizon_pool.read(page, PRIORITY_BACKGROUND)
+
+
+def scan_account_payments(
+    account: str, apply: bool = False, cursor: Optional[str] = None, max_pages: Optional[int] = None
+) -> Tuple[List[PaymentMatch], int]:
+    """
+    Page through payments to one receiving ``account`` and match them to
+    withdrawals still waiting in pending_user_transfer_start.
+
+    Pages are requested 200 at a time, oldest first, starting from the stored
+    cursor. The next page is prefetched while the current one is matched.
+    Matching happens in memory against an index of open withdrawals, with one
+    DB query per page to skip payments already recorded on a transaction.
+    A payment only matches if it is in the asset of the withdrawal.
+
+    When ``apply`` is set, matched withdrawals move to pending_anchor with a
+    conditional UPDATE, so a re-run or a concurrent ``verify_withdrawal``
+    never applies the same payment twice, and the cursor is saved after every
+    page.
+
+    Args:
+        account: The receiving account to scan
+        apply: Update matched withdrawals and persist the cursor
+        cursor: Start from this paging token instead of the stored one
+        max_pages: Stop after this many pages
+
+    Returns:
+        The matches found and the number of payments scanned
+    """
+    name = cursor_name(account)
+    if cursor is None:
+        stored = ScanCursor.objects.filter(name=name).first()
+        cursor = stored.cursor if stored else None
+
+    open_withdrawals = OpenWithdrawals(account)
+    logger.info(
+        f"Catch-up scan of {account} from cursor {cursor} against {len(open_withdrawals)} open withdrawals"
+    )
+
+    matches: List[PaymentMatch] = []
+    scanned = 0
+    pages = 0
+
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        next_page = prefetcher.submit(_fetch_page, account, cursor)
+        while next_page is not None:
+            records = next_page.result()
+            pages += 1
+            if not records:
+                break
+
+            last_page = len(records) < PAGE_SIZE or (max_pages is not None and pages >= max_pages)
+            next_page = None if last_page else prefetcher.submit(
+                _fetch_page, account, records[-1]["paging_token"]
+            )
+
+            hashes = [r["transaction_hash"] for r in records]
+            already_recorded = set(
+                Transaction.objects.filter(stellar_transaction_id__in=hashes)
+                .values_list("stellar_transaction_id", flat=True)
+            )
+
+            for payment in records:
+                scanned += 1
+                if payment["transaction_hash"] in already_recorded:
+                    continue
+                withdrawal = open_withdrawals.find(payment)
+                if withdrawal is None:
+                    continue
+                anchored = registry.get(withdrawal.asset_id)
+                if not payment_matches(payment, withdrawal.amount_in, account, anchored.code, anchored.issuer):
+                    continue
+
+                open_withdrawals.remove(withdrawal)
+                applied = False
+                if apply:
+                    applied = bool(
+                        Transaction.objects.filter(
+                            id=withdrawal.id, status=Transaction.STATUS.pending_user_transfer_start
+                        ).update(
+                            status=Transaction.STATUS.pending_anchor,
+                            stellar_transaction_id=payment["transaction_hash"],
+                        )
+                    )
+                    if applied:
+                        # A queryset update sends no post_save
+                        transactions_changed(withdrawal.stellar_account)
+                matches.append(
+                    PaymentMatch(
+                        str(withdrawal.id), payment["transaction_hash"], payment["amount"], anchored.code, applied
+                    )
+                )
+                logger.info(
+                    f"Matched payment {payment['transaction_hash']} to withdrawal {withdrawal.id}"
+                    f"{' (applied)' if applied else ''}"
+                )
+
+            if apply:
+                ScanCursor.objects.update_or_create(
+                    name=name, defaults={"cursor": records[-1]["paging_token"]}
+                )
+
+    return matches, scanned
+
+
+def scan_withdrawal_payments(
+    apply: bool = False, max_pages: Optional[int] = None
+) -> Tuple[List[PaymentMatch], int]:
+    """
+    Run ``scan_account_payments`` over the receiving account of every anchored
+    asset, each from its own stored cursor. Assets sharing a receiving account
+    are scanned once.
+
+    Returns:
+        The matches found and the number of payments scanned, over all accounts
+    """
+    accounts = sorted({asset.receiving_account for asset in registry.all() if asset.receiving_account})
+    matches: List[PaymentMatch] = []
+    scanned = 0
+    for account in accounts:
+        account_matches, account_scanned = scan_account_payments(account, apply=apply, max_pages=max_pages)
+        matches.extend(account_matches)
+        scanned += account_scanned
+    return matches, scanned
@@ -0,0 +1,52 @@
+from typing import Dict, Optional
+
+from django.utils.functional import cached_property
+from polaris.models import Transaction, Asset
+
+
+class InteractiveContext:
+    """
+    Everything the SEP-24 interactive hooks need about the current request.
+
+    Polaris calls ``form_for_transaction``, ``content_for_template``,
+    ``interactive_url`` and ``after_interactive_flow`` separately, each with the
+    same request. The context is attached to the underlying Django request, so
+    all hooks served by one request share a single instance: query parameters
+    are read once, and the Transaction and Asset Polaris already loaded are
+    kept instead of being fetched again.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.transaction: Optional[Transaction] = None
+        self.asset: Optional[Asset] = None
+
+    @classmethod
+    def for_request(cls, request) -> "InteractiveContext":
+        # DRF wraps the Django request; memoize on the inner one so every
+        # wrapper of the same request sees the same context.
+        django_request = getattr(request, "_request", request)
+        context = getattr(django_request, "_anchor_context", None)
+        if context is None:
+            context = cls(request)
+            django_request._anchor_context = context
+        return context
+
+    @cached_property
+    def params(self) -> Dict[str, str]:
+        """Query parameters of the request, first value only."""
+        query = getattr(self.request, "query_params", None) or self.request.GET
+        return {key: query.get(key) for key in query}
+
+    @property
+    def token(self) -> Optional[str]:
+        return self.params.get("token")
+
+    def bind(self, transaction: Transaction, asset: Optional[Asset] = None) -> "InteractiveContext":
+        """
+        Remember the objects Polaris already loaded so no hook fetches them again.
+        """
+        self.transaction = transaction
+        if asset is not None:
+            self.asset = asset
+        return self
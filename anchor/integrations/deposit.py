@@ -1,23 +1,53 @@
 from decimal import Decimal, InvalidOperation
-from typing import Optional, Dict, List
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
 from django import forms
 from rest_framework.request import Request
 from polaris.models import Transaction, Asset
 from polaris.templates import Template
 from .forms import DepositForm
-from urllib.parse import (urlparse, parse_qs, urlencode, quote_plus)
+from .context import InteractiveContext
+from .interactive import build_interactive_url
+from .handoff import HandoffError, verify_return
+from .alerts import alert
+from .assets import registry
+from .rates import FIAT_CODE, deposit_amounts
 from polaris.integrations import (
     DepositIntegration,
     TransactionForm
 )
 from django.conf import settings
-from stellar_sdk import Server, Keypair, TransactionBuilder, Network, Asset as StellarAsset
-from stellar_sdk.exceptions import BaseHorizonError
+from django.db import connection, transaction as db_transaction
+from stellar_sdk import Asset as StellarAsset, Claimant, CreateClaimableBalance, Payment, TransactionBuilder
+from stellar_sdk.exceptions import BadRequestError, BaseRequestError
+from ..models import PayoutEnvelope
+from .destinations import forget_destination, get_destination, is_not_ready, prefetch_destinations
+from .horizon import PRIORITY_PAYOUT, HorizonPool, horizon_pool
+from .signing import SigningError, sign_envelope
+from .payouts import (
+    finalize_payout,
+    find_on_ledger,
+    forget_source_account,
+    is_stale,
+    is_transient,
+    ledger_state,
+    load_envelope,
+    mark_envelope,
+    save_envelope,
+    source_account,
+    submit_envelope,
+)
 import logging
-import os
 
 logger = logging.getLogger(__name__)
 
+# Statuses complete_deposit pays out from. A deposit still waiting for the
+# user's fiat is moved to pending_anchor first: calling complete_deposit means
+# the payment was verified.
+PAYABLE_STATUSES = (Transaction.STATUS.pending_anchor, Transaction.STATUS.pending_trust)
+FUNDABLE_STATUSES = (Transaction.STATUS.pending_user_transfer_start, *PAYABLE_STATUSES)
+
 class AnchorDeposit(DepositIntegration):
     def form_for_transaction(
         self,
@@ -28,6 +58,7 @@ class AnchorDeposit(DepositIntegration):
         *args,
         **kwargs
     ) -> Optional[forms.Form]:
+        InteractiveContext.for_request(request).bind(transaction)
         # if we haven't collected amount, collect it
         if not transaction.amount_in:
             if post_data:
@@ -47,6 +78,8 @@ class AnchorDeposit(DepositIntegration):
         *args,
         **kwargs,
     ) -> Optional[Dict]:
+        if transaction:
+            InteractiveContext.for_request(request).bind(transaction)
         if template == Template.DEPOSIT:
             if not form:  # we're done
                 return None
@@ -97,46 +130,13 @@ class AnchorDeposit(DepositIntegration):
         *args: List,
         **kwargs: Dict,
     ) -> Optional[str]:
-        if request.query_params.get("step"):
+        context = InteractiveContext.for_request(request).bind(transaction, asset)
+        if context.params.get("step"):
           raise NotImplementedError()
 
-        # Use os.environ to check environment (safe at runtime)
-        environment = os.environ.get('ENVIRONMENT', 'development')
-        if environment == "development":
-            ownUrl = "http://localhost:3000/menu"  # Use for local testing
-        else:
-            ownUrl = "https://origin.linkio.world/menu"
-
-        # Full interactive url /sep24/transactions/deposit/webapp
-        url = request.build_absolute_uri()
-        parsed_url = urlparse(url)
-        query_result = parse_qs(parsed_url.query)
-        print("query_result", query_result)
-
-        token = (query_result['token'][0])
-        # amount = (query_result['amount'][0])
-
-        ownUrl += "?" if parsed_url.query else "?"
-
-        payload = {
-            'type': 'deposit',
-            'asset_code': asset.code,
-            'transaction_id':transaction.id,
-            'token': token,
-            'wallet': transaction.stellar_account,
-            'callback': callback,
-            # 'amount': amount
-        }
-
-        # Change status from incomplete to pending_anchor so demo wallet doesn't think it failed
-        # while user is filling out the form
-        # transaction.status = Transaction.STATUS.pending_anchor
-        # transaction.save()
-
-        # The anchor uses a standalone interactive flow
-        fullUrl = ownUrl + urlencode(payload, quote_via=quote_plus)
-        print("fullUrl", fullUrl)
-        return fullUrl
+        # The anchor uses a standalone interactive flow. The token is the one the
+        # wallet opened /sep24/transactions/deposit/webapp with.
+        return build_interactive_url("deposit", asset, transaction, context.token, callback)
 
     def after_interactive_flow(
         self,
@@ -154,43 +154,85 @@ class AnchorDeposit(DepositIntegration):
         This function:
         - Updates transaction status to pending_user_transfer_start when amounts are valid
         - Logs request for admin visibility
-        - Does NOT send USDC yet (that happens after manual verification via complete_deposit)
+        - Does NOT send USDC yet: once the fiat arrives, the fiat backend moves
+          the deposit to pending_anchor (internal/transactions/status), which
+          queues complete_deposit, or an admin runs complete_deposit
         """
-        amount_str = request.query_params.get("amount")
+        params = InteractiveContext.for_request(request).bind(transaction).params
+
+        # The values below come back through the user's browser; only trust
+        # them if the UI backend signed them for this transaction.
+        try:
+            verify_return(params, "deposit", transaction)
+        except HandoffError as e:
+            if settings.INTERACTIVE_HANDOFF_REQUIRED or params.get("handoff"):
+                logger.error(
+                    f"Rejected interactive deposit callback for transaction {transaction.id}: {e}"
+                )
+                transaction.status = Transaction.STATUS.error
+                transaction.status_message = "Interactive deposit callback failed verification"
+                transaction.save()
+                return
+            logger.warning(f"Unsigned interactive deposit callback for transaction {transaction.id}")
+
+        amount_str = params.get("amount")
 
         # Validate required parameters exist
         if amount_str is None:
             logger.error(
                 "Missing required query params for deposit after_interactive_flow: "
-                f"amount={amount_str}, amount_fee={fee_str}, transaction_id={transaction.id}"
+                f"amount={amount_str}, transaction_id={transaction.id}"
             )
             transaction.status = Transaction.STATUS.error
-            transaction.status_message = "Missing amount or amount_fee from interactive deposit callback"
+            transaction.status_message = "Missing amount from interactive deposit callback"
             transaction.save()
             return
 
         # Safely parse Decimal values
-        # try:
-        #     transaction.amount_in = Decimal(amount_str)
-        # except (InvalidOperation, TypeError) as e:
-        #     logger.error(
-        #         "Invalid Decimal values for deposit after_interactive_flow: "
-        #         f"amount={amount_str}, transaction_id={transaction.id}, error={e}",
-        #         exc_info=True
-        #     )
-        #     transaction.status = Transaction.STATUS.error
-        #     transaction.status_message = "Invalid amount or amount_fee format in interactive deposit callback"
-        #     transaction.save()
-        #     return
-
-        transaction.status = Transaction.STATUS.pending_anchor
-        transaction.amount_in = (request.query_params.get("amount"))
-        transaction.amount_out = (request.query_params.get("amount_out"))
-        transaction.memo_type = (request.query_params.get("memo_type"))
-        transaction.memo = (request.query_params.get("hashed"))
-        transaction.from_address = (request.query_params.get("account"))
-        transaction.external_transaction_id = (request.query_params.get("externalId"))
-        transaction.on_change_callback = (request.query_params.get("callback"))
+        try:
+            amount_in = Decimal(amount_str)
+            if not amount_in.is_finite() or amount_in <= 0:
+                raise InvalidOperation(amount_str)
+        except (InvalidOperation, TypeError) as e:
+            logger.error(
+                "Invalid Decimal values for deposit after_interactive_flow: "
+                f"amount={amount_str}, transaction_id={transaction.id}, error={e}",
+                exc_info=True
+            )
+            transaction.status = Transaction.STATUS.error
+            transaction.status_message = "Invalid amount format in interactive deposit callback"
+            transaction.save()
+            return
+
+        # The fee and the payout are priced here, never taken from the browser
+        try:
+            anchored = registry.get(transaction.asset_id)
+            amount_fee, amount_out = deposit_amounts(
+                anchored, amount_in, transaction.quote if transaction.quote_id else None
+            )
+        except (ValueError, RuntimeError) as e:
+            logger.error(f"Could not price deposit {transaction.id} of {amount_in} {FIAT_CODE}: {e}")
+            transaction.status = Transaction.STATUS.error
+            transaction.status_message = f"Could not price this deposit: {e}"
+            transaction.save()
+            return
+        if params.get("amount_out") and params["amount_out"] != str(amount_out):
+            logger.warning(
+                f"Deposit {transaction.id}: interactive UI showed {params['amount_out']} {anchored.code}, "
+                f"paying {amount_out}"
+            )
+
+        transaction.status = Transaction.STATUS.pending_user_transfer_start
+        transaction.amount_in = amount_in
+        transaction.amount_fee = amount_fee
+        transaction.amount_out = amount_out
+        # amount_in is NGN; the fee is taken from the converted amount
+        transaction.fee_asset = f"stellar:{anchored.code}:{anchored.issuer}"
+        transaction.memo_type = (params.get("memo_type"))
+        transaction.memo = (params.get("hashed"))
+        transaction.from_address = (params.get("account"))
+        transaction.external_transaction_id = (params.get("externalId"))
+        transaction.on_change_callback = (params.get("callback"))
         transaction.save()
 
         # Log deposit request for admin visibility
@@ -201,6 +243,146 @@ class AnchorDeposit(DepositIntegration):
         )
 
 
+def _still_payable(transaction: Transaction) -> bool:
+    """
+    Lock the deposit's row again, inside an atomic block, and check that no
+    concurrent caller moved it on while this one was talking to Horizon.
+    """
+    status = Transaction.objects.select_for_update().values_list("status", flat=True).get(id=transaction.id)
+    if status not in PAYABLE_STATUSES:
+        logger.warning(f"Deposit {transaction.id} became {status} while its payout was prepared, discarding it")
+        return False
+    return True
+
+
+def _build_payout(horizon: HorizonPool, transaction: Transaction) -> Tuple[Optional[PayoutEnvelope], bool]:
+    """
+    Check the destination and the hot wallet balance, then build, sign and
+    persist the payment of the transaction's asset.
+
+    The Horizon reads and the signing happen without holding the deposit's
+    row lock, as they may wait on the rate limiter or the signing service.
+    Only storing re-locks the row: the deposit must still be payable, and
+    ``save_envelope``'s compare-and-set keeps a single payout per deposit.
+
+    A destination that does not exist or lacks a trustline is paid with a
+    claimable balance if the wallet supports them; otherwise the transaction
+    moves to pending_trust without spending a fee.
+
+    Returns:
+        The stored payout and whether this call built it. The payout is a
+        concurrent caller's if that one stored first, and None if nothing
+        was stored: no trustline, not enough in the hot wallet, or the
+        deposit is no longer payable.
+    """
+    anchored = registry.get(transaction.asset_id)
+    destination = get_destination(horizon, transaction.stellar_account, anchored)
+    claimable = not destination.trusts(anchored)
+    if claimable and not transaction.claimable_balance_supported:
+        logger.warning(
+            f"Deposit {transaction.id}: {transaction.stellar_account} "
+            f"{'does not trust ' + anchored.code if destination.exists else 'does not exist'}, waiting for a trustline"
+        )
+        with db_transaction.atomic():
+            if _still_payable(transaction):
+                transaction.status = Transaction.STATUS.pending_trust
+                transaction.status_message = f"Add a trustline for {anchored.code} to receive this deposit"
+                transaction.save(update_fields=["status", "status_message"])
+        return None, False
+
+    hot_wallet_account = horizon.read(
+        lambda server: server.accounts().account_id(anchored.hot_wallet_public).call(), PRIORITY_PAYOUT
+    )
+
+    # Find the asset's balance in its hot wallet
+    asset_balance = Decimal(0)
+    for balance in hot_wallet_account['balances']:
+        if (balance.get('asset_code') == anchored.code and
+            balance.get('asset_issuer') == anchored.issuer):
+            asset_balance = Decimal(balance['balance'])
+            break
+
+    logger.info(f"Hot wallet {anchored.code} balance: {asset_balance}")
+
+    required_amount = transaction.amount_out
+    if asset_balance < required_amount:
+        logger.error(
+            f"Insufficient hot wallet balance. Required: {required_amount}, "
+            f"Available: {asset_balance}. Transaction {transaction.id} cannot be completed."
+        )
+        alert(
+            f"liquidity:{anchored.code}:critical",
+            f"[anchor] {anchored.code} hot wallet critical",
+            f"Hot wallet {anchored.hot_wallet_public} holds {asset_balance} {anchored.code}, "
+            f"deposit {transaction.id} needs {required_amount}. Run rebalance_hot_wallets to prepare a top-up.",
+        )
+        return None, False
+
+    stellar_asset = StellarAsset(anchored.code, anchored.issuer)
+
+    # Get base fee from network
+    base_fee = horizon.read(lambda server: server.fetch_base_fee(), PRIORITY_PAYOUT)
+
+    with source_account(anchored.hot_wallet_public, hot_wallet_account) as account:
+        stellar_transaction = (
+            TransactionBuilder(
+                source_account=account,
+                network_passphrase=settings.STELLAR_NETWORK_PASSPHRASE,
+                base_fee=base_fee
+            )
+            .append_operation(
+                CreateClaimableBalance(stellar_asset, str(required_amount), [Claimant(transaction.stellar_account)])
+                if claimable else
+                Payment(destination=transaction.stellar_account, asset=stellar_asset, amount=str(required_amount))
+            )
+            # Text memos are limited to 28 bytes, too short for the full id
+            .add_text_memo(f"LINK {transaction.id.hex[:23]}")
+            .set_timeout(settings.PAYOUT_TIMEOUT)
+            .build()
+        )
+    sign_envelope(anchored.hot_wallet_public, stellar_transaction)
+
+    # Persist before submitting, so a crash or timeout from here on can only
+    # lead to this exact envelope being resubmitted.
+    with db_transaction.atomic():
+        if not _still_payable(transaction):
+            forget_source_account(anchored.hot_wallet_public)
+            return None, False
+        envelope = save_envelope(transaction, stellar_transaction)
+        if envelope is None:
+            # A concurrent caller stored a payout first: drop ours unsent,
+            # give back its sequence number and submit theirs.
+            logger.warning(f"Deposit {transaction.id} already has a stored payout, discarding the one just signed")
+            forget_source_account(anchored.hot_wallet_public)
+            return load_envelope(transaction.id), False
+
+        claimable_balance_id = stellar_transaction.transaction.get_claimable_balance_id(0) if claimable else None
+        if transaction.claimable_balance_id != claimable_balance_id:
+            transaction.claimable_balance_id = claimable_balance_id
+            transaction.save(update_fields=["claimable_balance_id"])
+    return envelope, True
+
+
+def _replace_stale_payout(
+    horizon: HorizonPool, transaction: Transaction, stale: PayoutEnvelope
+) -> Optional[PayoutEnvelope]:
+    """
+    Mark ``stale``, a stored payout that can never land, failed and build its
+    replacement. If a concurrent caller replaced it first, that caller's
+    envelope is returned instead.
+    """
+    with db_transaction.atomic():
+        if not _still_payable(transaction):
+            return None
+        mark_envelope(stale, PayoutEnvelope.STATUS.failed)
+    forget_source_account(registry.get(transaction.asset_id).hot_wallet_public)
+    envelope = load_envelope(transaction.id)
+    if envelope is not None:
+        return envelope
+    envelope, built = _build_payout(horizon, transaction)
+    return envelope
+
+
 def complete_deposit(transaction_id: str) -> bool:
     """
     MANUAL FUNCTION called by admin after verifying fiat payment received
@@ -211,96 +393,109 @@ def complete_deposit(transaction_id: str) -> bool:
     - Internal API endpoint
 
     Steps:
-    1. Verify transaction exists and is in correct status
-    2. Check hot wallet USDC balance (fail if insufficient)
-    3. Send USDC from hot wallet to user's Stellar address
-    4. Update transaction status to completed
-    5. Log success/failure
+    1. Claim the deposit: briefly lock its row and check it is in a payable
+       status, moving it from pending_user_transfer_start to pending_anchor
+       (funded)
+    2. Reuse the signed payout of a previous or concurrent attempt, if there is one
+    3. Otherwise check the destination (pending_trust if it cannot receive the
+       asset and the wallet takes no claimable balances) and the asset's hot
+       wallet balance (fail if insufficient), then build and sign the payout
+       without holding the lock, and store it if the deposit is still payable
+    4. Submit the stored payout to Stellar; if it is rejected as stale, ask
+       every Horizon node whether it landed, and rebuild it only once a
+       ledger closed past its time bounds without it
+    5. Update transaction status to completed
+    6. Log success/failure
+
+    Safe to retry and to call concurrently (worker threads, the CLI, the ops
+    shell and the internal API may all complete the same deposit): only the
+    first payout stored for a deposit is ever submitted, and every other call,
+    including a retry after a Horizon timeout, resubmits that identical
+    envelope instead of paying again.
 
     Args:
         transaction_id: The transaction ID to complete
 
     Returns:
-        True if successful, False if failed
+        True if the deposit is completed, False if not (yet)
     """
+    transaction = None
+    envelope = None
     try:
-        # 1. Fetch and validate transaction
-        transaction = Transaction.objects.get(id=transaction_id, kind=Transaction.KIND.deposit)
-
-        if transaction.status not in [
-            Transaction.STATUS.pending_user_transfer_complete,
-            Transaction.STATUS.pending_anchor
-        ]:
-            logger.error(
-                f"Transaction {transaction_id} is in invalid status: {transaction.status}. "
-                f"Expected pending_user_transfer_complete or pending_anchor"
-            )
-            return False
+        horizon = horizon_pool
+        built = False
 
-        logger.info(f"Processing deposit completion for transaction {transaction_id}")
-
-        # 2. Initialize Stellar server and get hot wallet balance
-        server = Server(horizon_url=settings.HORIZON_URL)
-        hot_wallet_account = server.accounts().account_id(settings.USDC_HOT_WALLET_PUBLIC).call()
-
-        # Find USDC balance in hot wallet
-        usdc_balance = Decimal(0)
-        for balance in hot_wallet_account['balances']:
-            if (balance.get('asset_code') == 'USDC' and
-                balance.get('asset_issuer') == settings.USDC_ISSUER):
-                usdc_balance = Decimal(balance['balance'])
-                break
-
-        logger.info(f"Hot wallet USDC balance: {usdc_balance}")
-
-        # 3. Check if sufficient balance
-        required_amount = transaction.amount_out
-        if usdc_balance < required_amount:
-            logger.error(
-                f"Insufficient hot wallet balance. Required: {required_amount}, "
-                f"Available: {usdc_balance}. Transaction {transaction_id} cannot be completed."
+        with db_transaction.atomic():
+            # 1. Claim the deposit
+            transaction = Transaction.objects.select_for_update().get(
+                id=transaction_id, kind=Transaction.KIND.deposit
             )
-            # TODO: Send alert email to admin
-            return False
 
-        # 4. Build and submit Stellar payment transaction
-        usdc_asset = StellarAsset("USDC", settings.USDC_ISSUER)
-        source_keypair = Keypair.from_secret(settings.USDC_HOT_WALLET_SECRET)
-        source_account = server.load_account(settings.USDC_HOT_WALLET_PUBLIC)
+            if transaction.status not in FUNDABLE_STATUSES:
+                logger.error(
+                    f"Transaction {transaction_id} is in invalid status: {transaction.status}. "
+                    f"Expected pending_user_transfer_start, pending_anchor or pending_trust"
+                )
+                return False
+            if transaction.status == Transaction.STATUS.pending_user_transfer_start:
+                # Funded: from now on the deposit is owed, and no longer expires
+                transaction.status = Transaction.STATUS.pending_anchor
+                transaction.save(update_fields=["status"])
 
-        # Get base fee from network
-        base_fee = server.fetch_base_fee()
+            # 2. A previous or concurrent attempt may already have signed this payout
+            envelope = load_envelope(transaction.id)
 
-        # Build transaction
-        stellar_transaction = (
-            TransactionBuilder(
-                source_account=source_account,
-                network_passphrase=settings.STELLAR_NETWORK_PASSPHRASE,
-                base_fee=base_fee
-            )
-            .append_payment_op(
-                destination=transaction.stellar_account,
-                asset=usdc_asset,
-                amount=str(required_amount)
-            )
-            .add_text_memo(f"LINK Deposit {transaction.id}")
-            .set_timeout(30)
-            .build()
-        )
-
-        # Sign and submit
-        stellar_transaction.sign(source_keypair)
-        response = server.submit_transaction(stellar_transaction)
+        logger.info(f"Processing deposit completion for transaction {transaction_id}")
+        if envelope is None:
+            # 3. Build, sign and store a new payout
+            envelope, built = _build_payout(horizon, transaction)
+            if envelope is None:
+                # A concurrent caller may have completed it meanwhile
+                return Transaction.objects.filter(
+                    id=transaction.id, status=Transaction.STATUS.completed
+                ).exists()
+
+        if not built:
+            logger.info(f"Found stored payout {envelope.tx_hash} for transaction {transaction_id}")
+            ledger_tx = find_on_ledger(horizon, envelope.tx_hash)
+            if ledger_tx is not None and ledger_tx.get("successful"):
+                finalize_payout(transaction, envelope)
+                logger.info(f"Stored payout {envelope.tx_hash} was already on the ledger")
+                return True
+
+        # 4. Submit the stored envelope
+        try:
+            submit_envelope(horizon, envelope)
+        except BadRequestError as e:
+            if not is_stale(e):
+                raise
+            state = ledger_state(horizon, envelope)
+            if state.record is not None and not state.record["successful"]:
+                raise
+            if state.record is None:
+                if not state.expired:
+                    # The node that rejected it may be ahead of the others or
+                    # behind the one that applied it; only a ledger closed past
+                    # its time bounds without it proves it can never land.
+                    logger.warning(
+                        f"Stored payout {envelope.tx_hash} for transaction {transaction_id} was rejected "
+                        f"as stale but may still land, retry once it has expired"
+                    )
+                    return False
+                logger.warning(
+                    f"Stored payout {envelope.tx_hash} for transaction {transaction_id} expired unapplied, rebuilding"
+                )
+                envelope = _replace_stale_payout(horizon, transaction, envelope)
+                if envelope is None:
+                    return False
+                submit_envelope(horizon, envelope)
 
         # 5. Update transaction record
-        transaction.status = Transaction.STATUS.completed
-        transaction.stellar_transaction_id = response['hash']
-        transaction.completed_at = transaction.completed_at or transaction.started_at
-        transaction.save()
+        finalize_payout(transaction, envelope)
 
         logger.info(
             f"Deposit completed successfully for transaction {transaction_id}. "
-            f"Stellar TX: {response['hash']}, Amount: {required_amount} USDC"
+            f"Stellar TX: {envelope.tx_hash}, Amount: {transaction.amount_out} {registry.get(transaction.asset_id).code}"
         )
 
         return True
@@ -309,21 +504,106 @@ def complete_deposit(transaction_id: str) -> bool:
         logger.error(f"Transaction {transaction_id} not found")
         return False
 
-    except BaseHorizonError as e:
+    except BaseRequestError as e:
+        if is_transient(e):
+            # The outcome is unknown; keep the transaction pending so a retry
+            # resubmits the stored envelope.
+            logger.warning(
+                f"Stellar network unavailable while completing deposit {transaction_id}, "
+                f"retry to resubmit: {e}"
+            )
+            return False
         logger.error(
             f"Stellar network error while completing deposit {transaction_id}: {e}"
         )
-        transaction.status = Transaction.STATUS.error
-        transaction.status_message = f"Stellar error: {str(e)}"
+        if envelope is not None:
+            mark_envelope(envelope, PayoutEnvelope.STATUS.failed)
+            # A rejected payout may not have used its sequence number
+            forget_source_account(registry.get(transaction.asset_id).hot_wallet_public)
+        if isinstance(e, BadRequestError) and is_not_ready(e):
+            # The trustline went away after it was cached; the next attempt
+            # checks again and may fall back to a claimable balance.
+            forget_destination(transaction.stellar_account)
+            transaction.status = Transaction.STATUS.pending_trust
+            transaction.status_message = "The destination account cannot receive this asset yet"
+        else:
+            transaction.status = Transaction.STATUS.error
+            transaction.status_message = f"Stellar error: {str(e)}"
         transaction.save()
         return False
 
+    except SigningError as e:
+        # Nothing was signed, so nothing can have been paid: keep the deposit
+        # pending and give back the sequence number the build took.
+        logger.error(f"Could not sign the payout of deposit {transaction_id}, retry later: {e}")
+        forget_source_account(registry.get(transaction.asset_id).hot_wallet_public)
+        return False
+
     except Exception as e:
         logger.error(
             f"Unexpected error while completing deposit {transaction_id}: {e}",
             exc_info=True
         )
-        transaction.status = Transaction.STATUS.error
-        transaction.status_message = f"Error: {str(e)}"
-        transaction.save()
+        if transaction is not None:
+            transaction.status = Transaction.STATUS.error
+            transaction.status_message = f"Error: {str(e)}"
+            transaction.save()
         return False
+
+
+def _complete_wallet_deposits(transaction_ids: List[str]) -> Dict[str, bool]:
+    """Complete one hot wallet's deposits in order, on a thread of its own."""
+    try:
+        return {transaction_id: complete_deposit(transaction_id) for transaction_id in transaction_ids}
+    finally:
+        connection.close()
+
+
+def complete_deposits(transaction_ids: List[str]) -> Dict[str, bool]:
+    """
+    Complete several deposits, with one payout pipeline per hot wallet.
+
+    Each hot wallet's payouts share its sequence number, so its deposits are
+    completed one after the other, even across assets paid from the same
+    wallet, while the pipelines of different wallets run in parallel, up to
+    ``PAYOUT_MAX_WORKERS`` at a time. A slow or empty hot wallet only holds
+    up its own deposits.
+
+    Args:
+        transaction_ids: IDs of funded deposits, or of deposits in
+            pending_user_transfer_start whose fiat was verified
+
+    Returns:
+        The result of ``complete_deposit`` for each transaction ID
+    """
+    asset_ids, destinations = {}, set()
+    for transaction_id, asset_id, account in Transaction.objects.filter(
+        id__in=transaction_ids, kind=Transaction.KIND.deposit
+    ).values_list("id", "asset_id", "stellar_account"):
+        asset_ids[str(transaction_id)] = asset_id
+        destinations.add(account)
+    results = {}
+    by_wallet = defaultdict(list)
+    for transaction_id in transaction_ids:
+        asset_id = asset_ids.get(str(transaction_id))
+        if asset_id is None:
+            logger.error(f"Transaction {transaction_id} not found")
+            results[transaction_id] = False
+            continue
+        try:
+            hot_wallet = registry.get(asset_id).hot_wallet_public
+        except ValueError as e:
+            logger.error(f"Deposit {transaction_id} cannot be paid out: {e}")
+            results[transaction_id] = False
+            continue
+        by_wallet[hot_wallet].append(transaction_id)
+
+    if not by_wallet:
+        return results
+    if len(destinations) > 1:
+        prefetch_destinations(horizon_pool, destinations)
+    workers = min(settings.PAYOUT_MAX_WORKERS, len(by_wallet))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="payout") as executor:
+        for wallet_results in executor.map(_complete_wallet_deposits, by_wallet.values()):
+            results.update(wallet_results)
+    return results
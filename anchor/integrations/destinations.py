@@ -0,0 +1,91 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, Iterable, NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from stellar_sdk.exceptions import BadRequestError, NotFoundError
+
+from .assets import AnchoredAsset
+from .horizon import PRIORITY_PAYOUT, HorizonPool
+
+logger = logging.getLogger(__name__)
+
+# Operation result codes of a payout the destination could not receive
+NOT_READY_RESULT_CODES = {"op_no_destination", "op_no_trust", "op_not_authorized"}
+
+
+class Destination(NamedTuple):
+    """What a deposit payout needs to know about the receiving account."""
+
+    exists: bool
+    trustlines: FrozenSet[str]  # "CODE:ISSUER" of every authorized trustline
+    checked_at: float
+
+    def trusts(self, anchored: AnchoredAsset) -> bool:
+        return f"{anchored.code}:{anchored.issuer}" in self.trustlines
+
+
+def _key(account: str) -> str:
+    return f"anchor:destination:{account}"
+
+
+def _fetch(horizon: HorizonPool, account: str) -> Destination:
+    try:
+        record = horizon.read(lambda server: server.accounts().account_id(account).call(), PRIORITY_PAYOUT)
+    except NotFoundError:
+        return Destination(False, frozenset(), time.time())
+    trustlines = frozenset(
+        f"{b['asset_code']}:{b['asset_issuer']}"
+        for b in record["balances"]
+        if b.get("asset_code") and b.get("is_authorized", True)
+    )
+    return Destination(True, trustlines, time.time())
+
+
+def _fresh(destination: Destination, anchored: AnchoredAsset) -> bool:
+    # A trustline the account lacked may be added at any moment, so only
+    # positive answers are kept for the full DESTINATION_CACHE_TTL.
+    return destination.trusts(anchored) or time.time() - destination.checked_at < settings.DESTINATION_NOT_READY_TTL
+
+
+def get_destination(horizon: HorizonPool, account: str, anchored: AnchoredAsset) -> Destination:
+    """
+    Whether ``account`` exists and trusts ``anchored``, from the shared cache
+    when the cached answer is recent enough, else from Horizon.
+    """
+    destination = cache.get(_key(account))
+    if destination is None or not _fresh(destination, anchored):
+        destination = _fetch(horizon, account)
+        cache.set(_key(account), destination, settings.DESTINATION_CACHE_TTL)
+    return destination
+
+
+def prefetch_destinations(horizon: HorizonPool, accounts: Iterable[str]) -> Dict[str, Destination]:
+    """
+    Fill the cache for every account not in it yet, with parallel Horizon
+    reads, before a batch of payouts looks them up one by one.
+    """
+    accounts = set(accounts)
+    cached = cache.get_many([_key(a) for a in accounts])
+    missing = [a for a in accounts if _key(a) not in cached]
+    if not missing:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=min(settings.DESTINATION_PREFETCH_WORKERS, len(missing)), thread_name_prefix="destination"
+    ) as executor:
+        fetched = dict(zip(missing, executor.map(lambda a: _fetch(horizon, a), missing)))
+    cache.set_many({_key(a): d for a, d in fetched.items()}, settings.DESTINATION_CACHE_TTL)
+    logger.info(f"Prefetched {len(fetched)} payout destinations")
+    return fetched
+
+
+def forget_destination(account: str):
+    cache.delete(_key(account))
+
+
+def is_not_ready(error: BadRequestError) -> bool:
+    """Whether a payout was rejected because its destination cannot receive the asset."""
+    result_codes = (error.extras or {}).get("result_codes", {})
+    return bool(NOT_READY_RESULT_CODES.intersection(result_codes.get("operations") or []))
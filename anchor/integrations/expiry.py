@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from polaris.models import Transaction
+
+from ..db import transactions_changed
+from .jobs import enqueue
+
+logger = logging.getLogger(__name__)
+
+# (kind, status) of a transaction whose user has not finished the interactive
+# flow (incomplete) or has not sent the funds yet (pending_user_transfer_start).
+# A deposit waits in pending_user_transfer_start until the bank confirms the
+# fiat payment, which can come after the user paid, so it only expires after
+# the separate, opt-in DEPOSIT_TRANSFER_EXPIRE_AFTER_HOURS.
+ABANDONED_STATUSES = (
+    (Transaction.KIND.deposit, Transaction.STATUS.incomplete),
+    (Transaction.KIND.withdrawal, Transaction.STATUS.incomplete),
+    (Transaction.KIND.withdrawal, Transaction.STATUS.pending_user_transfer_start),
+)
+AWAITING_FIAT = (Transaction.KIND.deposit, Transaction.STATUS.pending_user_transfer_start)
+
+# Polaris has no "expired" status, so abandoned transactions end in error
+# with this message, which wallets show to the user.
+EXPIRED_MESSAGE = "Expired: the transaction was not completed in time"
+
+
+def _expire_batch(kind: str, status: str, cutoff, after: Tuple, batch_size: int) -> Tuple[List[tuple], int]:
+    """
+    Expire the next ``batch_size`` transactions of ``kind`` in ``status``
+    started before ``cutoff``, past the ``(started_at, id)`` key ``after``.
+
+    Returns:
+        The rows read (for the next key) and the number expired
+    """
+    queryset = Transaction.objects.filter(kind=kind, status=status, started_at__lt=cutoff)
+    # A withdrawal whose payment was already seen on Stellar is being verified
+    queryset = queryset.filter(stellar_transaction_id__isnull=True)
+    if after:
+        queryset = queryset.filter(Q(started_at__gt=after[0]) | Q(started_at=after[0], id__gt=after[1]))
+
+    with db_transaction.atomic():
+        # Rows a worker or the interactive flow holds are skipped, not waited
+        # on; they are no longer abandoned or will be picked up by the next run.
+        rows = list(
+            queryset.select_for_update(skip_locked=True)
+            .order_by("started_at", "id")
+            .values_list("started_at", "id", "stellar_account", "muxed_account", "on_change_callback")[:batch_size]
+        )
+        if not rows:
+            return rows, 0
+        expired = Transaction.objects.filter(id__in=[r[1] for r in rows], status=status).update(
+            status=Transaction.STATUS.error, status_message=EXPIRED_MESSAGE
+        )
+        callbacks = [str(r[1]) for r in rows if r[4] and r[4].lower() != "postmessage"]
+        if callbacks:
+            enqueue("transaction_callbacks", {"transaction_ids": callbacks})
+
+    # update() sends no post_save
+    transactions_changed(*{a for r in rows for a in (r[2], r[3])})
+    return rows, expired
+
+
+def _sweeps(older_than_hours: int, deposit_transfer_hours: Optional[int]) -> List[Tuple[str, str, object]]:
+    now = timezone.now()
+    cutoff = now - timedelta(hours=older_than_hours)
+    sweeps = [(kind, status, cutoff) for kind, status in ABANDONED_STATUSES]
+    if deposit_transfer_hours:
+        sweeps.append((*AWAITING_FIAT, now - timedelta(hours=deposit_transfer_hours)))
+    return sweeps
+
+
+def expire_transactions(
+    older_than_hours: int, batch_size: int, dry_run: bool = False, deposit_transfer_hours: Optional[int] = None
+) -> int:
+    """
+    Move transactions abandoned for more than ``older_than_hours`` in
+    incomplete (or, for withdrawals, pending_user_transfer_start) to error.
+
+    Deposits in pending_user_transfer_start are waiting for the bank to
+    confirm the user's fiat payment; erroring them would strand money that
+    arrives late. They only expire after ``deposit_transfer_hours``, which
+    defaults to ``DEPOSIT_TRANSFER_EXPIRE_AFTER_HOURS`` (0: never).
+
+    Each (kind, status) pair is paged through by ``(started_at, id)`` in the
+    order of the ``anchor_txn_open_kind_status_idx`` index, one short DB
+    transaction per batch of UPDATEs, so payout and verification workers are
+    never blocked for long and the run can be interrupted at any point.
+    Clients with an ``on_change_callback`` are notified by a queued
+    ``transaction_callbacks`` job rather than inline.
+
+    Args:
+        older_than_hours: Only transactions started before now - N hours expire
+        batch_size: Number of rows expired per DB transaction
+        dry_run: Count the eligible rows without changing anything
+        deposit_transfer_hours: Cutoff for deposits awaiting fiat, 0 to keep them
+
+    Returns:
+        Number of transactions expired (or eligible, for a dry run)
+    """
+    if deposit_transfer_hours is None:
+        deposit_transfer_hours = settings.DEPOSIT_TRANSFER_EXPIRE_AFTER_HOURS
+    sweeps = _sweeps(older_than_hours, deposit_transfer_hours)
+
+    if dry_run:
+        return sum(
+            Transaction.objects.filter(
+                kind=kind, status=status, started_at__lt=cutoff, stellar_transaction_id__isnull=True
+            ).count()
+            for kind, status, cutoff in sweeps
+        )
+
+    total = 0
+    for kind, status, cutoff in sweeps:
+        after = None
+        while True:
+            rows, expired = _expire_batch(kind, status, cutoff, after, batch_size)
+            if not rows:
+                break
+            after = rows[-1][:2]
+            total += expired
+            logger.info(f"Expired {expired} {status} {kind}s ({total} total, cutoff {cutoff.isoformat()})")
+    return total
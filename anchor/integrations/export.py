@@ -0,0 +1,167 @@
+import csv
+import io
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from django.db.models import QuerySet
+from polaris.models import Transaction
+
+from ..models import ArchivedTransaction
+
+# Columns of the finance export, in order. bank_details is the withdrawal's
+# to_address or the deposit's from_address (the account entered in the
+# interactive flow).
+COLUMNS = [
+    "id", "kind", "status", "asset_code", "amount_in", "amount_fee", "amount_out",
+    "started_at", "completed_at", "stellar_account", "stellar_transaction_id",
+    "external_transaction_id", "bank_details", "status_message", "archived",
+]
+
+_FIELDS = [
+    "id", "kind", "status", "asset__code", "amount_in", "amount_fee", "amount_out",
+    "started_at", "completed_at", "stellar_account", "stellar_transaction_id",
+    "external_transaction_id", "to_address", "from_address", "status_message",
+]
+
+
+def filter_transactions(
+    queryset: QuerySet,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    kinds: Optional[List[str]] = None,
+    statuses: Optional[List[str]] = None,
+    date_field: str = "started_at",
+) -> QuerySet:
+    """Restrict ``queryset`` to ``start <= date_field < end`` and the given kinds and statuses."""
+    if start:
+        queryset = queryset.filter(**{f"{date_field}__gte": start})
+    if end:
+        queryset = queryset.filter(**{f"{date_field}__lt": end})
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset
+
+
+def transaction_rows(queryset: QuerySet, chunk_size: int) -> Iterator[tuple]:
+    """
+    Export rows of a ``Transaction`` queryset, in ``COLUMNS`` order.
+
+    Rows are fetched ``chunk_size`` at a time through ``.iterator()`` (a
+    server-side cursor on PostgreSQL) as plain tuples, so memory use does not
+    grow with the number of rows and encrypted fields are never decrypted.
+    """
+    rows = queryset.order_by("started_at", "id").values_list(*_FIELDS).iterator(chunk_size=chunk_size)
+    for (id_, kind, status, code, amount_in, fee, amount_out, started_at, completed_at, account,
+         stellar_id, external_id, to_address, from_address, message) in rows:
+        bank_details = to_address if kind == Transaction.KIND.withdrawal else from_address
+        yield (id_, kind, status, code, amount_in, fee, amount_out, started_at, completed_at, account,
+               stellar_id, external_id, bank_details, message, False)
+
+
+def archived_rows(queryset: QuerySet, chunk_size: int) -> Iterator[tuple]:
+    """Export rows of an ``ArchivedTransaction`` queryset, in ``COLUMNS`` order."""
+    rows = queryset.order_by("started_at", "id").values_list(
+        "id", "kind", "status", "asset_code", "amount_in", "amount_fee", "amount_out", "started_at",
+        "completed_at", "stellar_account", "stellar_transaction_id", "external_transaction_id", "data",
+    ).iterator(chunk_size=chunk_size)
+    for row in rows:
+        data = row[-1]
+        bank_details = data.get("to_address") if row[1] == Transaction.KIND.withdrawal else data.get("from_address")
+        yield row[:-1] + (bank_details, data.get("status_message"), True)
+
+
+def export_rows(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    kinds: Optional[List[str]] = None,
+    statuses: Optional[List[str]] = None,
+    date_field: str = "started_at",
+    include_archived: bool = False,
+    chunk_size: int = 2000,
+) -> Iterator[tuple]:
+    """Rows of live (then, optionally, archived) transactions matching the filters."""
+    yield from transaction_rows(
+        filter_transactions(Transaction.objects.all(), start, end, kinds, statuses, date_field), chunk_size
+    )
+    if include_archived:
+        yield from archived_rows(
+            filter_transactions(ArchivedTransaction.objects.all(), start, end, kinds, statuses, date_field),
+            chunk_size,
+        )
+
+
+# A text cell starting with one of these is run as a formula by spreadsheets
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _safe_cell(value):
+    # Bank details, memos and status messages come from users: quote them so
+    # a value like "=HYPERLINK(...)" is shown, not evaluated
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows: Iterable[tuple], rows_per_chunk: int = 500) -> Iterator[str]:
+    """
+    CSV text of a header and ``rows``, ``rows_per_chunk`` rows per string.
+    Text cells that a spreadsheet would read as a formula are prefixed with "'".
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow([_safe_cell(value) for value in row])
+        count += 1
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_parquet(rows: Iterable[tuple], path: str, rows_per_group: int) -> int:
+    """
+    Write ``rows`` to a Parquet file, one row group per ``rows_per_group``
+    rows. Needs pyarrow, which is optional.
+
+    Returns:
+        The number of rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (name, pa.timestamp("us", tz="UTC") if name in ("started_at", "completed_at")
+         else pa.bool_() if name == "archived"
+         else pa.string())
+        for name in COLUMNS
+    ])
+    written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        group: List[tuple] = []
+        for row in rows:
+            group.append(row)
+            if len(group) == rows_per_group:
+                written += _write_group(writer, schema, group)
+                group = []
+        if group:
+            written += _write_group(writer, schema, group)
+    return written
+
+
+def _write_group(writer, schema, group: List[tuple]) -> int:
+    import pyarrow as pa
+
+    columns = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in group]
+        if pa.types.is_string(field.type):
+            # Amounts keep their exact decimal text
+            values = [None if v is None else str(v) for v in values]
+        columns.append(pa.array(values, type=field.type))
+    writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+    return len(group)
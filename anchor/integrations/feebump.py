@@ -0,0 +1,168 @@
+import logging
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from polaris.models import Transaction
+from stellar_sdk import FeeBumpTransactionEnvelope, TransactionBuilder, TransactionEnvelope
+from stellar_sdk.exceptions import BaseRequestError
+
+from ..models import PayoutEnvelope
+from .assets import registry
+from .horizon import PRIORITY_PAYOUT, HorizonPool, horizon_pool
+from .payouts import finalize_payout, forget_source_account, ledger_state, mark_envelope
+from .signing import SigningError, sign_envelope
+
+logger = logging.getLogger(__name__)
+
+FEE_LEVEL_KEY = "anchor:fee-level"
+
+# stellar-core only lets a transaction replace one already in its queue if
+# it pays at least ten times the fee rate.
+REPLACE_BY_FEE_FACTOR = 10
+
+
+def fee_level(horizon: HorizonPool) -> int:
+    """
+    Fee per operation, in stroops, that gets a transaction into the next
+    ledgers: the ``FEE_LEVEL_PERCENTILE`` of the fees charged recently, never
+    below the base fee. Shared by all processes for ``FEE_LEVEL_TTL`` seconds.
+    """
+    level = cache.get(FEE_LEVEL_KEY)
+    if level is None:
+        stats = horizon.read(lambda server: server.fee_stats().call(), PRIORITY_PAYOUT)
+        level = max(
+            int(stats["fee_charged"][f"p{settings.FEE_LEVEL_PERCENTILE}"]), int(stats["last_ledger_base_fee"])
+        )
+        cache.set(FEE_LEVEL_KEY, level, settings.FEE_LEVEL_TTL)
+    return level
+
+
+def _offered_fee(envelope: PayoutEnvelope, inner: TransactionEnvelope) -> int:
+    """Fee per operation of the latest version of the payout sent to the network."""
+    if envelope.fee_bump_xdr:
+        bump = FeeBumpTransactionEnvelope.from_xdr(envelope.fee_bump_xdr, settings.STELLAR_NETWORK_PASSPHRASE)
+        return bump.transaction.base_fee
+    return inner.transaction.fee // len(inner.transaction.operations)
+
+
+def _bump(horizon: HorizonPool, envelope: PayoutEnvelope, inner: TransactionEnvelope) -> str:
+    """
+    Resubmit ``envelope`` wrapped in a fee bump paid by ``FEE_ACCOUNT``.
+
+    Returns:
+        "confirmed" if the bump landed, else "bumped" (submitted, outcome
+        unknown) or "pending" (not bumped)
+    """
+    offered = _offered_fee(envelope, inner)
+    level = fee_level(horizon)
+    if level <= offered:
+        # The payout already pays the going rate; it is late for another reason
+        return "pending"
+    base_fee = max(level, offered * REPLACE_BY_FEE_FACTOR)
+    if base_fee > settings.FEE_BUMP_MAX_FEE:
+        logger.warning(
+            f"Payout {envelope.tx_hash} needs a fee of {base_fee} stroops to be replaced, "
+            f"above FEE_BUMP_MAX_FEE; leaving it to expire"
+        )
+        return "pending"
+
+    bump = TransactionBuilder.build_fee_bump_transaction(
+        settings.FEE_ACCOUNT, base_fee, inner, settings.STELLAR_NETWORK_PASSPHRASE
+    )
+    sign_envelope(settings.FEE_ACCOUNT, bump)
+    PayoutEnvelope.objects.filter(transaction_id=envelope.transaction_id, tx_hash=envelope.tx_hash).update(
+        fee_bump_xdr=bump.to_xdr(), updated_at=timezone.now()
+    )
+    logger.info(f"Fee-bumped payout {envelope.tx_hash} from {offered} to {base_fee} stroops per operation")
+    try:
+        horizon.submit(bump)
+    except BaseRequestError as e:
+        # Still undecided: the next sweep finds it on the ledger or expires it
+        logger.warning(f"Fee bump of payout {envelope.tx_hash} not accepted yet: {e}")
+        return "bumped"
+    return "confirmed"
+
+
+def bump_stalled_payouts(horizon: HorizonPool = None) -> Dict[str, List[str]]:
+    """
+    Settle deposit payouts submitted more than ``FEE_BUMP_AFTER`` seconds ago
+    whose outcome is still unknown, typically because Horizon timed out while
+    the network was surging.
+
+    Each one is, in this order:
+
+    - confirmed, completing its Polaris transaction, if it is on the ledger;
+    - marked failed if it is on the ledger but failed, so ``complete_deposit``
+      builds a new payout;
+    - expired (marked failed, so ``complete_deposit`` builds a new payout at
+      the current fee) if a ledger closed after its time bounds without it;
+    - otherwise, while ``fee_level`` is above what it offers, fee-bumped
+      from ``FEE_ACCOUNT`` and resubmitted.
+
+    A payout is thus settled at the latest ``PAYOUT_TIMEOUT`` seconds after
+    it was signed, plus a sweep interval. Payouts of deleted transactions or
+    unanchored assets are skipped with a warning and reported as pending.
+
+    Returns:
+        Transaction ids by outcome: "confirmed", "failed", "expired",
+        "bumped" and "pending"
+    """
+    horizon = horizon or horizon_pool
+    outcomes: Dict[str, List[str]] = {k: [] for k in ("confirmed", "failed", "expired", "bumped", "pending")}
+    envelopes = list(
+        PayoutEnvelope.objects.filter(
+            status=PayoutEnvelope.STATUS.submitted,
+            updated_at__lt=timezone.now() - timedelta(seconds=settings.FEE_BUMP_AFTER),
+        ).order_by("created_at")
+    )
+    if not envelopes:
+        return outcomes
+    asset_ids = dict(
+        Transaction.objects.filter(id__in=[e.transaction_id for e in envelopes]).values_list("id", "asset_id")
+    )
+
+    for envelope in envelopes:
+        transaction_id = str(envelope.transaction_id)
+        asset_id = asset_ids.get(envelope.transaction_id)
+        if asset_id is None:
+            logger.warning(f"Skipping stalled payout {envelope.tx_hash}: transaction {transaction_id} no longer exists")
+            outcomes["pending"].append(transaction_id)
+            continue
+        try:
+            hot_wallet = registry.get(asset_id).hot_wallet_public
+        except ValueError as e:
+            logger.warning(f"Skipping stalled payout {envelope.tx_hash} of transaction {transaction_id}: {e}")
+            outcomes["pending"].append(transaction_id)
+            continue
+        inner = TransactionEnvelope.from_xdr(envelope.envelope_xdr, settings.STELLAR_NETWORK_PASSPHRASE)
+        try:
+            state = ledger_state(horizon, envelope)
+            if state.record is not None and state.record["successful"]:
+                outcome = "confirmed"
+            elif state.record is not None:
+                outcome = "failed"
+            elif state.expired:
+                outcome = "expired"
+            elif settings.FEE_ACCOUNT:
+                outcome = _bump(horizon, envelope, inner)
+            else:
+                outcome = "pending"
+        except (BaseRequestError, SigningError) as e:
+            logger.warning(f"Could not settle stalled payout {envelope.tx_hash}, retrying next sweep: {e}")
+            outcome = "pending"
+
+        if outcome == "confirmed":
+            finalize_payout(Transaction.objects.get(id=envelope.transaction_id), envelope)
+            logger.info(f"Stalled payout {envelope.tx_hash} for transaction {transaction_id} confirmed")
+        elif outcome in ("failed", "expired"):
+            mark_envelope(envelope, PayoutEnvelope.STATUS.failed)
+            # An expired payout left its sequence number unused
+            forget_source_account(hot_wallet)
+            logger.warning(f"Stalled payout {envelope.tx_hash} for transaction {transaction_id} {outcome}")
+        outcomes[outcome].append(transaction_id)
+
+    logger.info(f"Stalled payouts: {', '.join(f'{k} {len(v)}' for k, v in outcomes.items())}")
+    return outcomes
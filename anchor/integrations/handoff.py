@@ -0,0 +1,128 @@
+import hashlib
+import hmac
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from polaris.models import Transaction
+
+# Keeps handoff tokens from being accepted anywhere else SECRET_KEY-derived
+# signatures are used.
+SALT = "anchor.interactive.handoff"
+
+KIND_CODES = {"deposit": "d", "withdraw": "w"}
+
+# Query parameters the interactive UI sends back to /interactive/complete.
+# These are the values after_interactive_flow copies onto the Transaction, so
+# they are the ones covered by the return signature.
+SIGNED_FIELDS = (
+    "transaction_id",
+    "amount",
+    "amount_out",
+    "amount_fee",
+    "memo_type",
+    "hashed",
+    "account",
+    "externalId",
+    "callback",
+)
+
+
+class HandoffError(ValueError):
+    """Raised when a handoff token or return signature does not verify."""
+
+
+def handoff_enabled() -> bool:
+    """Whether ``INTERACTIVE_HANDOFF_SECRET`` is set, i.e. handoff tokens are issued and checked."""
+    return bool(settings.INTERACTIVE_HANDOFF_SECRET)
+
+
+def _secret() -> str:
+    if not handoff_enabled():
+        raise HandoffError("handoff signing is disabled: INTERACTIVE_HANDOFF_SECRET is not set")
+    return settings.INTERACTIVE_HANDOFF_SECRET
+
+
+def create_handoff(kind: str, transaction: Transaction, asset_code: str, callback: Optional[str]) -> str:
+    """
+    Sign the session context the interactive UI needs into a compact token.
+
+    The token is a ``django.core.signing`` string (HMAC-SHA256 over
+    ``INTERACTIVE_HANDOFF_SECRET``) that carries the transaction id, kind,
+    asset, wallet account and callback, plus its creation time so it expires
+    after ``INTERACTIVE_HANDOFF_MAX_AGE`` seconds. The UI backend shares the
+    secret and can verify it without the SEP-10 JWT or a call back to us.
+    """
+    payload = {
+        "t": transaction.id.hex,
+        "k": KIND_CODES[kind],
+        "a": asset_code,
+        "w": transaction.stellar_account,
+    }
+    if callback:
+        payload["c"] = callback
+    return signing.TimestampSigner(key=_secret(), salt=SALT).sign_object(
+        payload, compress=True
+    )
+
+
+def read_handoff(token: str) -> Dict:
+    """
+    Verify a handoff token and return its payload.
+
+    Raises:
+        HandoffError: if the token is malformed, tampered with or expired, or
+            handoff signing is disabled
+    """
+    signer = signing.TimestampSigner(key=_secret(), salt=SALT)
+    try:
+        return signer.unsign_object(token, max_age=settings.INTERACTIVE_HANDOFF_MAX_AGE)
+    except signing.SignatureExpired:
+        raise HandoffError("handoff token expired")
+    except signing.BadSignature:
+        raise HandoffError("invalid handoff token")
+
+
+def _canonical(params: Dict[str, Optional[str]]) -> bytes:
+    # Form-encoded so no value can smuggle in a "&" or "=" and shift the
+    # boundary between two fields
+    return urlencode([(name, params.get(name) or "") for name in SIGNED_FIELDS]).encode()
+
+
+def sign_return(params: Dict[str, Optional[str]]) -> str:
+    """
+    HMAC-SHA256 (hex) of the returned fields, as the UI backend computes it:
+    over the ``SIGNED_FIELDS`` in that order, form-encoded as
+    ``application/x-www-form-urlencoded`` (missing fields empty).
+    """
+    return hmac.new(_secret().encode(), _canonical(params), hashlib.sha256).hexdigest()
+
+
+def verify_return(params: Dict[str, Optional[str]], kind: str, transaction: Transaction):
+    """
+    Check that the parameters sent back by the interactive UI belong to
+    ``transaction`` and were not altered in the browser.
+
+    Only the token and the HMAC are checked, so this costs no DB or
+    network round-trip.
+
+    Args:
+        params: Query parameters of the /interactive/complete request
+        kind: "deposit" or "withdraw"
+        transaction: The transaction Polaris loaded for the request
+
+    Raises:
+        HandoffError: if any check fails or handoff signing is disabled
+    """
+    token = params.get("handoff")
+    signature = params.get("signature")
+    if not token or not signature:
+        raise HandoffError("missing handoff token or signature")
+
+    payload = read_handoff(token)
+    if payload.get("t") != transaction.id.hex or payload.get("k") != KIND_CODES[kind]:
+        raise HandoffError("handoff token does not match transaction")
+
+    if not hmac.compare_digest(sign_return(params), signature):
+        raise HandoffError("invalid return signature")
@@ -0,0 +1,366 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from django.conf import settings
+from stellar_sdk import Server
+from stellar_sdk.client.requests_client import RequestsClient
+from stellar_sdk.client.response import Response
+from stellar_sdk.exceptions import BadRequestError, BadResponseError, BaseRequestError, ConnectionError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EWMA_ALPHA = 0.2
+LATENCY_SAMPLES = 100
+
+# Request priorities, most urgent first. When the rate limit is tight,
+# payouts go ahead of everything else and background scans leave
+# HORIZON_BACKGROUND_RESERVE of the budget untouched.
+PRIORITY_PAYOUT = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BACKGROUND = 2
+
+_local = threading.local()
+
+
+def is_transient(error: BaseRequestError) -> bool:
+    """
+    Whether the outcome of a request is unknown rather than a rejection.
+
+    After a timeout, a 5xx or a rate limit the node is unhealthy and, for a
+    payout, the transaction may still land, so the stored envelope must be
+    kept and resubmitted rather than rebuilt.
+    """
+    if isinstance(error, (ConnectionError, BadResponseError)):
+        return True
+    return isinstance(error, BadRequestError) and error.status == 429
+
+
+def _header(headers: dict, name: str) -> Optional[float]:
+    for key, value in headers.items():
+        if key.lower() == name:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+class RateLimiter:
+    """
+    Token bucket for one Horizon node, shared by every thread of the process.
+
+    Refills at ``HORIZON_RATE_LIMIT`` requests per hour, up to
+    ``HORIZON_RATE_BURST`` tokens, and is corrected by the
+    ``X-Ratelimit-Remaining``/``X-Ratelimit-Reset`` headers of each response,
+    so other clients behind the same IP are accounted for. Waiting requests
+    are served by priority.
+    """
+
+    def __init__(self, per_hour: int, burst: int):
+        self.rate = per_hour / 3600
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._waiting = Counter()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority: int = PRIORITY_DEFAULT):
+        floor = 0.0
+        if priority >= PRIORITY_BACKGROUND:
+            floor = min(self.capacity * settings.HORIZON_BACKGROUND_RESERVE, self.capacity - 1)
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    ahead = any(self._waiting[p] for p in range(priority))
+                    if now >= self.paused_until and not ahead and self.tokens - 1 >= floor:
+                        self.tokens -= 1
+                        return
+                    if now < self.paused_until:
+                        delay = self.paused_until - now
+                    else:
+                        delay = max(floor + 1 - self.tokens, 0) / self.rate
+                    self._cond.wait(timeout=min(max(delay, 0.01), 1.0))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def observe(self, headers: dict):
+        remaining = _header(headers, "x-ratelimit-remaining")
+        if remaining is None:
+            return
+        with self._cond:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+            if remaining < 1:
+                reset = _header(headers, "x-ratelimit-reset")
+                self.pause(reset if reset is not None else 1 / self.rate)
+
+    def pause(self, seconds: float):
+        with self._cond:
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimitedClient(RequestsClient):
+    """
+    ``RequestsClient`` that takes a token from the node's ``RateLimiter``
+    before every request and reads the rate-limit headers of every response.
+
+    A 429 puts the request back in the queue until the limit resets instead
+    of failing it; only after ``HORIZON_RATE_LIMIT_MAX_WAIT`` seconds is the
+    429 returned to the caller. Horizon rejects a rate-limited submission
+    before looking at it, so resending it is safe.
+    """
+
+    def __init__(self, limiter: RateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def get(self, url: str, params: Dict[str, str] = None) -> Response:
+        return self._scheduled(super().get, url, params)
+
+    def post(self, url: str, data: Dict[str, str] = None, json_data: Dict[str, Any] = None) -> Response:
+        return self._scheduled(super().post, url, data, json_data)
+
+    def _scheduled(self, send: Callable[..., Response], *args) -> Response:
+        priority = getattr(_local, "priority", PRIORITY_DEFAULT)
+        deadline = time.monotonic() + settings.HORIZON_RATE_LIMIT_MAX_WAIT
+        while True:
+            self.limiter.acquire(priority)
+            response = send(*args)
+            self.limiter.observe(response.headers)
+            if response.status_code != 429 or time.monotonic() >= deadline:
+                return response
+            retry_after = _header(response.headers, "retry-after") or _header(response.headers, "x-ratelimit-reset")
+            logger.info(f"Horizon rate limit hit on {response.url}, queued for {retry_after or 1:.0f}s")
+            self.limiter.pause(retry_after or 1)
+
+
+class Endpoint:
+    """
+    One Horizon node and its health: a latency EWMA, a window of recent
+    latencies for the hedge delay, and a circuit breaker that opens after
+    ``HORIZON_BREAKER_THRESHOLD`` consecutive failures and lets one trial
+    request through once ``HORIZON_BREAKER_COOLDOWN`` seconds have passed
+    (half-open). The circuit closes when the trial succeeds and opens for
+    another cooldown when it fails; other requests are refused meanwhile.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.limiter = RateLimiter(settings.HORIZON_RATE_LIMIT, settings.HORIZON_RATE_BURST)
+        self.server = Server(
+            horizon_url=url,
+            client=RateLimitedClient(self.limiter, num_retries=0, request_timeout=settings.HORIZON_TIMEOUT),
+        )
+        self.ewma: Optional[float] = None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial = False
+        self._lock = threading.Lock()
+
+    def available(self, now: float) -> bool:
+        return self.open_until <= now and not self.trial
+
+    def admit(self, now: float) -> bool:
+        """
+        Whether a request may be sent now. Once the circuit is half-open the
+        first caller gets the trial and every other one is refused until its
+        outcome is recorded.
+        """
+        with self._lock:
+            if self.open_until > now or self.trial:
+                return False
+            if self.open_until:
+                self.trial = True
+            return True
+
+    def release(self):
+        """Give back a trial that ended without a Horizon answer."""
+        with self._lock:
+            self.trial = False
+
+    def score(self) -> float:
+        """Expected latency in seconds; lower is healthier."""
+        return (self.ewma if self.ewma is not None else settings.HORIZON_HEDGE_DELAY) * (1 + self.failures)
+
+    def hedge_delay(self) -> float:
+        """How long to wait on this node before asking another: its p95 latency."""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < 20:
+            return settings.HORIZON_HEDGE_DELAY
+        return max(samples[int(len(samples) * 0.95) - 1], settings.HORIZON_HEDGE_MIN_DELAY)
+
+    def record_success(self, elapsed: float):
+        with self._lock:
+            self.latencies.append(elapsed)
+            self.ewma = elapsed if self.ewma is None else EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.ewma
+            self.failures = 0
+            self.open_until = 0.0
+            self.trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.trial = False
+            self.failures += 1
+            if self.failures >= settings.HORIZON_BREAKER_THRESHOLD:
+                self.open_until = time.monotonic() + settings.HORIZON_BREAKER_COOLDOWN
+                logger.warning(f"Horizon {self.url} failed {self.failures} times in a row, circuit open")
+
+
+class HorizonPool:
+    """
+    Access to Horizon through the endpoints in ``HORIZON_URLS``.
+
+    Requests are written as a function of a ``stellar_sdk.Server``, e.g.
+    ``pool.read(lambda server: server.transactions().transaction(h).call())``,
+    so the pool can choose, or race, the node that serves them.
+
+    - ``read`` is for idempotent requests. It goes to the healthiest node and,
+      if that node has not answered within its p95 latency, is hedged to the
+      next one; the first answer wins. A node that fails is failed over
+      immediately.
+    - ``submit`` sends a transaction to the healthiest node only, and never
+      retries: after an unknown outcome the caller must check the ledger.
+    - ``read_all`` asks every node at once, for ledger checks that decide
+      whether a payout is rebuilt.
+
+    Node failures (timeouts, 5xx, rate limits) count against a node's health.
+    Any other Horizon error, such as a 404, is a valid answer and is raised
+    as is.
+
+    Every request carries a priority (``PRIORITY_PAYOUT``, ``PRIORITY_DEFAULT``
+    or ``PRIORITY_BACKGROUND``) that orders it in the node's rate limiter.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.endpoints = [Endpoint(url) for url in urls]
+        # One pool per priority: background reads waiting in a rate limiter
+        # must not hold the threads payout reads need.
+        self._executors = {
+            priority: ThreadPoolExecutor(
+                max_workers=max(2, 2 * len(self.endpoints)), thread_name_prefix=f"horizon-p{priority}"
+            )
+            for priority in (PRIORITY_PAYOUT, PRIORITY_DEFAULT, PRIORITY_BACKGROUND)
+        }
+
+    def ranked(self) -> List[Endpoint]:
+        """Endpoints healthiest first, skipping open circuits unless every circuit is open."""
+        now = time.monotonic()
+        available = [e for e in self.endpoints if e.available(now)]
+        if not available:
+            return sorted(self.endpoints, key=lambda e: e.open_until)
+        return sorted(available, key=Endpoint.score)
+
+    def _call(
+        self,
+        endpoint: Endpoint,
+        request: Callable[[Server], T],
+        priority: int = PRIORITY_DEFAULT,
+        running: Optional[threading.Event] = None,
+    ) -> T:
+        if running is not None:
+            running.set()
+        _local.priority = priority
+        started = time.monotonic()
+        if not endpoint.admit(started):
+            # Transient, so reads fail over and payouts stay pending
+            raise ConnectionError(f"Horizon {endpoint.url} circuit is open")
+        try:
+            result = request(endpoint.server)
+        except BaseRequestError as e:
+            if is_transient(e):
+                endpoint.record_failure()
+            else:
+                endpoint.record_success(time.monotonic() - started)
+            raise
+        except BaseException:
+            endpoint.release()
+            raise
+        endpoint.record_success(time.monotonic() - started)
+        return result
+
+    def read(self, request: Callable[[Server], T], priority: int = PRIORITY_DEFAULT) -> T:
+        endpoints = self.ranked()
+        if len(endpoints) == 1:
+            return self._call(endpoints[0], request, priority)
+
+        executor = self._executors[priority]
+        primary, backups = endpoints[0], iter(endpoints[1:])
+        running = threading.Event()
+        pending = {executor.submit(self._call, primary, request, priority, running)}
+        # The hedge delay counts from when the primary request starts, not
+        # from when it was queued for a thread
+        running.wait()
+        delay = primary.hedge_delay()
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # The primary is slower than usual: race a second node
+                backup = next(backups, None)
+                if backup is not None:
+                    logger.debug(f"Hedging Horizon read to {backup.url} after {delay:.3f}s")
+                    pending.add(executor.submit(self._call, backup, request, priority))
+                delay = None
+                continue
+            for future in done:
+                try:
+                    return future.result()
+                except BaseRequestError as e:
+                    if not is_transient(e):
+                        raise
+                    error = e
+            if not pending:
+                backup = next(backups, None)
+                if backup is not None:
+                    pending.add(executor.submit(self._call, backup, request, priority))
+        raise error
+
+    def read_all(self, request: Callable[[Server], T], priority: int = PRIORITY_DEFAULT) -> List[T]:
+        """
+        Send ``request`` to every available node at once, without hedging,
+        and return the answers of the nodes that gave one.
+
+        For reads whose answer depends on how far a node has ingested the
+        ledger, such as whether a transaction was applied: the 404 of a node
+        that lags behind proves nothing, so no single answer may decide.
+        Raises the last node failure if no node answered.
+        """
+        executor = self._executors[priority]
+        futures = [executor.submit(self._call, endpoint, request, priority) for endpoint in self.ranked()]
+        results, error = [], None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except BaseRequestError as e:
+                if not is_transient(e):
+                    raise
+                error = e
+        if not results:
+            raise error
+        return results
+
+    def submit(self, transaction_envelope) -> dict:
+        return self._call(
+            self.ranked()[0], lambda server: server.submit_transaction(transaction_envelope), PRIORITY_PAYOUT
+        )
+
+
+horizon_pool = HorizonPool(settings.HORIZON_URLS)
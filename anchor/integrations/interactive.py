@@ -0,0 +1,65 @@
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import quote_plus
+
+from django.conf import settings
+from polaris.models import Transaction, Asset
+
+from .handoff import create_handoff, handoff_enabled
+
+
+@lru_cache(maxsize=None)
+def ui_base_url(asset_code: str) -> str:
+    """
+    Base URL of the standalone interactive UI for ``asset_code``.
+
+    Resolved from settings once per process: ``INTERACTIVE_UI_URLS`` can
+    point an asset at its own UI, otherwise ``INTERACTIVE_UI_URL`` (which
+    already depends on ``ENVIRONMENT``) is used.
+    """
+    return settings.INTERACTIVE_UI_URLS.get(asset_code, settings.INTERACTIVE_UI_URL)
+
+
+@lru_cache(maxsize=None)
+def _url_prefix(kind: str, asset_code: str) -> str:
+    # Everything up to the per-transaction parameters is the same for every
+    # transaction of a kind and asset, so it is encoded once.
+    return f"{ui_base_url(asset_code)}?type={quote_plus(kind)}&asset_code={quote_plus(asset_code)}"
+
+
+def build_interactive_url(
+    kind: str,
+    asset: Asset,
+    transaction: Transaction,
+    token: Optional[str],
+    callback: Optional[str],
+) -> str:
+    """
+    Build the URL of the standalone interactive UI for ``transaction``.
+
+    The session context travels as a signed ``handoff`` token. While
+    ``INTERACTIVE_UI_LEGACY_PARAMS`` is on, or no ``INTERACTIVE_HANDOFF_SECRET``
+    is set, the raw transaction id, SEP-10 token, wallet and callback are
+    included for UIs that do not use the handoff token.
+
+    Args:
+        kind: "deposit" or "withdraw", as expected by the UI
+        asset: The Polaris asset of the transaction
+        transaction: The transaction the UI will collect details for
+        token: The SEP-10 token the wallet opened the interactive flow with
+        callback: The wallet's callback, passed through untouched
+
+    Returns:
+        The absolute URL to redirect the user to
+    """
+    url = _url_prefix(kind, asset.code)
+    if handoff_enabled():
+        url += f"&handoff={create_handoff(kind, transaction, asset.code, callback)}"
+    if settings.INTERACTIVE_UI_LEGACY_PARAMS or not handoff_enabled():
+        url += (
+            f"&transaction_id={quote_plus(str(transaction.id))}"
+            f"&token={quote_plus(str(token))}"
+            f"&wallet={quote_plus(str(transaction.stellar_account))}"
+            f"&callback={quote_plus(str(callback))}"
+        )
+    return url
@@ -0,0 +1,211 @@
+import importlib
+import logging
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from polaris.models import Transaction
+from polaris.utils import maybe_make_callback
+
+from ..models import Job
+from .catchup import scan_withdrawal_payments
+from .deposit import complete_deposit
+from .feebump import bump_stalled_payouts
+from .payouts import recover_payouts
+from .rebalance import rebalance_hot_wallets
+from .withdraw import process_withdrawal
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict], Any]
+
+_HANDLERS: Dict[str, JobHandler] = {}
+
+
+class RetryJob(Exception):
+    """Raised by a handler whose work could not be done yet and should be retried later."""
+
+
+def job(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    Register the decorated function as the handler of jobs of ``kind``.
+
+    The handler gets the job's payload and may return any JSON-serializable
+    result. Modules listed in ``ANCHOR_JOB_MODULES`` are imported by the
+    worker, so they can register handlers of their own.
+    """
+    def register(handler: JobHandler) -> JobHandler:
+        _HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+def load_job_modules():
+    for module in settings.ANCHOR_JOB_MODULES:
+        importlib.import_module(module)
+
+
+def enqueue(kind: str, payload: Optional[Dict] = None, priority: int = 0, run_after=None) -> Job:
+    if kind not in _HANDLERS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        priority=priority,
+        run_after=run_after or timezone.now(),
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim_jobs(worker: str, limit: int, kinds: Optional[Iterable[str]] = None) -> List[Job]:
+    """
+    Lock up to ``limit`` runnable jobs for ``worker``.
+
+    Runnable means queued and due, or running but locked longer than
+    ``JOB_LOCK_TIMEOUT`` seconds ago by a worker that presumably died. Rows
+    locked by a concurrent claim are skipped rather than waited on.
+    """
+    now = timezone.now()
+    runnable = Q(status=Job.STATUS.queued, run_after__lte=now) | Q(
+        status=Job.STATUS.running, locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    )
+    with db_transaction.atomic():
+        queryset = Job.objects.select_for_update(skip_locked=True).filter(runnable)
+        if kinds:
+            queryset = queryset.filter(kind__in=kinds)
+        jobs = list(queryset.order_by("-priority", "run_after")[:limit])
+        if jobs:
+            Job.objects.filter(id__in=[j.id for j in jobs]).update(
+                status=Job.STATUS.running, locked_by=worker, locked_at=now, attempts=F("attempts") + 1
+            )
+    for j in jobs:
+        j.status, j.locked_by, j.locked_at, j.attempts = Job.STATUS.running, worker, now, j.attempts + 1
+    return jobs
+
+
+def run_job(j: Job) -> bool:
+    """
+    Run a claimed job and record its outcome.
+
+    A handler that raises is retried with exponential backoff from
+    ``JOB_RETRY_DELAY`` seconds until the job has used ``max_attempts``.
+
+    Returns:
+        True if the job is done
+    """
+    handler = _HANDLERS.get(j.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"no handler for job kind {j.kind!r}")
+        j.result = handler(j.payload)
+        j.status = Job.STATUS.done
+        j.last_error = None
+        logger.info(f"Job {j} finished")
+    except Exception as e:
+        j.last_error = f"{type(e).__name__}: {e}"
+        if handler is not None and j.attempts < j.max_attempts:
+            j.status = Job.STATUS.queued
+            j.run_after = timezone.now() + timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (j.attempts - 1))
+            logger.warning(f"Job {j} attempt {j.attempts} failed, retrying at {j.run_after}: {e}")
+        else:
+            j.status = Job.STATUS.failed
+            logger.error(f"Job {j} failed after {j.attempts} attempts: {e}", exc_info=not isinstance(e, RetryJob))
+    j.locked_by = None
+    j.locked_at = None
+    j.save(update_fields=["status", "result", "last_error", "run_after", "locked_by", "locked_at", "updated_at"])
+    return j.status == Job.STATUS.done
+
+
+@job("complete_deposit")
+def _complete_deposit(payload: Dict) -> bool:
+    if complete_deposit(payload["transaction_id"]):
+        return True
+    status = Transaction.objects.filter(id=payload["transaction_id"]).values_list("status", flat=True).first()
+    if status in (Transaction.STATUS.pending_anchor, Transaction.STATUS.pending_trust):
+        # Horizon was unavailable, the hot wallet is short or the destination
+        # has no trustline yet; nothing was paid
+        raise RetryJob(f"deposit {payload['transaction_id']} is still {status}")
+    return False
+
+
+@job("verify_withdrawal")
+def _verify_withdrawal(payload: Dict) -> bool:
+    if process_withdrawal(payload["transaction_id"], payload["stellar_transaction_id"]):
+        return True
+    status = Transaction.objects.filter(id=payload["transaction_id"]).values_list("status", flat=True).first()
+    if status == Transaction.STATUS.pending_user_transfer_start:
+        raise RetryJob(f"withdrawal {payload['transaction_id']} is still pending_user_transfer_start")
+    return False
+
+
+@job("catchup_withdrawals")
+def _catchup_withdrawals(payload: Dict) -> Dict:
+    matches, scanned = scan_withdrawal_payments(apply=payload.get("apply", True), max_pages=payload.get("max_pages"))
+    return {"scanned": scanned, "matched": [m.transaction_id for m in matches if m.applied]}
+
+
+@job("recover_payouts")
+def _recover_payouts(payload: Dict) -> Dict:
+    return recover_payouts()
+
+
+@job("transaction_callbacks")
+def _transaction_callbacks(payload: Dict) -> int:
+    # Failed callbacks are logged by Polaris, not retried: the client can
+    # still poll the transaction.
+    transactions = (
+        Transaction.objects.filter(id__in=payload["transaction_ids"])
+        .select_related("asset")
+        .defer("channel_seed", "asset__distribution_seed")
+    )
+    for transaction in transactions:
+        maybe_make_callback(transaction)
+    return len(transactions)
+
+
+@job("bump_payouts")
+def _bump_payouts(payload: Dict) -> Dict:
+    try:
+        outcomes = bump_stalled_payouts()
+        # Failed and expired payouts are rebuilt by complete_deposit; queue it
+        # unless a job for the deposit is already waiting to retry.
+        for transaction_id in outcomes["failed"] + outcomes["expired"]:
+            if not Job.objects.filter(
+                kind="complete_deposit",
+                payload__transaction_id=transaction_id,
+                status__in=[Job.STATUS.queued, Job.STATUS.running],
+            ).exists():
+                enqueue("complete_deposit", {"transaction_id": transaction_id})
+        return {outcome: len(ids) for outcome, ids in outcomes.items()}
+    finally:
+        # Keep sweeping every FEE_BUMP_INTERVAL seconds
+        if settings.FEE_BUMP_INTERVAL and not Job.objects.filter(
+            kind="bump_payouts", status=Job.STATUS.queued
+        ).exists():
+            enqueue("bump_payouts", run_after=timezone.now() + timedelta(seconds=settings.FEE_BUMP_INTERVAL))
+
+
+@job("rebalance_hot_wallets")
+def _rebalance_hot_wallets(payload: Dict) -> Dict:
+    try:
+        return {
+            liquidity.asset_code: {
+                "level": liquidity.level,
+                "balance": str(liquidity.balance),
+                "forecast": str(liquidity.forecast),
+                "top_up": liquidity.top_up.id if liquidity.top_up else None,
+            }
+            for liquidity in rebalance_hot_wallets()
+        }
+    finally:
+        # Keep checking every REBALANCE_INTERVAL seconds
+        if settings.REBALANCE_INTERVAL and not Job.objects.filter(
+            kind="rebalance_hot_wallets", status=Job.STATUS.queued
+        ).exists():
+            enqueue(
+                "rebalance_hot_wallets",
+                run_after=timezone.now() + timedelta(seconds=settings.REBALANCE_INTERVAL),
+            )
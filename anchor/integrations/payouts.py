@@ -0,0 +1,285 @@
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterator, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.utils import timezone
+from polaris.models import Transaction
+from stellar_sdk import Account, Server, TransactionEnvelope
+from stellar_sdk.exceptions import BadRequestError, NotFoundError
+
+from ..models import PayoutEnvelope
+from .assets import registry
+from .horizon import PRIORITY_BACKGROUND, PRIORITY_PAYOUT, HorizonPool, horizon_pool, is_transient
+
+logger = logging.getLogger(__name__)
+
+# Transaction result codes proving a stored envelope can never be applied:
+# its time bounds have passed or its sequence number was consumed.
+STALE_RESULT_CODES = {"tx_too_late", "tx_bad_seq"}
+
+_source_accounts: Dict[str, Account] = {}
+_source_locks: Dict[str, threading.Lock] = {}
+_source_locks_lock = threading.Lock()
+
+
+@contextmanager
+def source_account(account_id: str, record: Dict) -> Iterator[Account]:
+    """
+    Hot wallet ``Account`` to build the next payout on, locked while the
+    payout is built.
+
+    The sequence number comes from ``record`` (the account as just read from
+    Horizon) the first time and whenever the ledger is ahead of it; otherwise
+    the one advanced locally by earlier builds is reused. A long-lived worker
+    can thus build payouts back to back without waiting for each one to land.
+    """
+    with _source_locks_lock:
+        lock = _source_locks.setdefault(account_id, threading.Lock())
+    with lock:
+        account = _source_accounts.get(account_id)
+        ledger_sequence = int(record["sequence"])
+        if account is None or account.sequence < ledger_sequence:
+            account = _source_accounts[account_id] = Account(account_id, ledger_sequence)
+        yield account
+
+
+def forget_source_account(account_id: str):
+    """Drop the cached sequence of ``account_id`` after a payout built on it was rejected."""
+    _source_accounts.pop(account_id, None)
+
+
+def load_envelope(transaction_id) -> Optional[PayoutEnvelope]:
+    """Return the signed envelope of a previous attempt at this payout, if one may still land."""
+    return (
+        PayoutEnvelope.objects.filter(transaction_id=transaction_id)
+        .exclude(status=PayoutEnvelope.STATUS.failed)
+        .first()
+    )
+
+
+def save_envelope(transaction: Transaction, stellar_transaction: TransactionEnvelope) -> Optional[PayoutEnvelope]:
+    """
+    Persist a signed payout before it is submitted.
+
+    Takes the place of a failed envelope for the same transaction, if there
+    is one. Storing is a compare-and-set: of two payouts built for one
+    deposit at the same time only the first is stored, and the caller of the
+    second gets None and must discard it unsent.
+    """
+    fields = {
+        "tx_hash": stellar_transaction.hash_hex(),
+        "sequence": stellar_transaction.transaction.sequence,
+        "envelope_xdr": stellar_transaction.to_xdr(),
+        "status": PayoutEnvelope.STATUS.signed,
+        "fee_bump_xdr": "",
+    }
+    replaced = PayoutEnvelope.objects.filter(
+        transaction_id=transaction.id, status=PayoutEnvelope.STATUS.failed
+    ).update(updated_at=timezone.now(), **fields)
+    if replaced:
+        return PayoutEnvelope.objects.get(transaction_id=transaction.id)
+    try:
+        with db_transaction.atomic():
+            return PayoutEnvelope.objects.create(transaction_id=transaction.id, **fields)
+    except IntegrityError:
+        return None
+
+
+def mark_envelope(envelope: PayoutEnvelope, status: str):
+    """
+    Set the status of ``envelope``, unless the stored payout of its
+    transaction has been replaced by another envelope meanwhile.
+    """
+    envelope.status = status
+    PayoutEnvelope.objects.filter(transaction_id=envelope.transaction_id, tx_hash=envelope.tx_hash).update(
+        status=status, updated_at=timezone.now()
+    )
+
+
+class LedgerState(NamedTuple):
+    record: Optional[Dict]  # Horizon's record of the payout, from any node that has it
+    expired: bool  # not applied in a ledger closed after its time bounds: it never will be
+
+
+def _lookup(server: Server, tx_hash: str) -> Optional[Dict]:
+    try:
+        return server.transactions().transaction(tx_hash).call()
+    except NotFoundError:
+        return None
+
+
+def _node_state(server: Server, tx_hash: str) -> Tuple[float, Optional[Dict]]:
+    """
+    Close time of the latest ledger and the record of ``tx_hash`` (looked up
+    by inner hash for fee bumps), read from the same Horizon node in that
+    order: a transaction not found in a node that has ingested ledger N was
+    not applied up to ledger N.
+    """
+    latest = server.ledgers().order(desc=True).limit(1).call()["_embedded"]["records"][0]
+    closed_at = datetime.strptime(latest["closed_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=dt_timezone.utc)
+    return closed_at.timestamp(), _lookup(server, tx_hash)
+
+
+def envelope_max_time(envelope: PayoutEnvelope) -> Optional[int]:
+    """Upper time bound of a stored payout, if it has one."""
+    inner = TransactionEnvelope.from_xdr(envelope.envelope_xdr, settings.STELLAR_NETWORK_PASSPHRASE)
+    preconditions = inner.transaction.preconditions
+    time_bounds = preconditions.time_bounds if preconditions else None
+    return time_bounds.max_time if time_bounds and time_bounds.max_time else None
+
+
+def ledger_state(horizon: HorizonPool, envelope: PayoutEnvelope) -> LedgerState:
+    """
+    Whether ``envelope`` was applied, asked of every healthy Horizon node.
+
+    A record on any node is decisive. Absence is only decisive from a node
+    whose latest ledger closed after the envelope's time bounds; while no
+    node is that far, the outcome is still unknown (``record`` is None and
+    ``expired`` False) and the envelope must be neither rebuilt nor failed.
+    """
+    max_time = envelope_max_time(envelope)
+    states = horizon.read_all(lambda server: _node_state(server, envelope.tx_hash), PRIORITY_PAYOUT)
+    for _, record in states:
+        if record is not None:
+            return LedgerState(record, False)
+    return LedgerState(None, max_time is not None and any(closed_at > max_time for closed_at, _ in states))
+
+
+def find_on_ledger(horizon: HorizonPool, tx_hash: str) -> Optional[Dict]:
+    """
+    Horizon's record of ``tx_hash`` from any healthy node, or None if none
+    of them has it (yet: see ``ledger_state`` for a decisive answer).
+    """
+    for record in horizon.read_all(lambda server: _lookup(server, tx_hash), PRIORITY_PAYOUT):
+        if record is not None:
+            return record
+    return None
+
+
+def submit_envelope(horizon: HorizonPool, envelope: PayoutEnvelope) -> Dict:
+    """Submit the stored XDR exactly as it was signed."""
+    mark_envelope(envelope, PayoutEnvelope.STATUS.submitted)
+    response = horizon.submit(envelope.envelope_xdr)
+    mark_envelope(envelope, PayoutEnvelope.STATUS.confirmed)
+    return response
+
+
+def is_stale(error: BadRequestError) -> bool:
+    result_codes = (error.extras or {}).get("result_codes", {})
+    return error.status == 400 and result_codes.get("transaction") in STALE_RESULT_CODES
+
+
+def finalize_payout(transaction: Transaction, envelope: PayoutEnvelope):
+    """Record a payout that is on the ledger against its Polaris transaction."""
+    if envelope.status != PayoutEnvelope.STATUS.confirmed:
+        mark_envelope(envelope, PayoutEnvelope.STATUS.confirmed)
+    transaction.status = Transaction.STATUS.completed
+    transaction.stellar_transaction_id = envelope.tx_hash
+    transaction.completed_at = transaction.completed_at or timezone.now()
+    transaction.save()
+
+
+def _ledger_hashes(horizon: HorizonPool, account: str, since) -> Dict[str, bool]:
+    """
+    Hashes of every transaction of ``account`` created since ``since``, mapped
+    to whether it succeeded. Pages newest-first, 200 records per request.
+    """
+    since = since.astimezone(dt_timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    hashes = {}
+    cursor = None
+    while True:
+        def page(server, cursor=cursor):
+            builder = (
+                server.transactions().for_account(account).include_failed(True).order(desc=True).limit(200)
+            )
+            if cursor:
+                builder = builder.cursor(cursor)
+            return builder.call()["_embedded"]["records"]
+
+        records = horizon.read(page, PRIORITY_BACKGROUND)
+        for record in records:
+            hashes[record["hash"]] = record["successful"]
+            # A fee-bumped payout is stored under the hash of the inner transaction
+            if "inner_transaction" in record:
+                hashes[record["inner_transaction"]["hash"]] = record["successful"]
+        if len(records) < 200 or records[-1]["created_at"] < since:
+            return hashes
+        cursor = records[-1]["paging_token"]
+
+
+def recover_payouts(horizon: HorizonPool = None) -> Dict[str, int]:
+    """
+    Reconcile payouts whose outcome is unknown with the ledger.
+
+    Meant to run at startup (and after any crash): instead of one Horizon
+    lookup per envelope, the recent transactions of each asset's hot wallet
+    are fetched in pages and matched against the stored hashes in memory.
+
+    - Envelopes found on the ledger complete their Polaris transaction.
+    - Envelopes not on the ledger are left alone; the next
+      ``complete_deposit`` for the transaction resubmits them.
+    - Envelopes of deleted transactions or unanchored assets are skipped
+      with a warning and counted as pending.
+
+    Returns:
+        Counts of "confirmed", "failed" and "pending" envelopes
+    """
+    envelopes = list(
+        PayoutEnvelope.objects.filter(
+            status__in=[PayoutEnvelope.STATUS.signed, PayoutEnvelope.STATUS.submitted]
+        ).order_by("created_at")
+    )
+    counts = {"confirmed": 0, "failed": 0, "pending": 0}
+    if not envelopes:
+        return counts
+
+    horizon = horizon or horizon_pool
+    asset_ids = dict(
+        Transaction.objects.filter(id__in=[e.transaction_id for e in envelopes]).values_list("id", "asset_id")
+    )
+    # One paged scan per hot wallet, from its oldest outstanding envelope
+    since: Dict[str, object] = {}
+    recoverable = []
+    for envelope in envelopes:
+        asset_id = asset_ids.get(envelope.transaction_id)
+        if asset_id is None:
+            logger.warning(f"Skipping payout {envelope.tx_hash}: transaction {envelope.transaction_id} no longer exists")
+            counts["pending"] += 1
+            continue
+        try:
+            hot_wallet = registry.get(asset_id).hot_wallet_public
+        except ValueError as e:
+            logger.warning(f"Skipping payout {envelope.tx_hash} of transaction {envelope.transaction_id}: {e}")
+            counts["pending"] += 1
+            continue
+        since.setdefault(hot_wallet, envelope.created_at)
+        recoverable.append(envelope)
+    on_ledger: Dict[str, bool] = {}
+    for hot_wallet, created_at in since.items():
+        on_ledger.update(_ledger_hashes(horizon, hot_wallet, created_at))
+
+    pending: Set[str] = set()
+    for envelope in recoverable:
+        successful = on_ledger.get(envelope.tx_hash)
+        if successful is None:
+            pending.add(str(envelope.transaction_id))
+            counts["pending"] += 1
+        elif successful:
+            transaction = Transaction.objects.get(id=envelope.transaction_id)
+            finalize_payout(transaction, envelope)
+            counts["confirmed"] += 1
+            logger.info(f"Recovered payout {envelope.tx_hash} for transaction {envelope.transaction_id}")
+        else:
+            # Applied but failed: the sequence number is used up, so the next
+            # attempt has to build a new envelope.
+            mark_envelope(envelope, PayoutEnvelope.STATUS.failed)
+            counts["failed"] += 1
+            logger.warning(f"Payout {envelope.tx_hash} for transaction {envelope.transaction_id} failed on ledger")
+
+    if pending:
+        logger.info(f"Payouts awaiting resubmission: {', '.join(sorted(pending))}")
+    return counts
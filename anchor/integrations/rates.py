@@ -0,0 +1,299 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from datetime import timedelta
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+from polaris.integrations import QuoteIntegration
+from polaris.integrations.fees import calculate_fee as polaris_calculate_fee
+from polaris.models import Asset, OffChainAsset, Quote
+from polaris.sep10.token import SEP10Token
+
+logger = logging.getLogger(__name__)
+
+FIAT_CODE = "NGN"
+PRICE_PLACES = Decimal("0.0000001")  # Polaris stores prices with 7 decimal places
+AMOUNT_PLACES = Decimal("0.0000001")  # Stellar amounts
+FIAT_PLACES = Decimal("0.01")
+
+
+class RateProvider:
+    """
+    Source of NGN exchange rates.
+
+    ``fetch()`` returns the NGN value of one unit of each Stellar asset code,
+    e.g. ``{"USDC": Decimal("1550.25")}``. Select the provider with the
+    ``RATE_PROVIDER`` setting.
+    """
+
+    def fetch(self) -> Dict[str, Decimal]:
+        raise NotImplementedError()
+
+
+class StaticRateProvider(RateProvider):
+    """Rates from the ``NGN_RATES`` setting. Used for local development and tests."""
+
+    def fetch(self) -> Dict[str, Decimal]:
+        return {code: Decimal(str(rate)) for code, rate in settings.NGN_RATES.items()}
+
+
+class FileRateProvider(RateProvider):
+    """Rates from the JSON file at ``RATE_FILE``, written by the treasury desk or a cron job."""
+
+    def fetch(self) -> Dict[str, Decimal]:
+        with open(settings.RATE_FILE) as f:
+            return {code: Decimal(str(rate)) for code, rate in json.load(f).items()}
+
+
+class RateSnapshot(NamedTuple):
+    version: int
+    fetched_at: float
+    rates: Dict[str, Decimal]
+
+
+class RateService:
+    """
+    In-memory cache of the provider's rates.
+
+    Rates are refetched at most once every ``RATE_TTL`` seconds. Every refresh
+    that changes a rate bumps ``version``, so callers can tell whether a price
+    they computed earlier is still current. If the provider fails, the last
+    snapshot keeps being served for up to ``RATE_MAX_STALENESS`` seconds.
+    """
+
+    def __init__(self, provider: RateProvider = None):
+        self.provider = provider
+        self._snapshot: Optional[RateSnapshot] = None
+        self._lock = threading.Lock()
+
+    def _get_provider(self) -> RateProvider:
+        if self.provider is None:
+            self.provider = import_string(settings.RATE_PROVIDER)()
+        return self.provider
+
+    def snapshot(self) -> RateSnapshot:
+        snapshot = self._snapshot
+        if snapshot and time.monotonic() - snapshot.fetched_at < settings.RATE_TTL:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot and time.monotonic() - snapshot.fetched_at < settings.RATE_TTL:
+                return snapshot
+            try:
+                rates = self._get_provider().fetch()
+            except Exception as e:
+                if snapshot and time.monotonic() - snapshot.fetched_at < settings.RATE_MAX_STALENESS:
+                    logger.warning(f"Rate provider failed, serving rates v{snapshot.version}: {e}")
+                    return snapshot
+                raise RuntimeError(f"No NGN rates available: {e}")
+
+            if snapshot is None:
+                version = 1
+            elif rates != snapshot.rates:
+                version = snapshot.version + 1
+            else:
+                version = snapshot.version
+            self._snapshot = RateSnapshot(version, time.monotonic(), rates)
+            return self._snapshot
+
+    def rate(self, asset_code: str) -> Decimal:
+        """NGN value of one unit of ``asset_code``."""
+        try:
+            return self.snapshot().rates[asset_code]
+        except KeyError:
+            raise RuntimeError(f"No NGN rate for {asset_code}")
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+
+rate_service = RateService()
+
+
+class FeeTable:
+    """
+    Tiered fee schedule precomputed into sorted ``Decimal`` tuples.
+
+    Built from a list of ``[up_to, fixed, percent]`` tiers, where ``up_to`` is
+    the largest amount the tier applies to (``null`` for no limit). Looking up
+    a fee is a bisect over the tier bounds.
+    """
+
+    def __init__(self, tiers: List[List]):
+        tiers = sorted(
+            tiers, key=lambda tier: Decimal("Infinity") if tier[0] is None else Decimal(str(tier[0]))
+        )
+        self.bounds: Tuple[Decimal, ...] = tuple(
+            Decimal("Infinity") if up_to is None else Decimal(str(up_to)) for up_to, _, _ in tiers
+        )
+        self.fees: Tuple[Tuple[Decimal, Decimal], ...] = tuple(
+            (Decimal(str(fixed)), Decimal(str(percent)) / 100) for _, fixed, percent in tiers
+        )
+
+    def fee(self, amount: Decimal, places: int = 7) -> Decimal:
+        index = bisect_left(self.bounds, amount)
+        if index == len(self.bounds):
+            raise ValueError(f"amount {amount} is above the largest fee tier")
+        fixed, rate = self.fees[index]
+        return (fixed + amount * rate).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
+
+
+_FEE_TABLES: Dict[Tuple[str, str], FeeTable] = {
+    (code, operation): FeeTable(tiers)
+    for code, operations in settings.FEE_SCHEDULES.items()
+    for operation, tiers in operations.items()
+}
+
+
+def get_fee_table(asset_code: str, operation: str) -> Optional[FeeTable]:
+    return _FEE_TABLES.get((asset_code, operation))
+
+
+def calculate_fee(fee_params: Dict, *args: List, request: Optional[Request] = None, **kwargs: Dict) -> Decimal:
+    """
+    Polaris fee function backed by the precomputed ``FEE_SCHEDULES`` tables.
+
+    Only registered when ``FEE_SCHEDULES`` is configured. Assets and
+    operations without a schedule get Polaris's own calculation from the
+    fixed/percent fees stored on the Asset.
+    """
+    table = get_fee_table(fee_params["asset_code"], fee_params["operation"])
+    if table is None:
+        return polaris_calculate_fee(fee_params, *args, request=request, **kwargs)
+    return table.fee(Decimal(fee_params["amount"]))
+
+
+def _price(sell_asset: Union[Asset, OffChainAsset], buy_asset: Union[Asset, OffChainAsset]) -> Decimal:
+    """Units of ``sell_asset`` paid for one unit of ``buy_asset``."""
+    if isinstance(buy_asset, Asset) and getattr(sell_asset, "identifier", None) == FIAT_CODE:
+        price = rate_service.rate(buy_asset.code)
+    elif isinstance(sell_asset, Asset) and getattr(buy_asset, "identifier", None) == FIAT_CODE:
+        price = 1 / rate_service.rate(sell_asset.code)
+    else:
+        raise ValueError(
+            f"unsupported pair {sell_asset.asset_identification_format} -> {buy_asset.asset_identification_format}"
+        )
+    return price.quantize(PRICE_PLACES, rounding=ROUND_HALF_UP)
+
+
+class AnchorQuote(QuoteIntegration):
+    """
+    SEP-38 prices and firm quotes for USDC <-> NGN, served from ``rate_service``.
+
+    Only active when ``sep-38`` is in ``ACTIVE_SEPS``.
+    """
+
+    def get_prices(
+        self,
+        token: SEP10Token,
+        request: Request,
+        sell_asset: Union[Asset, OffChainAsset],
+        sell_amount: Decimal,
+        buy_assets: List[Union[Asset, OffChainAsset]],
+        *args,
+        **kwargs,
+    ) -> List[Decimal]:
+        return [_price(sell_asset, buy_asset) for buy_asset in buy_assets]
+
+    def get_price(
+        self,
+        token: SEP10Token,
+        request: Request,
+        sell_asset: Union[Asset, OffChainAsset],
+        buy_asset: Union[Asset, OffChainAsset],
+        *args,
+        **kwargs,
+    ) -> Decimal:
+        return _price(sell_asset, buy_asset)
+
+    def post_quote(self, token: SEP10Token, request: Request, quote: Quote, *args, **kwargs) -> Quote:
+        if quote.type != Quote.TYPE.firm:
+            raise ValueError("only firm quotes are supported")
+
+        sell_asset = _asset_from_id(quote.sell_asset)
+        buy_asset = _asset_from_id(quote.buy_asset)
+        quote.price = _price(sell_asset, buy_asset)
+
+        expires_at = timezone.now() + timedelta(seconds=settings.QUOTE_TTL)
+        if quote.requested_expire_after and quote.requested_expire_after > expires_at:
+            raise ValueError(f"quotes cannot be held for more than {settings.QUOTE_TTL} seconds")
+        quote.expires_at = expires_at
+
+        logger.info(
+            f"Firm quote {quote.sell_asset} -> {quote.buy_asset} at {quote.price} "
+            f"(rates v{rate_service.snapshot().version}), expires {expires_at.isoformat()}"
+        )
+        return quote
+
+
+def _asset_from_id(asset_id: str) -> Union[Asset, OffChainAsset]:
+    scheme, identifier = asset_id.split(":", 1)
+    if scheme == "stellar":
+        code, issuer = identifier.split(":")
+        return Asset.objects.get(code=code, issuer=issuer)
+    return OffChainAsset.objects.get(scheme=scheme, identifier=identifier)
+
+
+def quote_is_valid(quote: Quote) -> bool:
+    """Whether a firm quote can still be used for a transaction."""
+    return quote.type == Quote.TYPE.firm and quote.expires_at is not None and quote.expires_at > timezone.now()
+
+
+def _transaction_rate(asset_code: str, operation: str, quote: Optional[Quote]) -> Decimal:
+    """NGN per unit of ``asset_code``: the price of the transaction's firm quote, else the current rate."""
+    if quote is None:
+        return rate_service.rate(asset_code)
+    if not quote_is_valid(quote):
+        raise ValueError(f"quote {quote.id} has expired")
+    # Deposits sell NGN for the asset, withdrawals sell the asset for NGN
+    return quote.price if operation == "deposit" else 1 / quote.price
+
+
+def deposit_amounts(anchored, amount_in: Decimal, quote: Optional[Quote] = None) -> Tuple[Decimal, Decimal]:
+    """
+    Fee and payout, both in the asset, of a deposit of ``amount_in`` NGN:
+    the NGN converted at ``quote``'s price or the current rate, less the
+    asset's deposit fee.
+
+    Args:
+        anchored: The ``AnchoredAsset`` paid out
+        amount_in: NGN the user sends
+        quote: The transaction's firm quote, if it has one
+
+    Raises:
+        ValueError: if the amount does not cover the fee, is above the fee
+            schedule or the quote has expired
+        RuntimeError: if there is no rate for the asset
+    """
+    gross = (amount_in / _transaction_rate(anchored.code, "deposit", quote)).quantize(AMOUNT_PLACES, ROUND_DOWN)
+    fee = anchored.fee("deposit", gross).quantize(AMOUNT_PLACES, ROUND_HALF_UP)
+    if gross <= fee:
+        raise ValueError(f"{amount_in} {FIAT_CODE} does not cover the {fee} {anchored.code} fee")
+    return fee, gross - fee
+
+
+def withdraw_amounts(anchored, amount_in: Decimal, quote: Optional[Quote] = None) -> Tuple[Decimal, Decimal]:
+    """
+    Fee, in the asset, and NGN paid out for a withdrawal of ``amount_in`` of
+    the asset: the amount less the asset's withdrawal fee, converted at
+    ``quote``'s price or the current rate.
+
+    Raises:
+        ValueError: if the amount does not cover the fee, is above the fee
+            schedule or the quote has expired
+        RuntimeError: if there is no rate for the asset
+    """
+    fee = anchored.fee("withdraw", amount_in).quantize(AMOUNT_PLACES, ROUND_HALF_UP)
+    if amount_in <= fee:
+        raise ValueError(f"{amount_in} {anchored.code} does not cover the {fee} {anchored.code} fee")
+    rate = _transaction_rate(anchored.code, "withdraw", quote)
+    return fee, ((amount_in - fee) * rate).quantize(FIAT_PLACES, ROUND_DOWN)
@@ -0,0 +1,153 @@
+import logging
+from decimal import Decimal, ROUND_UP
+from typing import List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import Sum
+from polaris.models import Transaction
+from stellar_sdk import Asset as StellarAsset, TransactionBuilder
+
+from ..models import HotWalletTopUp
+from .alerts import alert
+from .assets import AnchoredAsset, registry
+from .deposit import PAYABLE_STATUSES
+from .horizon import HorizonPool, horizon_pool
+from .payouts import find_on_ledger
+
+logger = logging.getLogger(__name__)
+
+
+class Liquidity(NamedTuple):
+    asset_code: str
+    balance: Decimal
+    committed: Decimal  # deposits in pending_anchor or pending_trust, owed now
+    forecast: Decimal  # plus deposits still waiting for the user's fiat
+    level: str  # "ok", "low" or "critical"
+    top_up: Optional[HotWalletTopUp]
+
+
+def hot_wallet_balance(horizon: HorizonPool, anchored: AnchoredAsset) -> Decimal:
+    account = horizon.read(lambda server: server.accounts().account_id(anchored.hot_wallet_public).call())
+    for balance in account["balances"]:
+        if balance.get("asset_code") == anchored.code and balance.get("asset_issuer") == anchored.issuer:
+            return Decimal(balance["balance"])
+    return Decimal(0)
+
+
+def payout_demand(anchored: AnchoredAsset):
+    """
+    Amounts the hot wallet will have to pay out: deposits already funded
+    (pending_anchor, or pending_trust until the user adds the trustline), and
+    those plus deposits the user has started in pending_user_transfer_start
+    but not yet funded.
+    """
+    totals = dict(
+        Transaction.objects.filter(
+            kind=Transaction.KIND.deposit,
+            asset_id=anchored.id,
+            status__in=[*PAYABLE_STATUSES, Transaction.STATUS.pending_user_transfer_start],
+        )
+        .values_list("status")
+        .annotate(total=Sum("amount_out"))
+    )
+    committed = sum((totals.get(status) or Decimal(0) for status in PAYABLE_STATUSES), Decimal(0))
+    upcoming = totals.get(Transaction.STATUS.pending_user_transfer_start) or Decimal(0)
+    return committed, committed + upcoming
+
+
+def prepare_top_up(horizon: HorizonPool, anchored: AnchoredAsset, amount: Decimal) -> HotWalletTopUp:
+    """
+    Build the unsigned treasury -> hot wallet payment of ``amount`` and store
+    it for offline signing, superseding any top-up of the asset still waiting
+    to be signed.
+    """
+    treasury = horizon.read(lambda server: server.load_account(anchored.treasury_account))
+    base_fee = horizon.read(lambda server: server.fetch_base_fee())
+    envelope = (
+        TransactionBuilder(
+            source_account=treasury,
+            network_passphrase=settings.STELLAR_NETWORK_PASSPHRASE,
+            base_fee=base_fee,
+        )
+        .append_payment_op(
+            destination=anchored.hot_wallet_public,
+            asset=StellarAsset(anchored.code, anchored.issuer),
+            amount=str(amount),
+        )
+        .add_text_memo("LINK hot wallet top-up")
+        # Leave time for the offline signing round trip
+        .set_timeout(settings.REBALANCE_TOPUP_TIMEOUT)
+        .build()
+    )
+    HotWalletTopUp.objects.filter(asset_code=anchored.code, status=HotWalletTopUp.STATUS.prepared).update(
+        status=HotWalletTopUp.STATUS.superseded
+    )
+    return HotWalletTopUp.objects.create(
+        asset_code=anchored.code,
+        asset_issuer=anchored.issuer,
+        treasury_account=anchored.treasury_account,
+        hot_wallet_account=anchored.hot_wallet_public,
+        amount=amount,
+        sequence=envelope.transaction.sequence,
+        tx_hash=envelope.hash_hex(),
+        envelope_xdr=envelope.to_xdr(),
+    )
+
+
+def check_asset(horizon: HorizonPool, anchored: AnchoredAsset, prepare: bool = True) -> Liquidity:
+    """
+    Compare an asset's hot wallet balance with its payout demand.
+
+    - ok: the balance covers the forecast plus ``min_balance``.
+    - low: it does not, so payouts will start failing as pending deposits
+      are funded. A top-up up to the forecast plus ``target_balance`` is
+      prepared (if the asset has a ``treasury_account``) and admins are
+      alerted.
+    - critical: the balance does not even cover deposits already funded
+      (pending_anchor or pending_trust), so some payouts are failing now.
+    """
+    top_up = HotWalletTopUp.objects.filter(asset_code=anchored.code, status=HotWalletTopUp.STATUS.prepared).first()
+    if top_up is not None:
+        # Sequence first: if the top-up is not found after its sequence number
+        # was seen used, something else used it
+        treasury = horizon.read(lambda server: server.load_account(top_up.treasury_account))
+        if find_on_ledger(horizon, top_up.tx_hash) is not None:
+            top_up.status = HotWalletTopUp.STATUS.confirmed
+            logger.info(f"Top-up {top_up.tx_hash} of {top_up.amount} {anchored.code} is on the ledger")
+        elif treasury.sequence >= top_up.sequence:
+            # The treasury used that sequence number for something else
+            top_up.status = HotWalletTopUp.STATUS.superseded
+        if top_up.status != HotWalletTopUp.STATUS.prepared:
+            top_up.save(update_fields=["status", "updated_at"])
+            top_up = None
+
+    balance = hot_wallet_balance(horizon, anchored)
+    committed, forecast = payout_demand(anchored)
+    if balance >= forecast + anchored.min_balance:
+        return Liquidity(anchored.code, balance, committed, forecast, "ok", top_up)
+
+    level = "critical" if balance < committed else "low"
+    needed = (max(forecast + anchored.target_balance, forecast + anchored.min_balance) - balance).quantize(
+        Decimal("0.0000001"), rounding=ROUND_UP
+    )
+    if prepare and anchored.treasury_account and (top_up is None or top_up.amount < needed):
+        top_up = prepare_top_up(horizon, anchored, needed)
+        logger.info(f"Prepared top-up {top_up.tx_hash} of {needed} {anchored.code}")
+
+    if top_up is not None:
+        action = f"Sign and submit top-up #{top_up.id} ({top_up.amount} {anchored.code}) from the admin."
+    else:
+        action = f"Send at least {needed} {anchored.code} to {anchored.hot_wallet_public}."
+    alert(
+        f"liquidity:{anchored.code}:{level}",
+        f"[anchor] {anchored.code} hot wallet {level}",
+        f"Hot wallet {anchored.hot_wallet_public} holds {balance} {anchored.code}. "
+        f"Funded deposits need {committed}; with deposits awaiting fiat, {forecast}. {action}",
+    )
+    return Liquidity(anchored.code, balance, committed, forecast, level, top_up)
+
+
+def rebalance_hot_wallets(prepare: bool = True, horizon: HorizonPool = None) -> List[Liquidity]:
+    """Run ``check_asset`` for every anchored asset."""
+    horizon = horizon or horizon_pool
+    return [check_asset(horizon, anchored, prepare) for anchored in registry.all()]
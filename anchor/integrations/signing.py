@@ -0,0 +1,146 @@
+import json
+import logging
+import socket
+import threading
+from typing import Dict, List
+
+from django.conf import settings
+from stellar_sdk import Keypair
+from stellar_sdk.base_transaction_envelope import BaseTransactionEnvelope
+from stellar_sdk.decorated_signature import DecoratedSignature
+
+from .assets import registry
+
+logger = logging.getLogger(__name__)
+
+
+class SigningError(Exception):
+    """Raised when a transaction cannot be signed for an account."""
+
+
+class LocalSigner:
+    """
+    Signs with the hot wallet secrets of the anchored assets (and the fee
+    account's, for fee bumps), each parsed into a ``Keypair`` once per
+    process instead of once per payout.
+    """
+
+    def __init__(self):
+        self._keypairs: Dict[str, Keypair] = {}
+        self._lock = threading.Lock()
+
+    def _keys(self):
+        """(name, public key, secret) of every account this signer may sign for."""
+        for anchored in registry.all():
+            if anchored.hot_wallet_secret:
+                yield f"{anchored.code} hot wallet", anchored.hot_wallet_public, anchored.hot_wallet_secret
+        if settings.FEE_ACCOUNT and settings.FEE_ACCOUNT_SECRET:
+            yield "fee account", settings.FEE_ACCOUNT, settings.FEE_ACCOUNT_SECRET
+
+    def _keypair(self, account: str) -> Keypair:
+        keypair = self._keypairs.get(account)
+        if keypair is not None:
+            return keypair
+        with self._lock:
+            for name, public, secret in self._keys():
+                if public == account:
+                    keypair = Keypair.from_secret(secret)
+                    if keypair.public_key != account:
+                        raise SigningError(f"the {name} secret is not the key of {account}")
+                    self._keypairs[account] = keypair
+                    return keypair
+        raise SigningError(f"no signing key for {account}")
+
+    def accounts(self) -> List[str]:
+        return [public for _, public, _ in self._keys()]
+
+    def sign_hashes(self, account: str, hashes: List[bytes]) -> List[bytes]:
+        """
+        Sign each of ``hashes`` (transaction hashes) with ``account``'s key.
+
+        Raises:
+            SigningError: if this signer holds no key for ``account``
+        """
+        keypair = self._keypair(account)
+        return [keypair.sign(h) for h in hashes]
+
+    def clear(self):
+        with self._lock:
+            self._keypairs.clear()
+
+
+class SocketSigner:
+    """
+    Client of a ``manage.py signing_service`` process on the Unix socket
+    ``SIGNING_SOCKET``, so the hot wallet secrets need not be loaded in web
+    or worker processes. Each thread keeps its connection open between calls.
+    """
+
+    def __init__(self, path: str, timeout: float):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _call(self, request: Dict) -> Dict:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError as e:
+                sock.close()
+                raise SigningError(f"signing service unavailable at {self.path}: {e}")
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        sock, replies = conn
+        try:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            line = replies.readline()
+            if not line:
+                raise OSError("connection closed")
+        except OSError as e:
+            self._local.conn = None
+            sock.close()
+            raise SigningError(f"signing service call failed: {e}")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise SigningError(reply["error"])
+        return reply
+
+    def accounts(self) -> List[str]:
+        return self._call({"accounts": True})["accounts"]
+
+    def sign_hashes(self, account: str, hashes: List[bytes]) -> List[bytes]:
+        reply = self._call({"account": account, "hashes": [h.hex() for h in hashes]})
+        return [bytes.fromhex(s) for s in reply["signatures"]]
+
+    def clear(self):
+        pass
+
+
+_hints: Dict[str, bytes] = {}
+
+
+def _hint(account: str) -> bytes:
+    if account not in _hints:
+        _hints[account] = Keypair.from_public_key(account).signature_hint()
+    return _hints[account]
+
+
+def sign_envelopes(account: str, envelopes: List[BaseTransactionEnvelope]):
+    """
+    Add ``account``'s signature to each of ``envelopes`` with one signer call.
+
+    Raises:
+        SigningError: if the signer holds no key for ``account`` or is unavailable
+    """
+    signatures = signer.sign_hashes(account, [envelope.hash() for envelope in envelopes])
+    for envelope, signature in zip(envelopes, signatures):
+        envelope.signatures.append(DecoratedSignature(_hint(account), signature))
+
+
+def sign_envelope(account: str, envelope: BaseTransactionEnvelope):
+    sign_envelopes(account, [envelope])
+
+
+signer = SocketSigner(settings.SIGNING_SOCKET, settings.SIGNING_TIMEOUT) if settings.SIGNING_SOCKET else LocalSigner()
@@ -0,0 +1,148 @@
+import logging
+import uuid
+from typing import Dict, List
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from polaris.models import Transaction
+
+from ..db import transactions_changed
+from .jobs import enqueue
+
+logger = logging.getLogger(__name__)
+
+S = Transaction.STATUS
+
+# Transitions the fiat backend may make, by kind and current status. Deposits
+# are only marked as funded; the Stellar payout stays with complete_deposit,
+# which is queued for every deposit moved to pending_anchor.
+ALLOWED_TRANSITIONS = {
+    Transaction.KIND.deposit: {
+        S.pending_user_transfer_start: {S.pending_anchor, S.error},
+    },
+    Transaction.KIND.withdrawal: {
+        S.pending_anchor: {S.pending_external, S.completed, S.error},
+        S.pending_external: {S.completed, S.error},
+    },
+}
+
+# Fields the backend may set along with the status, and the model field each maps to
+OPTIONAL_FIELDS = {
+    "external_transaction_id": "external_transaction_id",
+    "message": "status_message",
+}
+
+UPDATE_FIELDS = ["status", "status_message", "external_transaction_id", "completed_at"]
+
+
+class StatusUpdateError(ValueError):
+    """Raised when a batch of status updates is malformed as a whole."""
+
+
+def _validate(item) -> str:
+    if not isinstance(item, dict):
+        return "expected an object"
+    for name in ("id", "expected_status", "new_status"):
+        if not isinstance(item.get(name), str) or not item[name]:
+            return f"missing {name}"
+    try:
+        uuid.UUID(item["id"])
+    except ValueError:
+        return "id is not a transaction id"
+    for name in OPTIONAL_FIELDS:
+        if item.get(name) is not None and not isinstance(item[name], str):
+            return f"{name} must be a string"
+    return ""
+
+
+def apply_status_updates(items: List[Dict], max_batch: int) -> List[Dict]:
+    """
+    Apply a batch of status transitions in one database transaction.
+
+    Each item is ``{"id", "expected_status", "new_status"}`` plus optional
+    ``external_transaction_id`` and ``message``. An item only applies if the
+    transaction is still in ``expected_status`` (so replaying a batch is
+    harmless) and the transition is in ``ALLOWED_TRANSITIONS``. Items are
+    independent: one that does not apply does not block the others. Clients
+    with an ``on_change_callback`` are notified of the changes by a queued
+    ``transaction_callbacks`` job.
+
+    Args:
+        items: the transitions to apply
+        max_batch: largest number of items accepted at once
+
+    Returns:
+        One result per item, in order: ``{"id", "result", "status"}`` where
+        result is "updated", "conflict", "not_found" or "invalid", status is
+        the transaction's status afterwards, and "error" explains anything
+        but "updated"
+
+    Raises:
+        StatusUpdateError: if items is not a list or is too long
+    """
+    if not isinstance(items, list):
+        raise StatusUpdateError("expected a list of updates")
+    if len(items) > max_batch:
+        raise StatusUpdateError(f"at most {max_batch} updates per request")
+
+    results = [{"id": item.get("id") if isinstance(item, dict) else None} for item in items]
+    ids = set()
+    for item, result in zip(items, results):
+        error = _validate(item)
+        if not error and uuid.UUID(item["id"]) in ids:
+            error = "duplicate id in batch"
+        if error:
+            result.update(result="invalid", error=error)
+        else:
+            ids.add(uuid.UUID(item["id"]))
+
+    now = timezone.now()
+    with db_transaction.atomic():
+        transactions = Transaction.objects.select_for_update().only(
+            "id", "kind", "stellar_account", "muxed_account", "on_change_callback", *UPDATE_FIELDS
+        ).in_bulk(ids)
+
+        changed, funded_deposits = [], []
+        for item, result in zip(items, results):
+            if "result" in result:
+                continue
+            transaction = transactions.get(uuid.UUID(item["id"]))
+            if transaction is None:
+                result.update(result="not_found", error="no such transaction")
+                continue
+            result["status"] = transaction.status
+            if transaction.status != item["expected_status"]:
+                result.update(result="conflict", error=f"transaction is {transaction.status}")
+                continue
+            allowed = ALLOWED_TRANSITIONS.get(transaction.kind, {}).get(transaction.status, set())
+            if item["new_status"] not in allowed:
+                result.update(
+                    result="invalid",
+                    error=f"cannot move a {transaction.kind} from {transaction.status} to {item['new_status']}",
+                )
+                continue
+
+            transaction.status = item["new_status"]
+            for name, field in OPTIONAL_FIELDS.items():
+                if item.get(name) is not None:
+                    setattr(transaction, field, item[name])
+            if transaction.status == S.completed:
+                transaction.completed_at = now
+            changed.append(transaction)
+            if transaction.kind == Transaction.KIND.deposit and transaction.status == S.pending_anchor:
+                funded_deposits.append(transaction)
+            result.update(result="updated", status=transaction.status)
+
+        Transaction.objects.bulk_update(changed, UPDATE_FIELDS, batch_size=500)
+        for transaction in funded_deposits:
+            enqueue("complete_deposit", {"transaction_id": str(transaction.id)})
+        callbacks = [
+            str(t.id) for t in changed if t.on_change_callback and t.on_change_callback.lower() != "postmessage"
+        ]
+        if callbacks:
+            enqueue("transaction_callbacks", {"transaction_ids": callbacks})
+
+    # bulk_update sends no post_save
+    transactions_changed(*{a for t in changed for a in (t.stellar_account, t.muxed_account)})
+    logger.info(f"Applied {len(changed)} of {len(items)} status updates, queued {len(funded_deposits)} payouts")
+    return results
@@ -1,10 +1,36 @@
 from rest_framework.request import Request
 from polaris.models import Asset
+from .assets import registry
 
-def toml_contents(request, *args, **kwargs):
-  asset = Asset.objects.first()
-  # asset2 = Asset.objects.last()
+# Descriptions of the assets we know; any other anchored asset gets a generic entry
+CURRENCY_INFO = {
+  "USDC": {
+    "redemption_instructions": "Send USDC to LINK and receive NGN via bank transfer or mobile money",
+    "desc": "Circle USD Coin (USDC) on Stellar. LINK provides seamless USDC/NGN exchange services.",
+    "name": "USD Coin",
+  },
+}
+
+
+def _currency(asset):
+  info = CURRENCY_INFO.get(asset.code, {
+    "redemption_instructions": f"Send {asset.code} to LINK and receive NGN via bank transfer or mobile money",
+    "desc": f"{asset.code} on Stellar. LINK provides {asset.code}/NGN exchange services.",
+    "name": asset.code,
+  })
+  return {
+    "code": asset.code,
+    "issuer": asset.issuer,
+    "anchor_asset_type": "fiat",
+    "anchor_asset": "NGN",
+    **info,
+    "status": "live",
+    "display_decimals": 2,
+    "is_asset_anchored": "true",
+  }
 
+
+def toml_contents(request, *args, **kwargs):
   # Get distribution accounts from all assets
   accounts = [a.distribution_account for a in Asset.objects.exclude(distribution_seed__isnull=True).exclude(distribution_seed='') if a.distribution_account]
 
@@ -27,18 +53,5 @@ def toml_contents(request, *args, **kwargs):
         "email": "support@linkio.africa"
       },
     ],
-    "CURRENCIES": [
-      {
-        "code": asset.code,
-        "issuer": asset.issuer,
-        "anchor_asset_type": "fiat",
-        "anchor_asset": "NGN",
-        "redemption_instructions": "Send USDC to LINK and receive NGN via bank transfer or mobile money",
-        "desc": "Circle USD Coin (USDC) on Stellar. LINK provides seamless USDC/NGN exchange services.",
-        "name": "USD Coin",
-        "status": "live",
-        "display_decimals": 2,
-        "is_asset_anchored": "true",
-      },
-    ]
+    "CURRENCIES": [_currency(asset) for asset in registry.all()],
   }
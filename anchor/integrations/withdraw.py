@@ -6,16 +6,20 @@ from rest_framework.request import Request
 from polaris.models import Transaction, Asset
 from polaris.templates import Template
 from .forms import WithdrawForm, ConfirmationForm
-from urllib.parse import (urlparse, parse_qs, urlencode, quote_plus)
+from .context import InteractiveContext
+from .interactive import build_interactive_url
+from .handoff import HandoffError, verify_return
+from .assets import registry
+from .rates import withdraw_amounts
+from .horizon import horizon_pool, is_transient
 from polaris.integrations import (
   WithdrawalIntegration,
   TransactionForm
 )
 from django.conf import settings
-from stellar_sdk import Server, Keypair, TransactionBuilder, Network, Asset as StellarAsset
-from stellar_sdk.exceptions import BaseHorizonError
+from stellar_sdk import Keypair, TransactionBuilder, Network, Asset as StellarAsset
+from stellar_sdk.exceptions import BaseRequestError
 import logging
-import os
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +33,7 @@ class AnchorWithdraw(WithdrawalIntegration):
         *args,
         **kwargs
     ) -> Optional[forms.Form]:
+        InteractiveContext.for_request(request).bind(transaction)
         # if we haven't collected amount, collect it
         if not transaction.amount_in:
             if post_data:
@@ -48,6 +53,8 @@ class AnchorWithdraw(WithdrawalIntegration):
         *args,
         **kwargs,
     ) -> Optional[Dict]:
+        if transaction:
+            InteractiveContext.for_request(request).bind(transaction)
         if template == Template.WITHDRAW:
             if not form:  # we're done
                 return None
@@ -92,35 +99,13 @@ class AnchorWithdraw(WithdrawalIntegration):
         *args: List,
         **kwargs: Dict,
     ) -> Optional[str]:
-        if request.query_params.get("step"):
+        context = InteractiveContext.for_request(request).bind(transaction, asset)
+        if context.params.get("step"):
           raise NotImplementedError()
 
-        # Use os.environ to check environment (safe at runtime)
-        environment = os.environ.get('ENVIRONMENT', 'development')
-        if environment == "development":
-            ownUrl = "http://localhost:3000/menu"  # Use for local testing
-        else:
-            ownUrl = "https://origin.linkio.world/menu"
-
-         # Full interactive url /sep24/transactions/deposit/webapp
-        url = request.build_absolute_uri()
-        parsed_url = urlparse(url)
-        query_result = parse_qs(parsed_url.query)
-
-        token = (query_result['token'][0])
-
-        ownUrl += "?" if parsed_url.query else "&"
-
-        payload = {
-            'type': 'withdraw',
-            'asset_code': asset.code,
-            'transaction_id':transaction.id,
-            'token': token,
-            'wallet': transaction.stellar_account,
-            'callback': callback
-        }
-        # The anchor uses a standalone interactive flow
-        return ownUrl + urlencode(payload, quote_via=quote_plus)
+        # The anchor uses a standalone interactive flow. The token is the one the
+        # wallet opened /sep24/transactions/withdraw/webapp with.
+        return build_interactive_url("withdraw", asset, transaction, context.token, callback)
 
     def after_interactive_flow(
         self,
@@ -142,43 +127,80 @@ class AnchorWithdraw(WithdrawalIntegration):
         - Sets our receiving address for USDC
         - Does NOT process fiat payout yet (that happens after USDC verification)
         """
-        amount_str = request.query_params.get("amount")
-        fee_str = request.query_params.get("amount_fee")
+        params = InteractiveContext.for_request(request).bind(transaction).params
+
+        # The values below come back through the user's browser; only trust
+        # them if the UI backend signed them for this transaction.
+        try:
+            verify_return(params, "withdraw", transaction)
+        except HandoffError as e:
+            if settings.INTERACTIVE_HANDOFF_REQUIRED or params.get("handoff"):
+                logger.error(
+                    f"Rejected interactive withdraw callback for transaction {transaction.id}: {e}"
+                )
+                transaction.status = Transaction.STATUS.error
+                transaction.status_message = "Interactive withdraw callback failed verification"
+                transaction.save()
+                return
+            logger.warning(f"Unsigned interactive withdraw callback for transaction {transaction.id}")
+
+        amount_str = params.get("amount")
 
         # Validate required parameters exist
-        if amount_str is None or fee_str is None:
+        if amount_str is None:
             logger.error(
                 "Missing required query params for withdraw after_interactive_flow: "
-                f"amount={amount_str}, amount_fee={fee_str}, transaction_id={transaction.id}"
+                f"amount={amount_str}, transaction_id={transaction.id}"
             )
             transaction.status = Transaction.STATUS.error
-            transaction.status_message = "Missing amount or amount_fee from interactive withdraw callback"
+            transaction.status_message = "Missing amount from interactive withdraw callback"
             transaction.save()
             return
 
         # Safely parse Decimal values
         try:
-            transaction.amount_in = Decimal(amount_str)
-            transaction.amount_fee = Decimal(fee_str)
+            amount_in = Decimal(amount_str)
+            if not amount_in.is_finite() or amount_in <= 0:
+                raise InvalidOperation(amount_str)
         except (InvalidOperation, TypeError) as e:
             logger.error(
                 "Invalid Decimal values for withdraw after_interactive_flow: "
-                f"amount={amount_str}, amount_fee={fee_str}, transaction_id={transaction.id}, error={e}",
+                f"amount={amount_str}, transaction_id={transaction.id}, error={e}",
                 exc_info=True
             )
             transaction.status = Transaction.STATUS.error
-            transaction.status_message = "Invalid amount or amount_fee format in interactive withdraw callback"
+            transaction.status_message = "Invalid amount format in interactive withdraw callback"
             transaction.save()
             return
 
+        # The fee and the fiat payout are priced here, never taken from the browser
+        try:
+            anchored = registry.get(transaction.asset_id)
+            amount_fee, amount_out = withdraw_amounts(
+                anchored, amount_in, transaction.quote if transaction.quote_id else None
+            )
+        except (ValueError, RuntimeError) as e:
+            logger.error(f"Could not price withdrawal {transaction.id} of {amount_in} (asset {transaction.asset_id}): {e}")
+            transaction.status = Transaction.STATUS.error
+            transaction.status_message = f"Could not price this withdrawal: {e}"
+            transaction.save()
+            return
+        if params.get("amount_fee") and params["amount_fee"] != str(amount_fee):
+            logger.warning(
+                f"Withdrawal {transaction.id}: interactive UI showed a fee of {params['amount_fee']} "
+                f"{anchored.code}, charging {amount_fee}"
+            )
+
         transaction.status = Transaction.STATUS.pending_user_transfer_start
-        transaction.amount_out = transaction.amount_in - transaction.amount_fee
-        transaction.memo_type = (request.query_params.get("memo_type"))
-        transaction.memo = (request.query_params.get("hashed"))
-        transaction.to_address = (request.query_params.get("account"))  # Bank details stored here
-        transaction.external_transaction_id = (request.query_params.get("externalId"))
-        transaction.on_change_callback = (request.query_params.get("callback"))
-        transaction.receiving_anchor_account = settings.USDC_RECEIVING_ADDRESS
+        transaction.amount_in = amount_in
+        transaction.amount_fee = amount_fee
+        transaction.amount_out = amount_out
+        transaction.memo_type = (params.get("memo_type"))
+        transaction.memo = (params.get("hashed"))
+        transaction.to_address = (params.get("account"))  # Bank details stored here
+        transaction.external_transaction_id = (params.get("externalId"))
+        transaction.on_change_callback = (params.get("callback"))
+        transaction.receiving_anchor_account = anchored.receiving_account
         transaction.save()
 
         # Log withdrawal request for admin visibility
@@ -192,6 +214,69 @@ class AnchorWithdraw(WithdrawalIntegration):
         )
 
 
+PAYMENT_TOLERANCE = Decimal('0.01')
+
+
+def payment_matches(op: dict, expected_amount: Decimal, expected_destination: str,
+                    expected_asset_code: str, expected_asset_issuer: str) -> bool:
+    """
+    Check a single Horizon payment operation against the expected USDC payment
+
+    Args:
+        op: Operation (or /payments record) from Horizon API
+        expected_amount: Decimal amount of USDC expected
+        expected_destination: Our Stellar address expecting payment
+        expected_asset_code: "USDC"
+        expected_asset_issuer: Circle's USDC issuer address
+
+    Returns:
+        True if the operation is a matching payment, False otherwise
+    """
+    if op.get('type') != 'payment':
+        return False
+
+    # Check destination
+    if op.get('to') != expected_destination:
+        logger.warning(
+            f"Payment destination mismatch. Expected: {expected_destination}, "
+            f"Got: {op.get('to')}"
+        )
+        return False
+
+    # Check if it's USDC (native XLM won't have asset_code)
+    if op.get('asset_type') == 'native':
+        logger.warning("Found XLM payment, not USDC")
+        return False
+
+    # Check asset code and issuer
+    asset_code = op.get('asset_code')
+    asset_issuer = op.get('asset_issuer')
+
+    if asset_code != expected_asset_code:
+        logger.warning(
+            f"Asset code mismatch. Expected: {expected_asset_code}, Got: {asset_code}"
+        )
+        return False
+
+    if asset_issuer != expected_asset_issuer:
+        logger.warning(
+            f"Asset issuer mismatch. Expected: {expected_asset_issuer}, Got: {asset_issuer}"
+        )
+        return False
+
+    # Check amount (allow 0.01 tolerance for rounding)
+    actual_amount = Decimal(op.get('amount', '0'))
+
+    if actual_amount < (expected_amount - PAYMENT_TOLERANCE):
+        logger.warning(
+            f"Amount mismatch. Expected: {expected_amount}, "
+            f"Got: {actual_amount}"
+        )
+        return False
+
+    return True
+
+
 def verify_usdc_payment(stellar_tx: dict, expected_amount: Decimal, expected_destination: str,
                        expected_asset_code: str, expected_asset_issuer: str) -> bool:
     """
@@ -218,65 +303,29 @@ def verify_usdc_payment(stellar_tx: dict, expected_amount: Decimal, expected_des
         tx_hash = stellar_tx.get('id', 'unknown')
 
         # Fetch operations for this transaction
-        server = Server(horizon_url=settings.HORIZON_URL)
-        operations = server.operations().for_transaction(tx_hash).call()
+        operations = horizon_pool.read(lambda server: server.operations().for_transaction(tx_hash).call())
 
         # Look for payment operation
         for op in operations.get('_embedded', {}).get('records', []):
-            if op.get('type') != 'payment':
-                continue
-
-            # Check destination
-            if op.get('to') != expected_destination:
-                logger.warning(
-                    f"Payment destination mismatch. Expected: {expected_destination}, "
-                    f"Got: {op.get('to')}"
-                )
-                continue
-
-            # Check if it's USDC (native XLM won't have asset_code)
-            if op.get('asset_type') == 'native':
-                logger.warning("Found XLM payment, not USDC")
-                continue
-
-            # Check asset code and issuer
-            asset_code = op.get('asset_code')
-            asset_issuer = op.get('asset_issuer')
-
-            if asset_code != expected_asset_code:
-                logger.warning(
-                    f"Asset code mismatch. Expected: {expected_asset_code}, Got: {asset_code}"
-                )
-                continue
-
-            if asset_issuer != expected_asset_issuer:
-                logger.warning(
-                    f"Asset issuer mismatch. Expected: {expected_asset_issuer}, Got: {asset_issuer}"
-                )
-                continue
-
-            # Check amount (allow 0.01 tolerance for rounding)
-            actual_amount = Decimal(op.get('amount', '0'))
-            tolerance = Decimal('0.01')
-
-            if actual_amount < (expected_amount - tolerance):
-                logger.warning(
-                    f"Amount mismatch. Expected: {expected_amount}, "
-                    f"Got: {actual_amount}"
+            if payment_matches(op, expected_amount, expected_destination,
+                               expected_asset_code, expected_asset_issuer):
+                logger.info(
+                    f"USDC payment verified - TX: {tx_hash}, "
+                    f"Amount: {op.get('amount')}, Destination: {expected_destination}"
                 )
-                continue
-
-            # All checks passed!
-            logger.info(
-                f"USDC payment verified - TX: {tx_hash}, "
-                f"Amount: {actual_amount}, Destination: {expected_destination}"
-            )
-            return True
+                return True
 
         # No matching payment found
         logger.error(f"No matching USDC payment found in transaction {tx_hash}")
         return False
 
+    except BaseRequestError as e:
+        if is_transient(e):
+            # Let the caller retry instead of treating the payment as missing
+            raise
+        logger.error(f"Error verifying USDC payment: {e}", exc_info=True)
+        return False
+
     except Exception as e:
         logger.error(f"Error verifying USDC payment: {e}", exc_info=True)
         return False
@@ -292,7 +341,8 @@ def process_withdrawal(transaction_id: str, stellar_transaction_id: str) -> bool
     3. Log success/failure
 
     Note: Fiat payout is processed manually, and Node.js server will update
-    status to 'completed' after payout is done.
+    status to 'completed' after payout is done, in batches through
+    POST /internal/transactions/status (see anchor/views.py).
 
     Args:
         transaction_id: The withdrawal transaction ID
@@ -318,16 +368,18 @@ def process_withdrawal(transaction_id: str, stellar_transaction_id: str) -> bool
         )
 
         # 2. Fetch Stellar transaction from Horizon
-        server = Server(horizon_url=settings.HORIZON_URL)
-        stellar_tx = server.transactions().transaction(stellar_transaction_id).call()
+        stellar_tx = horizon_pool.read(
+            lambda server: server.transactions().transaction(stellar_transaction_id).call()
+        )
 
-        # 3. Verify USDC payment
+        # 3. Verify the payment of the withdrawal's asset
+        anchored = registry.get(transaction.asset_id)
         verified = verify_usdc_payment(
             stellar_tx=stellar_tx,
             expected_amount=transaction.amount_in,
             expected_destination=transaction.receiving_anchor_account,
-            expected_asset_code="USDC",
-            expected_asset_issuer=settings.USDC_ISSUER
+            expected_asset_code=anchored.code,
+            expected_asset_issuer=anchored.issuer
         )
 
         if not verified:
@@ -360,7 +412,14 @@ def process_withdrawal(transaction_id: str, stellar_transaction_id: str) -> bool
         logger.error(f"Transaction {transaction_id} not found")
         return False
 
-    except BaseHorizonError as e:
+    except BaseRequestError as e:
+        if is_transient(e):
+            # Horizon is unavailable or rate limiting us; nothing is known
+            # about the payment yet, so leave the withdrawal for a retry.
+            logger.warning(
+                f"Stellar network unavailable while verifying withdrawal {transaction_id}, retry later: {e}"
+            )
+            return False
         logger.error(
             f"Stellar network error while verifying withdrawal {transaction_id}: {e}"
         )
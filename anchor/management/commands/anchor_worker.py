@@ -0,0 +1,108 @@
+"""
+Django management command to run queued anchor jobs in a long-lived worker.
+
+Usage:
+    python manage.py anchor_worker [--threads N] [--poll-interval S] [--kind KIND ...] [--once]
+
+Example:
+    python manage.py anchor_worker --threads 8 --kind complete_deposit
+
+Queue work with `complete_deposit --queue`, `verify_withdrawal --queue` or
+anchor.integrations.jobs.enqueue(). Any number of workers can run side by
+side. Each one will:
+1. Claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED, up to its free threads
+2. Run them on a thread pool that keeps its Horizon sessions, hot wallet
+   sequence numbers and DB connections warm between jobs
+3. Record each outcome, re-queueing failed jobs with exponential backoff
+4. On SIGTERM or Ctrl-C, stop claiming and finish the jobs it holds
+"""
+
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from anchor.integrations.jobs import claim_jobs, load_job_modules, run_job
+
+
+def _run(job):
+    try:
+        return run_job(job)
+    finally:
+        # Reuses the thread's connection unless it is broken or older than CONN_MAX_AGE
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Run queued anchor jobs (deposit payouts, withdrawal checks, scans) in a worker daemon'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.JOB_WORKER_THREADS,
+            help='Number of jobs to run at once'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='Seconds to wait before polling an empty queue again'
+        )
+        parser.add_argument(
+            '--kind',
+            action='append',
+            dest='kinds',
+            help='Only run jobs of this kind (repeatable)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling'
+        )
+
+    def handle(self, *args, **options):
+        load_job_modules()
+        threads = options['threads']
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping: finishing running jobs')
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker} started with {threads} threads'))
+        done = failed = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job') as executor:
+            while not stopping.is_set():
+                for future in [f for f in running if f.done()]:
+                    running.discard(future)
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+
+                jobs = claim_jobs(worker, threads - len(running), options['kinds']) if len(running) < threads else []
+                for job in jobs:
+                    running.add(executor.submit(_run, job))
+
+                if not jobs:
+                    if options['once'] and not running:
+                        break
+                    stopping.wait(options['poll_interval'] if not running else 0.2)
+
+        for future in running:
+            if future.result():
+                done += 1
+            else:
+                failed += 1
+        self.stdout.write(f'  - Jobs done: {done}')
+        self.stdout.write(f'  - Jobs failed or re-queued: {failed}')
@@ -0,0 +1,62 @@
+"""
+Django management command to archive old, finished transactions.
+
+Usage:
+    python manage.py archive_transactions [--days N] [--batch-size N] [--dry-run]
+
+Example:
+    python manage.py archive_transactions --days 90 --batch-size 500
+
+Intended to run on a schedule (e.g. nightly cron). It will:
+1. Select completed/error transactions started more than N days ago
+2. Copy them into the anchor_archivedtransaction table in batches
+3. Delete the copied rows from polaris_transaction
+
+Defaults come from TRANSACTION_ARCHIVE_AFTER_DAYS and
+TRANSACTION_ARCHIVE_BATCH_SIZE in settings.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from anchor.integrations.archive import archive_transactions
+
+
+class Command(BaseCommand):
+    help = 'Move terminal transactions older than N days into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TRANSACTION_ARCHIVE_AFTER_DAYS,
+            help='Archive transactions started more than this many days ago'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TRANSACTION_ARCHIVE_BATCH_SIZE,
+            help='Number of transactions moved per database transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many transactions would be archived'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        batch_size = options['batch_size']
+
+        if days < 1:
+            raise CommandError('--days must be at least 1')
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        count = archive_transactions(days, batch_size, dry_run=options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(f'{count} transactions older than {days} days would be archived')
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'Archived {count} transactions older than {days} days')
+            )
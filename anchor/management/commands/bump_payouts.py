@@ -0,0 +1,53 @@
+"""
+Django management command to settle stalled deposit payouts, fee-bumping them if needed.
+
+Usage:
+    python manage.py bump_payouts [--queue]
+
+Example:
+    python manage.py bump_payouts --queue
+
+Run once with --queue to let anchor_worker repeat it every FEE_BUMP_INTERVAL
+seconds. For every payout submitted more than FEE_BUMP_AFTER seconds ago
+and still unconfirmed, it will:
+1. Complete its transaction if it is on the ledger, or mark it failed if it
+   failed there, so complete_deposit builds a new payout
+2. Expire it if a ledger closed after its time bounds without it, so
+   complete_deposit builds a new payout at the current fee
+3. Otherwise, if the network fee level is above what it pays, wrap it in a
+   fee bump paid by FEE_ACCOUNT and resubmit it
+"""
+
+from django.core.management.base import BaseCommand
+from anchor.integrations.feebump import bump_stalled_payouts
+from anchor.integrations.jobs import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Confirm, expire or fee-bump deposit payouts stuck after submission'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Queue a recurring sweep for anchor_worker instead of running now'
+        )
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            job = enqueue('bump_payouts')
+            self.stdout.write(self.style.SUCCESS(f'Queued payout sweep as job {job.id}'))
+            return
+
+        outcomes = bump_stalled_payouts()
+
+        self.stdout.write(f'  - Confirmed on ledger: {len(outcomes["confirmed"])}')
+        self.stdout.write(f'  - Failed on ledger: {len(outcomes["failed"])}')
+        self.stdout.write(f'  - Expired: {len(outcomes["expired"])}')
+        self.stdout.write(f'  - Fee-bumped: {len(outcomes["bumped"])}')
+        self.stdout.write(f'  - Still pending: {len(outcomes["pending"])}')
+
+        if outcomes["failed"] or outcomes["expired"]:
+            self.stdout.write(
+                self.style.WARNING('Run complete_deposit for failed and expired payouts to rebuild them')
+            )
@@ -0,0 +1,77 @@
+"""
+Django management command to find withdrawal payments that were never verified.
+
+Usage:
+    python manage.py catchup_withdrawals [--apply] [--account G...] [--cursor TOKEN] [--max-pages N]
+
+Example:
+    python manage.py catchup_withdrawals --apply
+
+Run after downtime, or on a schedule, instead of verifying each withdrawal by
+hand with verify_withdrawal. It will:
+1. Page through payments to each asset's receiving account from its stored
+   cursor (or only to --account)
+2. Match them to withdrawals waiting in pending_user_transfer_start
+3. Report the matches, or with --apply move them to pending_anchor and save
+   the cursor
+
+Without --apply nothing is written, so the report can be reviewed first.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from anchor.integrations.catchup import scan_account_payments, scan_withdrawal_payments
+
+
+class Command(BaseCommand):
+    help = 'Match unverified payments to open withdrawals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Update matched withdrawals and persist the scan cursor'
+        )
+        parser.add_argument(
+            '--account',
+            type=str,
+            default=None,
+            help='Only scan payments to this receiving account'
+        )
+        parser.add_argument(
+            '--cursor',
+            type=str,
+            default=None,
+            help='Horizon paging token to start from instead of the stored cursor (requires --account)'
+        )
+        parser.add_argument(
+            '--max-pages',
+            type=int,
+            default=None,
+            help='Stop after this many pages of 200 payments'
+        )
+
+    def handle(self, *args, **options):
+        if options['account']:
+            matches, scanned = scan_account_payments(
+                options['account'],
+                apply=options['apply'],
+                cursor=options['cursor'],
+                max_pages=options['max_pages'],
+            )
+        elif options['cursor']:
+            raise CommandError('--cursor only applies to a single --account')
+        else:
+            matches, scanned = scan_withdrawal_payments(apply=options['apply'], max_pages=options['max_pages'])
+
+        self.stdout.write(f'Scanned {scanned} payments, {len(matches)} matched open withdrawals')
+        for match in matches:
+            self.stdout.write(
+                f'  - {match.transaction_id}: {match.amount} {match.asset_code} in {match.tx_hash}'
+                f'{" (applied)" if match.applied else ""}'
+            )
+
+        if matches and not options['apply']:
+            self.stdout.write(self.style.WARNING('Re-run with --apply to update these withdrawals'))
+        elif matches:
+            applied = sum(1 for m in matches if m.applied)
+            self.stdout.write(self.style.SUCCESS(f'Moved {applied} withdrawals to pending_anchor'))
@@ -1,84 +1,117 @@
 """
-Django management command to complete a pending deposit transaction.
+Django management command to complete pending deposit transactions.
 
 Usage:
-    python manage.py complete_deposit <transaction_id>
+    python manage.py complete_deposit <transaction_id> [<transaction_id> ...] [--queue]
 
 Example:
     python manage.py complete_deposit abc123-def456-ghi789
 
 This command should be run by an admin after manually verifying that the user's
 fiat payment has been received. It will:
-1. Check the hot wallet USDC balance
-2. Send USDC from the hot wallet to the user's Stellar address
-3. Update the transaction status to completed
+1. Mark deposits still in pending_user_transfer_start as funded (pending_anchor)
+   and check that each user's account can receive the asset (prefetched in bulk)
+2. Check the hot wallet balance of each deposit's asset
+3. Send the asset from its hot wallet to the user's Stellar address, as a
+   claimable balance if there is no trustline and the wallet supports them
+4. Update the transaction status to completed (or pending_trust, to be
+   retried once the user adds a trustline)
+
+Deposits paid from different hot wallets are paid out in parallel, one pipeline
+per hot wallet.
+With --queue the deposits are handed to the anchor_worker daemon instead.
 """
 
+import uuid
+
 from django.core.management.base import BaseCommand, CommandError
 from polaris.models import Transaction
-from app.integrations.deposit import complete_deposit
+from anchor.integrations.deposit import complete_deposits
+from anchor.integrations.jobs import enqueue
 
 
 class Command(BaseCommand):
-    help = 'Complete a pending deposit by sending USDC from hot wallet'
+    help = 'Complete pending deposits by sending the asset from its hot wallet'
 
     def add_arguments(self, parser):
         parser.add_argument(
-            'transaction_id',
+            'transaction_ids',
+            nargs='+',
             type=str,
-            help='The ID of the transaction to complete'
+            help='The IDs of the transactions to complete'
         )
-
-    def handle(self, *args, **options):
-        transaction_id = options['transaction_id']
-
-        self.stdout.write(
-            self.style.WARNING(f'Attempting to complete deposit for transaction: {transaction_id}')
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Queue the deposits for anchor_worker instead of completing them now'
         )
 
-        # Verify transaction exists before attempting completion
-        try:
-            transaction = Transaction.objects.get(id=transaction_id, kind=Transaction.KIND.deposit)
-
-            self.stdout.write(f'Transaction found:')
-            self.stdout.write(f'  - ID: {transaction.id}')
+    def handle(self, *args, **options):
+        transaction_ids = []
+        for transaction_id in options['transaction_ids']:
+            try:
+                transaction_ids.append(str(uuid.UUID(transaction_id)))
+            except ValueError:
+                raise CommandError(f'"{transaction_id}" is not a transaction ID')
+
+        # Verify transactions exist before attempting completion
+        transactions = {
+            str(t.id): t
+            for t in Transaction.objects.filter(id__in=transaction_ids, kind=Transaction.KIND.deposit)
+            .select_related('asset')
+            .defer('channel_seed', 'asset__distribution_seed')
+        }
+        missing = [t for t in transaction_ids if t not in transactions]
+        if missing:
+            raise CommandError(f'Transaction "{missing[0]}" does not exist')
+
+        for transaction in transactions.values():
+            self.stdout.write(
+                self.style.WARNING(f'Attempting to complete deposit for transaction: {transaction.id}')
+            )
             self.stdout.write(f'  - Status: {transaction.status}')
+            self.stdout.write(f'  - Asset: {transaction.asset.code}')
             self.stdout.write(f'  - Amount In: {transaction.amount_in}')
             self.stdout.write(f'  - Amount Out: {transaction.amount_out}')
             self.stdout.write(f'  - Stellar Account: {transaction.stellar_account}')
-            self.stdout.write('')
+        self.stdout.write('')
 
-        except Transaction.DoesNotExist:
-            raise CommandError(f'Transaction "{transaction_id}" does not exist')
+        if options['queue']:
+            for transaction_id in transaction_ids:
+                job = enqueue('complete_deposit', {'transaction_id': transaction_id})
+                self.stdout.write(self.style.SUCCESS(f'Queued deposit {transaction_id} as job {job.id}'))
+            return
 
-        # Attempt to complete the deposit
-        success = complete_deposit(transaction_id)
+        # Attempt to complete the deposits
+        results = complete_deposits(transaction_ids)
 
-        if success:
+        failed = 0
+        for transaction_id, success in results.items():
             # Reload transaction to get updated status
-            transaction.refresh_from_db()
-
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully completed deposit for transaction {transaction_id}'
+            transaction = transactions[transaction_id]
+            transaction.refresh_from_db(fields=['status', 'status_message', 'stellar_transaction_id'])
+
+            if success:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'Successfully completed deposit for transaction {transaction_id}'
+                    )
                 )
-            )
-            self.stdout.write(f'  - New Status: {transaction.status}')
-            self.stdout.write(f'  - Stellar TX Hash: {transaction.stellar_transaction_id}')
-            self.stdout.write(f'  - Amount Sent: {transaction.amount_out} USDC')
-        else:
-            # Reload to see if status changed to error
-            transaction.refresh_from_db()
-
-            self.stdout.write(
-                self.style.ERROR(
-                    f'Failed to complete deposit for transaction {transaction_id}'
+                self.stdout.write(f'  - New Status: {transaction.status}')
+                self.stdout.write(f'  - Stellar TX Hash: {transaction.stellar_transaction_id}')
+                self.stdout.write(f'  - Amount Sent: {transaction.amount_out} {transaction.asset.code}')
+            else:
+                failed += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f'Failed to complete deposit for transaction {transaction_id}'
+                    )
                 )
-            )
-            self.stdout.write(f'  - Current Status: {transaction.status}')
-            if transaction.status_message:
-                self.stdout.write(f'  - Error Message: {transaction.status_message}')
+                self.stdout.write(f'  - Current Status: {transaction.status}')
+                if transaction.status_message:
+                    self.stdout.write(f'  - Error Message: {transaction.status_message}')
+
+        if failed:
             self.stdout.write('')
             self.stdout.write('Check logs for more details.')
-
-            raise CommandError('Deposit completion failed')
+            raise CommandError(f'{failed} of {len(results)} deposit completions failed')
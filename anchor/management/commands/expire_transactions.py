@@ -0,0 +1,79 @@
+"""
+Django management command to expire abandoned SEP-24 transactions.
+
+Usage:
+    python manage.py expire_transactions [--hours N] [--batch-size N] [--dry-run]
+                                         [--deposit-transfer-hours N]
+
+Example:
+    python manage.py expire_transactions --hours 72 --batch-size 500
+
+Intended to run on a schedule (e.g. hourly cron), alongside the workers. It will:
+1. Select incomplete transactions, and withdrawals in
+   pending_user_transfer_start, started more than N hours ago. Deposits in
+   pending_user_transfer_start wait for the bank's fiat confirmation and are
+   only selected after --deposit-transfer-hours (off by default)
+2. Move them to error ("Expired: ...") in batches, skipping rows a worker
+   has locked
+3. Queue on_change_callback notifications for the expired transactions
+
+Polaris has no "expired" status, hence error. Defaults come from
+TRANSACTION_EXPIRE_AFTER_HOURS, TRANSACTION_EXPIRE_BATCH_SIZE and
+DEPOSIT_TRANSFER_EXPIRE_AFTER_HOURS in settings.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from anchor.integrations.expiry import expire_transactions
+
+
+class Command(BaseCommand):
+    help = 'Move transactions abandoned for more than N hours to error'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.TRANSACTION_EXPIRE_AFTER_HOURS,
+            help='Expire transactions started more than this many hours ago'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TRANSACTION_EXPIRE_BATCH_SIZE,
+            help='Number of transactions expired per database transaction'
+        )
+        parser.add_argument(
+            '--deposit-transfer-hours',
+            type=int,
+            default=settings.DEPOSIT_TRANSFER_EXPIRE_AFTER_HOURS,
+            help='Also expire deposits awaiting fiat for more than this many hours (0: never)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many transactions would be expired'
+        )
+
+    def handle(self, *args, **options):
+        hours = options['hours']
+        batch_size = options['batch_size']
+
+        if hours < 1:
+            raise CommandError('--hours must be at least 1')
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        deposit_transfer_hours = options['deposit_transfer_hours']
+        if deposit_transfer_hours and deposit_transfer_hours < hours:
+            raise CommandError('--deposit-transfer-hours must be 0 or at least --hours')
+
+        count = expire_transactions(
+            hours, batch_size, dry_run=options['dry_run'], deposit_transfer_hours=deposit_transfer_hours
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{count} transactions older than {hours} hours would be expired')
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'Expired {count} transactions older than {hours} hours')
+            )
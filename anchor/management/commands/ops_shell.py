@@ -0,0 +1,108 @@
+"""
+Django management command to serve other management commands over a local socket.
+
+Usage:
+    python manage.py ops_shell [--socket PATH]
+
+Example:
+    python manage.py ops_shell &
+    python scripts/ops.py complete_deposit abc123-def456-ghi789
+    python scripts/ops.py - < deposits.txt
+
+Booting Django and Polaris costs about half a second per `manage.py` run,
+which adds up over scripted bulk runs. This command boots once and then:
+1. Listens on the Unix socket OPS_SHELL_SOCKET (mode 0600, owner only)
+2. Reads one JSON array per line, e.g. ["complete_deposit", "<id>"]
+3. Runs it with call_command if the command is in OPS_SHELL_COMMANDS
+4. Replies with one JSON object per line: {"status": 0 or 1, "output": "..."}
+
+Commands run one at a time, in the order they arrive.
+"""
+
+import io
+import json
+import logging
+import os
+import socketserver
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class OpsHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            self.wfile.write(json.dumps(self.run(line)).encode() + b"\n")
+            self.wfile.flush()
+
+    def run(self, line: bytes) -> dict:
+        try:
+            argv = json.loads(line)
+            if not isinstance(argv, list) or not argv or not all(isinstance(a, str) for a in argv):
+                raise ValueError("expected a JSON array of strings")
+        except ValueError as e:
+            return {"status": 1, "output": f"Invalid request: {e}\n"}
+
+        name, args = argv[0], argv[1:]
+        if name not in settings.OPS_SHELL_COMMANDS:
+            return {"status": 1, "output": f"Command {name!r} is not allowed in the ops shell\n"}
+
+        output = io.StringIO()
+        started = time.monotonic()
+        close_old_connections()
+        try:
+            call_command(name, *args, stdout=output, stderr=output)
+            status = 0
+        except CommandError as e:
+            output.write(f"CommandError: {e}\n")
+            status = 1
+        except Exception as e:
+            logger.error(f"Ops shell command {argv} failed: {e}", exc_info=True)
+            output.write(f"{type(e).__name__}: {e}\n")
+            status = 1
+        finally:
+            close_old_connections()
+
+        logger.info(f"Ops shell ran {name} in {(time.monotonic() - started) * 1000:.0f}ms (status {status})")
+        return {"status": status, "output": output.getvalue()}
+
+
+class Command(BaseCommand):
+    help = 'Serve management commands over a local Unix socket to skip per-command boot time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            type=str,
+            default=settings.OPS_SHELL_SOCKET,
+            help='Path of the Unix socket to listen on'
+        )
+
+    def handle(self, *args, **options):
+        path = options['socket']
+        if os.path.exists(path):
+            os.unlink(path)
+
+        # Only the user running the anchor may connect
+        old_umask = os.umask(0o177)
+        try:
+            server = socketserver.UnixStreamServer(path, OpsHandler)
+        finally:
+            os.umask(old_umask)
+
+        self.stdout.write(self.style.SUCCESS(f'Ops shell listening on {path}'))
+        self.stdout.write(f'  - Allowed commands: {", ".join(settings.OPS_SHELL_COMMANDS)}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.unlink(path)
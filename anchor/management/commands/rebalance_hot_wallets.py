@@ -0,0 +1,55 @@
+"""
+Django management command to check hot wallet liquidity and prepare top-ups.
+
+Usage:
+    python manage.py rebalance_hot_wallets [--no-prepare] [--queue]
+
+Example:
+    python manage.py rebalance_hot_wallets
+
+Run on a schedule, or once with --queue to let anchor_worker repeat it every
+REBALANCE_INTERVAL seconds. For each anchored asset it will:
+1. Forecast payout demand from funded deposits (pending_anchor, pending_trust)
+   and those awaiting fiat (pending_user_transfer_start)
+2. Compare it with the hot wallet balance and the asset's min_balance
+3. Below that threshold, prepare an unsigned treasury -> hot wallet payment
+   (see Hot wallet top-ups in the admin) and alert ALERT_EMAILS
+4. Print the unsigned XDR to be signed offline with the treasury key
+"""
+
+from django.core.management.base import BaseCommand
+from anchor.integrations.jobs import enqueue
+from anchor.integrations.rebalance import rebalance_hot_wallets
+
+
+class Command(BaseCommand):
+    help = 'Check hot wallet balances against payout demand and prepare treasury top-ups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-prepare',
+            action='store_true',
+            help='Only report; do not prepare top-up transactions'
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Queue a recurring rebalance job for anchor_worker instead of running now'
+        )
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            job = enqueue('rebalance_hot_wallets')
+            self.stdout.write(self.style.SUCCESS(f'Queued rebalance as job {job.id}'))
+            return
+
+        for liquidity in rebalance_hot_wallets(prepare=not options['no_prepare']):
+            style = self.style.SUCCESS if liquidity.level == 'ok' else self.style.ERROR
+            self.stdout.write(style(f'{liquidity.asset_code}: {liquidity.level}'))
+            self.stdout.write(f'  - Hot wallet balance: {liquidity.balance}')
+            self.stdout.write(f'  - Owed now (pending_anchor, pending_trust): {liquidity.committed}')
+            self.stdout.write(f'  - Forecast: {liquidity.forecast}')
+            if liquidity.top_up is not None:
+                top_up = liquidity.top_up
+                self.stdout.write(f'  - Top-up #{top_up.id}: {top_up.amount} from {top_up.treasury_account}')
+                self.stdout.write(f'    Unsigned XDR: {top_up.envelope_xdr}')
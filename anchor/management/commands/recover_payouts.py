@@ -0,0 +1,33 @@
+"""
+Django management command to reconcile stored deposit payouts with Stellar.
+
+Usage:
+    python manage.py recover_payouts
+
+Run at startup (e.g. as a release step) and after any crash. It will:
+1. Load every signed or submitted payout envelope whose outcome is unknown
+2. Fetch the recent transactions of each asset's hot wallet from Horizon in pages
+3. Complete the Polaris transaction of every payout found on the ledger
+4. Report the payouts still waiting to be resubmitted by complete_deposit
+"""
+
+from django.core.management.base import BaseCommand
+from anchor.integrations.payouts import recover_payouts
+
+
+class Command(BaseCommand):
+    help = 'Reconcile signed deposit payouts with the Stellar ledger'
+
+    def handle(self, *args, **options):
+        counts = recover_payouts()
+
+        self.stdout.write(f'  - Confirmed on ledger: {counts["confirmed"]}')
+        self.stdout.write(f'  - Failed on ledger: {counts["failed"]}')
+        self.stdout.write(f'  - Awaiting resubmission: {counts["pending"]}')
+
+        if counts["pending"]:
+            self.stdout.write(
+                self.style.WARNING('Run complete_deposit for pending transactions to resubmit them')
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS('All stored payouts are reconciled'))
@@ -0,0 +1,264 @@
+"""
+Django management command to replay a captured request trace against this app.
+
+Usage:
+    python manage.py replay_traces <trace.jsonl> [--speed N] [--concurrency N] [--limit N]
+                                   [--horizon-latency MS] [--live-horizon]
+
+Example:
+    TRACE_CAPTURE_FILE=data/peak.jsonl gunicorn anchor.wsgi      # in production
+    python manage.py replay_traces data/peak.jsonl --speed 4       # locally
+
+Traces come from TraceCaptureMiddleware (see anchor/traces.py). Run this
+against a scratch database: replayed POSTs create transactions. It will:
+1. Stub Horizon for Polaris and the anchor's Horizon pool (unless --live-horizon)
+2. Mint a SEP-10 token for each captured session (an expired one where the
+   captured token did not verify), and a Stellar account for each
+   pseudonymized address
+3. Create a local transaction, owned by the session's account, for each
+   transaction id the trace looked up successfully
+4. Send every request in-process at its captured offset divided by --speed
+   (--speed 0: as fast as the threads allow)
+5. Report per-endpoint latency percentiles next to those captured in production
+
+Lookups by Stellar or external transaction id still replay as 404s, and
+redacted SEP-10 challenges and interactive tokens are rejected; their
+latencies are still measured.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import jwt
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client
+from polaris import settings as polaris_settings
+from polaris.models import Transaction
+from stellar_sdk import Keypair, Server
+from anchor.integrations.assets import registry
+from anchor.integrations.horizon import horizon_pool
+from anchor.traces import REDACTED, StubHorizonClient, read_trace
+
+ALIAS = re.compile(r"^[GM]:[0-9a-f]{12}$")
+UUID = re.compile(r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(?=/|$)")
+# Query parameters that name a Polaris transaction by its id
+ID_PARAMS = ("id", "transaction_id")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class Replayer:
+    def __init__(self):
+        self.accounts = defaultdict(lambda: Keypair.random().public_key)
+        self.tokens = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def token_valid(record) -> bool:
+        """Whether the captured token verified; older traces only have the status to go by."""
+        if record.get("token_valid") is not None:
+            return record["token_valid"]
+        return record["status"] not in (401, 403)
+
+    def _token(self, alias, valid=True):
+        with self._lock:
+            if (alias, valid) not in self.tokens:
+                # An invalid token is replayed as one that expired an hour ago
+                now = int(time.time()) if valid else int(time.time()) - 25 * 3600
+                self.tokens[(alias, valid)] = jwt.encode(
+                    {
+                        "iss": f"{settings.HOST_URL}/auth",
+                        "sub": self.accounts[f"token:{alias}"],
+                        "iat": now,
+                        "exp": now + 24 * 3600,
+                        "jti": alias,
+                    },
+                    polaris_settings.SERVER_JWT_KEY,
+                    algorithm="HS256",
+                )
+            return self.tokens[(alias, valid)]
+
+    def seed(self, records) -> int:
+        """
+        Create the transactions the trace found, so their lookups do not 404.
+
+        Every id in a path or in ``ID_PARAMS`` of a request that succeeded in
+        production gets an incomplete SEP-24 transaction of the first anchored
+        asset, owned by the account of the first valid session that used it.
+        Returns the number of transactions created.
+        """
+        anchored = registry.all()
+        if not anchored:
+            return 0
+        owners = {}
+        for record in records:
+            if record["status"] >= 400:
+                continue
+            query = record.get("query") or {}
+            ids = [match[1:] for match in UUID.findall(record["path"])]
+            ids += [query[key] for key in ID_PARAMS if isinstance(query.get(key), str) and UUID.match(f"/{query[key]}")]
+            alias = record.get("token") if self.token_valid(record) else None
+            kind = Transaction.KIND.withdrawal if "withdraw" in record["path"] else Transaction.KIND.deposit
+            for transaction_id in ids:
+                if owners.get(transaction_id, (None,))[0] is None:
+                    owners[transaction_id] = (alias, kind)
+
+        existing = {str(pk) for pk in Transaction.objects.filter(id__in=list(owners)).values_list("id", flat=True)}
+        created = Transaction.objects.bulk_create(
+            Transaction(
+                id=transaction_id,
+                asset_id=anchored[0].id,
+                kind=kind,
+                protocol=Transaction.PROTOCOL.sep24,
+                status=Transaction.STATUS.incomplete,
+                stellar_account=self.accounts[f"token:{alias}" if alias else f"seed:{transaction_id}"],
+            )
+            for transaction_id, (alias, kind) in owners.items()
+            if transaction_id not in existing
+        )
+        return len(created)
+
+    def _restore(self, value):
+        if isinstance(value, dict):
+            return {k: self._restore(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._restore(v) for v in value]
+        if isinstance(value, str) and ALIAS.match(value):
+            with self._lock:
+                return self.accounts[value]
+        return value
+
+    def send(self, record):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0], raise_request_exception=False)
+        headers = {"HTTP_ACCEPT_LANGUAGE": record.get("language") or ""}
+        if record.get("token"):
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {self._token(record['token'], self.token_valid(record))}"
+        path = record["path"]
+        query = {k: v for k, v in self._restore(record.get("query") or {}).items() if v != REDACTED}
+        secure = settings.SECURE_SSL_REDIRECT
+
+        started = time.perf_counter()
+        if record["method"] == "GET":
+            response = client.get(path, query, secure=secure, **headers)
+        else:
+            body = self._restore(record.get("body"))
+            if record.get("content_type") == "application/json":
+                data, content_type = json.dumps(body), "application/json"
+            else:
+                data, content_type = urlencode(body or {}), "application/x-www-form-urlencoded"
+            if query:
+                path = f"{path}?{urlencode(query)}"
+            response = client.generic(record["method"], path, data, content_type, secure=secure, **headers)
+        elapsed = time.perf_counter() - started
+        close_old_connections()
+        return response.status_code, elapsed
+
+
+class Command(BaseCommand):
+    help = 'Replay a captured request trace and report latency per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace', type=str, help='JSONL trace written by TraceCaptureMiddleware')
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=1.0,
+            help='Replay N times faster than captured (0: no pauses)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Requests in flight at most'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Replay only the first N requests'
+        )
+        parser.add_argument(
+            '--horizon-latency',
+            type=float,
+            default=0.0,
+            help='Milliseconds added to each stubbed Horizon call'
+        )
+        parser.add_argument(
+            '--live-horizon',
+            action='store_true',
+            help='Use the configured Horizon instead of the stub'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            records = list(read_trace(options['trace']))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read trace {options["trace"]}: {e}')
+        records.sort(key=lambda r: r['t'])
+        if options['limit']:
+            records = records[:options['limit']]
+        if not records:
+            raise CommandError('The trace is empty')
+
+        if not options['live_horizon']:
+            stub = StubHorizonClient(
+                {f'{a.code}:{a.issuer}': '1000000.0000000' for a in registry.all()},
+                latency=options['horizon_latency'] / 1000,
+            )
+            polaris_settings.HORIZON_SERVER = Server(horizon_url=polaris_settings.HORIZON_URI, client=stub)
+            for endpoint in horizon_pool.endpoints:
+                endpoint.server = Server(horizon_url=endpoint.url, client=stub)
+
+        replayer = Replayer()
+        seeded = replayer.seed(records)
+        if seeded:
+            self.stdout.write(f'Created {seeded} local transactions for captured transaction ids')
+        speed = options['speed']
+        first = records[0]['t']
+        results = defaultdict(list)
+        statuses = defaultdict(Counter)
+        lags = []
+        self.stdout.write(f'Replaying {len(records)} requests at {"full" if not speed else f"{speed:g}x"} speed')
+
+        def run(record):
+            due = (record['t'] - first) / speed if speed else 0
+            wait = begin + due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            lags.append(max(0.0, -wait))
+            status, elapsed = replayer.send(record)
+            endpoint = f'{record["method"]} {UUID.sub("/{id}", record["path"])}'
+            results[endpoint].append((elapsed, record.get('duration_ms')))
+            statuses[endpoint][status] += 1
+
+        begin = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='replay') as executor:
+            list(executor.map(run, records))
+        wall = time.perf_counter() - begin
+
+        self.stdout.write(
+            f'{"endpoint":<48} {"n":>6} {"p50":>8} {"p90":>8} {"p99":>8} {"max":>8} {"prod p50":>9}  statuses'
+        )
+        for endpoint in sorted(results, key=lambda e: -len(results[e])):
+            elapsed = [r[0] * 1000 for r in results[endpoint]]
+            captured = [r[1] for r in results[endpoint] if r[1] is not None]
+            codes = ' '.join(f'{code}x{n}' for code, n in sorted(statuses[endpoint].items()))
+            self.stdout.write(
+                f'{endpoint[:48]:<48} {len(elapsed):>6} {percentile(elapsed, 50):>8.1f} {percentile(elapsed, 90):>8.1f}'
+                f' {percentile(elapsed, 99):>8.1f} {max(elapsed):>8.1f}'
+                f' {percentile(captured, 50) if captured else float("nan"):>9.1f}  {codes}'
+            )
+        self.stdout.write(f'  - Latencies in ms; wall time {wall:.1f}s, {len(records) / wall:.1f} requests/s')
+        self.stdout.write(f'  - Scheduling lag: p99 {percentile(lags, 99) * 1000:.1f}ms (raise --concurrency if high)')
@@ -0,0 +1,97 @@
+"""
+Django management command to hold the hot wallet keys in a separate signer process.
+
+Usage:
+    python manage.py signing_service [--socket PATH]
+
+Example:
+    USDC_HOT_WALLET_SECRET=S... python manage.py signing_service &
+    SIGNING_SOCKET=data/signer.sock gunicorn anchor.wsgi
+
+Web and worker processes started with SIGNING_SOCKET send transaction hashes
+here instead of loading the hot wallet secrets themselves. This command:
+1. Parses the hot wallet keypairs of the anchored assets once
+2. Listens on the Unix socket SIGNING_SOCKET (mode 0600, owner only)
+3. Reads one JSON object per line: {"account": "G...", "hashes": ["<hex>", ...]}
+4. Replies with {"signatures": ["<hex>", ...]}, in order, or {"error": "..."}
+
+A connection may send any number of requests; each thread of a client keeps
+its connection open.
+"""
+
+import json
+import logging
+import os
+import socketserver
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from anchor.integrations.signing import LocalSigner, SigningError
+
+logger = logging.getLogger(__name__)
+
+signer = LocalSigner()
+
+
+class SigningHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            self.wfile.write(json.dumps(self.sign(line)).encode() + b"\n")
+            self.wfile.flush()
+
+    def sign(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            if request.get("accounts"):
+                return {"accounts": signer.accounts()}
+            hashes = [bytes.fromhex(h) for h in request["hashes"]]
+            if any(len(h) != 32 for h in hashes):
+                raise ValueError("transaction hashes are 32 bytes")
+            signatures = signer.sign_hashes(request["account"], hashes)
+        except SigningError as e:
+            return {"error": str(e)}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return {"error": f"invalid request: {e}"}
+        logger.info(f"Signed {len(signatures)} transaction(s) for {request['account']}")
+        return {"signatures": [s.hex() for s in signatures]}
+
+
+class Command(BaseCommand):
+    help = 'Serve hot wallet signatures over a local Unix socket'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            type=str,
+            default=settings.SIGNING_SOCKET or os.path.join(settings.BASE_DIR, 'data/signer.sock'),
+            help='Path of the Unix socket to listen on'
+        )
+
+    def handle(self, *args, **options):
+        path = options['socket']
+        accounts = signer.accounts()
+        for account in accounts:
+            # Parse every key up front, and fail now on a bad secret
+            signer.sign_hashes(account, [])
+        if os.path.exists(path):
+            os.unlink(path)
+
+        # Only the user running the anchor may connect
+        old_umask = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(path, SigningHandler)
+        finally:
+            os.umask(old_umask)
+        server.daemon_threads = True
+
+        self.stdout.write(self.style.SUCCESS(f'Signing service listening on {path}'))
+        self.stdout.write(f'  - Accounts: {", ".join(accounts) or "none"}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.unlink(path)
@@ -2,7 +2,7 @@
 Django management command to verify USDC payment for a withdrawal transaction.
 
 Usage:
-    python manage.py verify_withdrawal <transaction_id> <stellar_tx_hash>
+    python manage.py verify_withdrawal <transaction_id> <stellar_tx_hash> [--queue]
 
 Example:
     python manage.py verify_withdrawal abc123-def456 a1b2c3d4e5f6...stellar_hash
@@ -20,7 +20,8 @@ and the Node.js server will update the status to 'completed' after payout.
 
 from django.core.management.base import BaseCommand, CommandError
 from polaris.models import Transaction
-from app.integrations.withdraw import process_withdrawal
+from anchor.integrations.jobs import enqueue
+from anchor.integrations.withdraw import process_withdrawal
 
 
 class Command(BaseCommand):
@@ -37,11 +38,24 @@ class Command(BaseCommand):
             type=str,
             help='The Stellar transaction hash containing the USDC payment'
         )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Queue the verification for anchor_worker instead of running it now'
+        )
 
     def handle(self, *args, **options):
         transaction_id = options['transaction_id']
         stellar_tx_id = options['stellar_tx_id']
 
+        if options['queue']:
+            job = enqueue('verify_withdrawal', {
+                'transaction_id': transaction_id,
+                'stellar_transaction_id': stellar_tx_id,
+            })
+            self.stdout.write(self.style.SUCCESS(f'Queued withdrawal {transaction_id} as job {job.id}'))
+            return
+
         self.stdout.write(
             self.style.WARNING(
                 f'Attempting to verify USDC payment for withdrawal transaction: {transaction_id}'
@@ -0,0 +1,193 @@
+import hashlib
+import hmac
+import random
+import time
+
+import jwt
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.http import HttpResponseNotModified
+from django.utils.module_loading import import_string
+
+from .db import is_pinned, replica_enabled, shared_cache, transaction_version, use_replica
+from .tokens import token_cache
+from .traces import TraceWriter, trace_record
+
+
+def _token_claims(request):
+    """
+    Claims of the request's SEP-10 token, read without verifying it.
+
+    Only used to choose a database or a cached answer; Polaris verifies the
+    token in the view.
+    """
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if not header.startswith("Bearer "):
+        return None
+    verified = token_cache.get(header[7:])
+    if verified is not None:
+        return verified.payload
+    try:
+        return jwt.decode(header[7:], options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return None
+
+
+def _token_account(request):
+    claims = _token_claims(request)
+    if claims is None:
+        return None
+    return claims.get("sub", "").split(":")[0] or None
+
+
+class _LaneHandler(BaseHandler):
+    """A request handler with its own middleware list, built like Django's own."""
+
+    def __init__(self, middleware):
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = convert_exception_to_response(self._get_response)
+        for path in reversed(middleware):
+            try:
+                instance = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(instance, "process_view"):
+                self._view_middleware.insert(0, instance.process_view)
+            if hasattr(instance, "process_template_response"):
+                self._template_response_middleware.append(instance.process_template_response)
+            if hasattr(instance, "process_exception"):
+                self._exception_middleware.append(instance.process_exception)
+            handler = convert_exception_to_response(instance)
+        self._middleware_chain = handler
+
+
+class FastLaneMiddleware:
+    """
+    Run machine-to-machine API requests (``FAST_LANE_PATHS``) through the
+    short ``FAST_LANE_MIDDLEWARE`` stack instead of the rest of MIDDLEWARE.
+
+    Sessions, CSRF, auth, messages, locale, clickjacking and the Polaris
+    timezone middleware only matter to the interactive flow and the admin;
+    SEP-10 JWT and JSON endpoints skip them. Must be first in MIDDLEWARE.
+    Paths match exactly, ignoring a trailing slash, so e.g. the interactive
+    webapp under /sep24/transactions/ keeps the full stack.
+    See scripts/bench_middleware.py for the per-request saving.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = frozenset(p.rstrip("/") for p in settings.FAST_LANE_PATHS)
+        self.fast_lane = _LaneHandler(settings.FAST_LANE_MIDDLEWARE)._middleware_chain
+
+    def __call__(self, request):
+        if request.path.rstrip("/") in self.paths:
+            return self.fast_lane(request)
+        return self.get_response(request)
+
+
+class ReplicaReadMiddleware:
+    """
+    Serve GETs of ``REPLICA_READ_PATHS`` (SEP-24 status polling) from the read
+    replica, unless the polling account was recently pinned to the primary.
+    Disabled without a replica, and without a shared cache (CACHE_URL): pins
+    set by the worker would not be seen, so wallets could read stale statuses.
+    """
+
+    def __init__(self, get_response):
+        if not replica_enabled():
+            raise MiddlewareNotUsed()
+        if not shared_cache():
+            raise MiddlewareNotUsed("replica reads need a shared CACHE_URL for primary pins")
+        self.get_response = get_response
+        self.paths = tuple(p.rstrip("/") for p in settings.REPLICA_READ_PATHS)
+
+    def __call__(self, request):
+        if request.method == "GET" and request.path.rstrip("/") in self.paths:
+            account = _token_account(request)
+            if account is not None and not is_pinned(account):
+                with use_replica():
+                    return self.get_response(request)
+        return self.get_response(request)
+
+
+class TransactionETagMiddleware:
+    """
+    Conditional GET for SEP-24 status polling (``ETAG_PATHS``).
+
+    The ETag is an HMAC of the bearer token, the full path and query, the
+    Accept-Language header and the account's transaction version counter
+    (see ``anchor.db.transaction_version``), so it can be checked without
+    touching the database. A poll whose If-None-Match matches gets a 304
+    before any view runs. Only a client that already got a 200 with that
+    exact, unexpired token can hold a matching ETag.
+
+    Disabled without a shared cache (CACHE_URL): a version bumped by the
+    worker would not reach the web servers, which would keep answering 304.
+    """
+
+    def __init__(self, get_response):
+        if not shared_cache():
+            raise MiddlewareNotUsed("ETags need a shared CACHE_URL for transaction versions")
+        self.get_response = get_response
+        self.paths = tuple(p.rstrip("/") for p in settings.ETAG_PATHS)
+
+    def _etag(self, request, claims):
+        account = claims.get("sub", "").split(":")[0]
+        message = "\n".join([
+            request.META["HTTP_AUTHORIZATION"],
+            request.get_full_path(),
+            request.META.get("HTTP_ACCEPT_LANGUAGE", ""),
+            str(transaction_version(account)),
+        ])
+        digest = hmac.new(settings.SECRET_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+        return f'"{digest[:32]}"'
+
+    def __call__(self, request):
+        if request.method != "GET" or request.path.rstrip("/") not in self.paths:
+            return self.get_response(request)
+        claims = _token_claims(request)
+        if not claims or not claims.get("sub") or claims.get("exp", 0) <= time.time():
+            return self.get_response(request)
+
+        etag = self._etag(request, claims)
+        if etag in request.META.get("HTTP_IF_NONE_MATCH", ""):
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            return response
+
+        response = self.get_response(request)
+        if response.status_code == 200:
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+class TraceCaptureMiddleware:
+    """
+    Write a sanitized trace of requests under ``TRACE_CAPTURE_PATHS`` to
+    ``TRACE_CAPTURE_FILE`` (see anchor/traces.py), sampling
+    ``TRACE_SAMPLE_RATE`` of them. Disabled when no file is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TRACE_CAPTURE_FILE:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.paths = tuple(settings.TRACE_CAPTURE_PATHS)
+        self.writer = TraceWriter(settings.TRACE_CAPTURE_FILE)
+
+    def __call__(self, request):
+        if not request.path.startswith(self.paths) or random.random() >= settings.TRACE_SAMPLE_RATE:
+            return self.get_response(request)
+        if request.method in ("POST", "PUT", "PATCH"):
+            request.body  # keep the body readable after the view consumed the stream
+        started = time.time()
+        begin = time.perf_counter()
+        response = self.get_response(request)
+        self.writer.write(trace_record(request, response, started, time.perf_counter() - begin))
+        return response
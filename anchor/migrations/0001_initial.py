@@ -0,0 +1,38 @@
+# Generated by Django 4.2.17 on 2026-10-19 02:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=31)),
+                ('asset_code', models.TextField(blank=True, null=True)),
+                ('stellar_account', models.TextField()),
+                ('amount_in', models.DecimalField(blank=True, decimal_places=7, max_digits=30, null=True)),
+                ('amount_out', models.DecimalField(blank=True, decimal_places=7, max_digits=30, null=True)),
+                ('amount_fee', models.DecimalField(blank=True, decimal_places=7, max_digits=30, null=True)),
+                ('stellar_transaction_id', models.TextField(blank=True, null=True)),
+                ('external_transaction_id', models.TextField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('data', models.JSONField()),
+            ],
+            options={
+                'ordering': ('-started_at',),
+                'indexes': [models.Index(fields=['stellar_account', 'kind'], name='anchor_arch_stellar_e42d60_idx'), models.Index(fields=['started_at'], name='anchor_arch_started_10b1ba_idx')],
+            },
+        ),
+    ]
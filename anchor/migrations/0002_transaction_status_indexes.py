@@ -0,0 +1,59 @@
+"""
+Partial indexes on ``polaris_transaction`` owned by the anchor app.
+
+Operational queries (admin listing, SEP-24 ``/transactions``, the payout and
+verification commands) filter by ``kind`` and an open ``status``. The open set
+is a small fraction of the table, so indexing only those rows keeps the index
+tiny and hot as ``completed``/``error`` history grows. A second partial index
+on terminal rows lets ``archive_transactions`` page through old history
+without scanning open work.
+
+Both PostgreSQL and SQLite support ``CREATE INDEX ... WHERE``. On PostgreSQL
+the indexes are built ``CONCURRENTLY`` so writes to the table are not blocked
+while they build, which needs a non-atomic migration. If a concurrent build
+fails it leaves an INVALID index behind: drop it before migrating again.
+"""
+
+from django.db import migrations
+
+from anchor.models import OPEN_STATUSES, TERMINAL_STATUSES
+
+
+def _in(statuses):
+    return ", ".join(f"'{s}'" for s in statuses)
+
+
+def _concurrently(schema_editor):
+    return "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+
+
+def partial_index(name, columns, statuses):
+    """Create the partial index ``name`` on ``polaris_transaction``, concurrently on PostgreSQL."""
+
+    def create(apps, schema_editor):
+        schema_editor.execute(
+            f"CREATE INDEX {_concurrently(schema_editor)}IF NOT EXISTS {name} "
+            f"ON polaris_transaction ({columns}) WHERE status IN ({_in(statuses)})"
+        )
+
+    def drop(apps, schema_editor):
+        schema_editor.execute(f"DROP INDEX {_concurrently(schema_editor)}IF EXISTS {name}")
+
+    return migrations.RunPython(create, drop)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("anchor", "0001_initial"),
+        ("polaris", "0014_auto_20220211_0624"),
+    ]
+
+    operations = [
+        partial_index("anchor_txn_open_kind_status_idx", "kind, status, started_at", OPEN_STATUSES),
+        partial_index("anchor_txn_open_account_idx", "stellar_account, kind", OPEN_STATUSES),
+        partial_index("anchor_txn_terminal_started_idx", "started_at", TERMINAL_STATUSES),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.17 on 2026-10-19 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anchor', '0002_transaction_status_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutEnvelope',
+            fields=[
+                ('transaction_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('tx_hash', models.CharField(max_length=64, unique=True)),
+                ('sequence', models.BigIntegerField()),
+                ('envelope_xdr', models.TextField()),
+                ('status', models.CharField(choices=[('signed', 'Signed'), ('submitted', 'Submitted'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], default='signed', max_length=9)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='anchor_payo_status_1a645e_idx')],
+            },
+        ),
+    ]
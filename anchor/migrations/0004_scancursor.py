@@ -0,0 +1,21 @@
+# Generated by Django 4.2.17 on 2026-10-19 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anchor', '0003_payoutenvelope'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanCursor',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('cursor', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.17 on 2026-10-19 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anchor', '0005_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotWalletTopUp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_code', models.CharField(max_length=12)),
+                ('asset_issuer', models.CharField(max_length=56)),
+                ('treasury_account', models.CharField(max_length=56)),
+                ('hot_wallet_account', models.CharField(max_length=56)),
+                ('amount', models.DecimalField(decimal_places=7, max_digits=30)),
+                ('sequence', models.BigIntegerField()),
+                ('tx_hash', models.CharField(max_length=64, unique=True)),
+                ('envelope_xdr', models.TextField()),
+                ('status', models.CharField(choices=[('prepared', 'Prepared'), ('confirmed', 'Confirmed'), ('superseded', 'Superseded')], default='prepared', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+                'indexes': [models.Index(fields=['asset_code', 'status'], name='anchor_hotw_asset_c_151e54_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-19 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anchor', '0006_hotwallettopup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payoutenvelope',
+            name='fee_bump_xdr',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,164 @@
+from django.db import models
+from django.utils import timezone
+from polaris.models import Transaction
+
+S = Transaction.STATUS
+
+# Polaris statuses that still need work from the anchor, the user or Stellar.
+# migrations/0002_transaction_status_indexes.py indexes these rows.
+OPEN_STATUSES = (
+    S.pending_anchor,
+    S.pending_trust,
+    S.pending_user,
+    S.pending_user_transfer_start,
+    S.incomplete,
+    S.pending_external,
+    S.pending_stellar,
+)
+
+# Polaris statuses a transaction never leaves.
+TERMINAL_STATUSES = (
+    S.completed,
+    S.error,
+    S.no_market,
+    S.too_small,
+    S.too_large,
+)
+
+
+class ArchivedTransaction(models.Model):
+    """
+    Terminal Polaris ``Transaction`` rows moved out of the hot table by the
+    ``archive_transactions`` command.
+
+    The columns finance and support look up most are kept as real fields; the
+    full original row is preserved in ``data`` so nothing is lost on archival.
+    """
+
+    id = models.UUIDField(primary_key=True)
+    kind = models.CharField(max_length=20)
+    status = models.CharField(max_length=31)
+    asset_code = models.TextField(null=True, blank=True)
+    stellar_account = models.TextField()
+    amount_in = models.DecimalField(null=True, blank=True, max_digits=30, decimal_places=7)
+    amount_out = models.DecimalField(null=True, blank=True, max_digits=30, decimal_places=7)
+    amount_fee = models.DecimalField(null=True, blank=True, max_digits=30, decimal_places=7)
+    stellar_transaction_id = models.TextField(null=True, blank=True)
+    external_transaction_id = models.TextField(null=True, blank=True)
+    started_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    data = models.JSONField()
+
+    class Meta:
+        ordering = ("-started_at",)
+        indexes = [
+            models.Index(fields=["stellar_account", "kind"]),
+            models.Index(fields=["started_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
+
+
+class PayoutEnvelope(models.Model):
+    """
+    Signed Stellar payment for a deposit payout, persisted before submission.
+
+    Keyed by the Polaris transaction id. A retry of ``complete_deposit``
+    resubmits ``envelope_xdr`` as-is instead of building and signing a new
+    payment, so a payout can never be sent twice.
+    """
+
+    STATUS = models.TextChoices("STATUS", "signed submitted confirmed failed")
+
+    transaction_id = models.UUIDField(primary_key=True)
+    tx_hash = models.CharField(max_length=64, unique=True)
+    sequence = models.BigIntegerField()
+    envelope_xdr = models.TextField()
+    status = models.CharField(max_length=9, choices=STATUS.choices, default=STATUS.signed)
+    # Latest fee bump of envelope_xdr paid by FEE_ACCOUNT, if the payout stalled
+    fee_bump_xdr = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.transaction_id} {self.tx_hash} ({self.status})"
+
+
+class ScanCursor(models.Model):
+    """Last Horizon paging token processed by a catch-up scanner, by scanner name."""
+
+    name = models.CharField(max_length=64, primary_key=True)
+    cursor = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.cursor}"
+
+
+class Job(models.Model):
+    """
+    Unit of work for the ``anchor_worker`` daemon, e.g. completing one deposit.
+
+    ``kind`` names a handler in ``anchor.integrations.jobs``; ``payload`` holds
+    its arguments. Workers claim queued jobs with ``SELECT ... FOR UPDATE SKIP
+    LOCKED``, so any number of them can share the table.
+    """
+
+    STATUS = models.TextChoices("STATUS", "queued running done failed")
+
+    kind = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=7, choices=STATUS.choices, default=STATUS.queued)
+    priority = models.SmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_after", "priority"])]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class HotWalletTopUp(models.Model):
+    """
+    Unsigned payment from a treasury account to a hot wallet, prepared by the
+    rebalancer when the hot wallet cannot cover upcoming payouts.
+
+    ``envelope_xdr`` is signed offline with the treasury key and submitted by
+    an operator. A newer top-up for the same asset supersedes a prepared one,
+    since both would use the same treasury sequence number.
+    """
+
+    STATUS = models.TextChoices("STATUS", "prepared confirmed superseded")
+
+    asset_code = models.CharField(max_length=12)
+    asset_issuer = models.CharField(max_length=56)
+    treasury_account = models.CharField(max_length=56)
+    hot_wallet_account = models.CharField(max_length=56)
+    amount = models.DecimalField(max_digits=30, decimal_places=7)
+    sequence = models.BigIntegerField()
+    tx_hash = models.CharField(max_length=64, unique=True)
+    envelope_xdr = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS.choices, default=STATUS.prepared)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        indexes = [models.Index(fields=["asset_code", "status"])]
+
+    def __str__(self):
+        return f"{self.amount} {self.asset_code} to {self.hot_wallet_account} ({self.status})"
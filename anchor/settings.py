@@ -11,11 +11,11 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 from pathlib import Path
-import warnings
-from django.test.utils import ignore_warnings
 import os
+import json
 import environ
 import warnings
+from django.core.exceptions import ImproperlyConfigured
 
 warnings.filterwarnings("ignore", message="No directory at", module="whitenoise.base" )
 
@@ -68,8 +68,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'anchor.middleware.TraceCaptureMiddleware',
+    'anchor.middleware.FastLaneMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'anchor.middleware.TransactionETagMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -79,7 +82,26 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'polaris.middleware.TimezoneMiddleware',
+    'anchor.middleware.ReplicaReadMiddleware',
+]
+
+# JWT/JSON API routes run only this stack (see anchor.middleware.FastLaneMiddleware)
+FAST_LANE_MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'anchor.middleware.TransactionETagMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'anchor.middleware.ReplicaReadMiddleware',
 ]
+FAST_LANE_PATHS = env.list('FAST_LANE_PATHS', default=[
+    '/.well-known/stellar.toml',
+    '/auth',
+    '/sep24/info',
+    '/sep24/fee',
+    '/sep24/transaction',
+    '/sep24/transactions',
+    '/internal/transactions/status',
+])
 
 FORM_RENDERER = "django.forms.renderers.DjangoTemplates"
 
@@ -131,7 +153,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, "collectstatic")
 if DEBUG:
     STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
 else:
-    STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
+    # Hashed names let WhiteNoise serve them with "Cache-Control: immutable";
+    # collectstatic also writes .gz (and .br with Brotli installed) variants.
+    # Run `manage.py check_static` after collectstatic to catch missing files.
+    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+    # Cache lifetime of files served without a hash in their name
+    WHITENOISE_MAX_AGE = int(os.environ.get('WHITENOISE_MAX_AGE', '3600'))
 
 ROOT_URLCONF = 'anchor.urls'
 
@@ -167,6 +194,30 @@ else:
     DATABASES = {
         'default': env.db('DATABASE_URL')
     }
+    # Keep connections open between requests and worker jobs
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    # Optional read replica for SEP-24 status polling (see anchor/db.py)
+    if os.environ.get('REPLICA_DATABASE_URL'):
+        DATABASES['replica'] = env.db('REPLICA_DATABASE_URL')
+        DATABASES['replica']['CONN_MAX_AGE'] = DATABASES['default']['CONN_MAX_AGE']
+        DATABASES['replica']['CONN_HEALTH_CHECKS'] = True
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['anchor.db.ReplicaRouter']
+REPLICA_READ_PATHS = env.list('REPLICA_READ_PATHS', default=['/sep24/transaction', '/sep24/transactions'])
+# How long an account reads from the primary after one of its transactions changes
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '10'))
+# Status polling answered with 304 Not Modified when nothing changed
+ETAG_PATHS = env.list('ETAG_PATHS', default=['/sep24/transaction', '/sep24/transactions'])
+
+# Verified SEP-10 tokens kept per process (see anchor/tokens.py); 0 disables
+JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', '10000'))
+
+# Must be shared between processes (e.g. redis://) for status polling ETags
+# and replica reads, which stay off with the default per-process cache.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -221,3 +272,141 @@ if ENVIRONMENT == "production":
 else:  # development
     LOCAL_MODE = True
     HOST_URL = os.environ.get('HOST_URL', 'http://localhost:8000')
+
+# Standalone interactive UI that SEP-24 /interactive redirects to.
+# INTERACTIVE_UI_URLS overrides it per asset, e.g. "EURC=https://eur.linkio.world/menu"
+if ENVIRONMENT == "development":
+    INTERACTIVE_UI_URL = os.environ.get('INTERACTIVE_UI_URL', 'http://localhost:3000/menu')
+else:
+    INTERACTIVE_UI_URL = os.environ.get('INTERACTIVE_UI_URL', 'https://origin.linkio.world/menu')
+INTERACTIVE_UI_URLS = env.dict('INTERACTIVE_UI_URLS', default={})
+
+# Signed handoff between the anchor and the interactive UI. The secret is
+# shared with the UI backend, which signs the values it sends back, so it
+# must not be SECRET_KEY. Handoff signing is disabled when it is empty.
+INTERACTIVE_HANDOFF_SECRET = os.environ.get('INTERACTIVE_HANDOFF_SECRET', '')
+if INTERACTIVE_HANDOFF_SECRET and INTERACTIVE_HANDOFF_SECRET == SECRET_KEY:
+    raise ImproperlyConfigured('INTERACTIVE_HANDOFF_SECRET must differ from SECRET_KEY')
+INTERACTIVE_HANDOFF_MAX_AGE = int(os.environ.get('INTERACTIVE_HANDOFF_MAX_AGE', '3600'))
+INTERACTIVE_HANDOFF_REQUIRED = os.environ.get('INTERACTIVE_HANDOFF_REQUIRED', 'False').lower() == 'true'
+if INTERACTIVE_HANDOFF_REQUIRED and not INTERACTIVE_HANDOFF_SECRET:
+    raise ImproperlyConfigured('INTERACTIVE_HANDOFF_REQUIRED needs INTERACTIVE_HANDOFF_SECRET')
+INTERACTIVE_UI_LEGACY_PARAMS = os.environ.get('INTERACTIVE_UI_LEGACY_PARAMS', 'True').lower() == 'true'
+
+# Internal API for the fiat backend (see anchor/views.py). Disabled when the
+# token is empty.
+INTERNAL_API_TOKEN = os.environ.get('INTERNAL_API_TOKEN', '')
+INTERNAL_API_MAX_BATCH = int(os.environ.get('INTERNAL_API_MAX_BATCH', '1000'))
+
+# Transaction archival (see `manage.py archive_transactions`)
+TRANSACTION_ARCHIVE_AFTER_DAYS = int(os.environ.get('TRANSACTION_ARCHIVE_AFTER_DAYS', '90'))
+TRANSACTION_ARCHIVE_BATCH_SIZE = int(os.environ.get('TRANSACTION_ARCHIVE_BATCH_SIZE', '500'))
+
+# Abandoned interactive transactions (see `manage.py expire_transactions`)
+TRANSACTION_EXPIRE_AFTER_HOURS = int(os.environ.get('TRANSACTION_EXPIRE_AFTER_HOURS', '72'))
+TRANSACTION_EXPIRE_BATCH_SIZE = int(os.environ.get('TRANSACTION_EXPIRE_BATCH_SIZE', '500'))
+# Deposits awaiting the bank's fiat confirmation never expire unless this is set
+DEPOSIT_TRANSFER_EXPIRE_AFTER_HOURS = int(os.environ.get('DEPOSIT_TRANSFER_EXPIRE_AFTER_HOURS', '0'))
+
+# NGN rates, fees and SEP-38 quotes (see anchor/integrations/rates.py)
+RATE_PROVIDER = os.environ.get('RATE_PROVIDER', 'anchor.integrations.rates.StaticRateProvider')
+RATE_FILE = os.environ.get('RATE_FILE', os.path.join(BASE_DIR, 'data/rates.json'))
+NGN_RATES = env.dict('NGN_RATES', default={})
+RATE_TTL = int(os.environ.get('RATE_TTL', '60'))
+RATE_MAX_STALENESS = int(os.environ.get('RATE_MAX_STALENESS', '900'))
+QUOTE_TTL = int(os.environ.get('QUOTE_TTL', '300'))
+# JSON: {"USDC": {"deposit": [[up_to, fixed, percent], ...], "withdraw": [...]}}
+FEE_SCHEDULES = json.loads(os.environ.get('FEE_SCHEDULES', '{}'))
+
+# Stellar payouts and withdrawal verification
+if ENVIRONMENT == "production":
+    HORIZON_URL = os.environ.get('HORIZON_URL', 'https://horizon.stellar.org')
+    STELLAR_NETWORK_PASSPHRASE = os.environ.get('STELLAR_NETWORK_PASSPHRASE', 'Public Global Stellar Network ; September 2015')
+else:
+    HORIZON_URL = os.environ.get('HORIZON_URL', 'https://horizon-testnet.stellar.org')
+    STELLAR_NETWORK_PASSPHRASE = os.environ.get('STELLAR_NETWORK_PASSPHRASE', 'Test SDF Network ; September 2015')
+# Horizon nodes to spread requests over, e.g. "https://h1.example.com,https://h2.example.com"
+HORIZON_URLS = env.list('HORIZON_URLS', default=[HORIZON_URL])
+HORIZON_TIMEOUT = int(os.environ.get('HORIZON_TIMEOUT', '10'))
+HORIZON_HEDGE_DELAY = float(os.environ.get('HORIZON_HEDGE_DELAY', '0.5'))
+HORIZON_HEDGE_MIN_DELAY = float(os.environ.get('HORIZON_HEDGE_MIN_DELAY', '0.05'))
+HORIZON_BREAKER_THRESHOLD = int(os.environ.get('HORIZON_BREAKER_THRESHOLD', '3'))
+HORIZON_BREAKER_COOLDOWN = int(os.environ.get('HORIZON_BREAKER_COOLDOWN', '30'))
+# Per-node request budget (Horizon's default limit is 3600 requests per hour per IP)
+HORIZON_RATE_LIMIT = int(os.environ.get('HORIZON_RATE_LIMIT', '3600'))
+HORIZON_RATE_BURST = int(os.environ.get('HORIZON_RATE_BURST', '100'))
+HORIZON_BACKGROUND_RESERVE = float(os.environ.get('HORIZON_BACKGROUND_RESERVE', '0.2'))
+HORIZON_RATE_LIMIT_MAX_WAIT = int(os.environ.get('HORIZON_RATE_LIMIT_MAX_WAIT', '120'))
+USDC_ISSUER = os.environ.get('USDC_ISSUER')
+USDC_HOT_WALLET_PUBLIC = os.environ.get('USDC_HOT_WALLET_PUBLIC')
+USDC_HOT_WALLET_SECRET = os.environ.get('USDC_HOT_WALLET_SECRET')
+USDC_RECEIVING_ADDRESS = os.environ.get('USDC_RECEIVING_ADDRESS')
+# Accounts of every other anchored asset, as JSON keyed by asset code:
+# {"EURC": {"hot_wallet_public": "G...", "hot_wallet_secret": "S...", "receiving_account": "G..."}}
+# Hot wallet top-ups also read "treasury_account", "min_balance" and "target_balance" (any asset, USDC included).
+ANCHOR_ASSETS = json.loads(os.environ.get('ANCHOR_ASSETS', '{}'))
+# Seconds before the process-wide asset registry re-reads polaris Assets
+ASSET_REGISTRY_TTL = int(os.environ.get('ASSET_REGISTRY_TTL', '300'))
+PAYOUT_MAX_WORKERS = int(os.environ.get('PAYOUT_MAX_WORKERS', '4'))
+# Seconds a signed payout stays valid; long enough for a stalled one to be fee-bumped
+PAYOUT_TIMEOUT = int(os.environ.get('PAYOUT_TIMEOUT', '120'))
+
+# Fee bumps of stalled payouts (see anchor/integrations/feebump.py). The fee
+# account pays them and needs XLM; without it stalled payouts only expire.
+FEE_ACCOUNT = os.environ.get('FEE_ACCOUNT', '')
+FEE_ACCOUNT_SECRET = os.environ.get('FEE_ACCOUNT_SECRET', '')
+# Fee level: this percentile of the fees charged in recent ledgers, cached FEE_LEVEL_TTL seconds
+FEE_LEVEL_PERCENTILE = int(os.environ.get('FEE_LEVEL_PERCENTILE', '90'))
+FEE_LEVEL_TTL = int(os.environ.get('FEE_LEVEL_TTL', '30'))
+FEE_BUMP_AFTER = int(os.environ.get('FEE_BUMP_AFTER', '20'))
+FEE_BUMP_INTERVAL = int(os.environ.get('FEE_BUMP_INTERVAL', '15'))
+# Highest fee per operation a bump may offer, in stroops
+FEE_BUMP_MAX_FEE = int(os.environ.get('FEE_BUMP_MAX_FEE', '100000'))
+
+# Job queue and `manage.py anchor_worker` (see anchor/integrations/jobs.py)
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', '4'))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '2'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', '30'))
+JOB_LOCK_TIMEOUT = int(os.environ.get('JOB_LOCK_TIMEOUT', '600'))
+# Extra modules that register job handlers with @job
+ANCHOR_JOB_MODULES = env.list('ANCHOR_JOB_MODULES', default=[])
+
+# Deposit destination checks (see anchor/integrations/destinations.py): how
+# long an account's trustlines are trusted, and rechecked when one is missing
+DESTINATION_CACHE_TTL = int(os.environ.get('DESTINATION_CACHE_TTL', '600'))
+DESTINATION_NOT_READY_TTL = int(os.environ.get('DESTINATION_NOT_READY_TTL', '30'))
+DESTINATION_PREFETCH_WORKERS = int(os.environ.get('DESTINATION_PREFETCH_WORKERS', '8'))
+
+# Sanitized request traces for `manage.py replay_traces` (see anchor/traces.py).
+# Capture is off unless TRACE_CAPTURE_FILE is set.
+TRACE_CAPTURE_FILE = os.environ.get('TRACE_CAPTURE_FILE', '')
+TRACE_CAPTURE_PATHS = env.list('TRACE_CAPTURE_PATHS', default=['/auth', '/sep24/', '/.well-known/'])
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '1'))
+TRACE_REDACTED_FIELDS = set(env.list('TRACE_REDACTED_FIELDS', default=[
+    'transaction', 'token', 'jwt', 'signature', 'memo', 'hashed', 'callback', 'on_change_callback',
+    'email', 'email_address', 'phone', 'mobile_number', 'first_name', 'last_name', 'name',
+    'account_number', 'bank_account_number', 'bank_account', 'bank_name', 'bank_number', 'bank_branch_number',
+    'iban', 'bic', 'bvn', 'nuban', 'routing_number', 'sort_code', 'id_number', 'address', 'dest', 'dest_extra',
+]))
+
+# Hot wallet signing (see anchor/integrations/signing.py). With a socket set,
+# payouts are signed by `manage.py signing_service` instead of in-process.
+SIGNING_SOCKET = os.environ.get('SIGNING_SOCKET', '')
+SIGNING_TIMEOUT = float(os.environ.get('SIGNING_TIMEOUT', '5'))
+
+# Long-lived ops shell (see `manage.py ops_shell` and scripts/ops.py)
+OPS_SHELL_SOCKET = os.environ.get('OPS_SHELL_SOCKET', os.path.join(BASE_DIR, 'data/ops.sock'))
+OPS_SHELL_COMMANDS = env.list('OPS_SHELL_COMMANDS', default=[
+    'complete_deposit', 'verify_withdrawal', 'catchup_withdrawals', 'recover_payouts', 'archive_transactions',
+])
+
+# Hot wallet rebalancing (see anchor/integrations/rebalance.py)
+REBALANCE_INTERVAL = int(os.environ.get('REBALANCE_INTERVAL', '300'))
+REBALANCE_TOPUP_TIMEOUT = int(os.environ.get('REBALANCE_TOPUP_TIMEOUT', '86400'))
+
+# Operational alerts are logged and emailed to ALERT_EMAILS
+ADMINS = [(email, email) for email in env.list('ALERT_EMAILS', default=[])]
+SERVER_EMAIL = os.environ.get('SERVER_EMAIL', 'anchor@linkio.world')
+vars().update(env.email_url('EMAIL_URL', default='consolemail://'))
+ALERT_INTERVAL = int(os.environ.get('ALERT_INTERVAL', '3600'))
@@ -0,0 +1,354 @@
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlparse
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from polaris.models import Asset, Transaction
+from stellar_sdk import Keypair, Server, TransactionEnvelope
+from stellar_sdk.exceptions import ConnectionError
+
+from anchor.integrations import deposit, jobs
+from anchor.integrations.assets import registry
+from anchor.integrations.horizon import horizon_pool
+from anchor.integrations.payouts import envelope_max_time, forget_source_account, recover_payouts
+from anchor.integrations.signing import signer
+from anchor.models import Job, PayoutEnvelope
+from anchor.traces import StubHorizonClient
+
+NETWORK = "Test SDF Network ; September 2015"
+ISSUER = Keypair.random().public_key
+HOT_WALLET = Keypair.random()
+
+
+class RecordingHorizonClient(StubHorizonClient):
+    """
+    StubHorizonClient that keeps the envelopes submitted to it, rejects those
+    in ``rejected`` with their result code, serves the records in ``applied``
+    and ``history`` as every account's transactions, and reports ``closed_at``
+    as the close time of the latest ledger.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = []
+        self.rejected = {}
+        self.applied = {}
+        self.closed_at = None
+        self.history = []
+
+    def get(self, url, params=None):
+        parts = urlparse(url).path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "accounts" and parts[2] == "transactions":
+            return self._response(url, 200, {"_embedded": {"records": self.history}})
+        if parts == ["ledgers"] and self.closed_at is not None:
+            ledger = {"sequence": self.sequence, "closed_at": self.closed_at, "base_fee_in_stroops": 100}
+            return self._response(url, 200, {"_embedded": {"records": [ledger]}})
+        if len(parts) == 2 and parts[0] == "transactions" and parts[1] in self.applied:
+            return self._response(url, 200, self.applied[parts[1]])
+        return super().get(url, params)
+
+    def post(self, url, data=None, json_data=None):
+        tx_hash = TransactionEnvelope.from_xdr(data["tx"], NETWORK).hash_hex()
+        self.submitted.append(tx_hash)
+        if tx_hash in self.rejected:
+            extras = {"result_codes": {"transaction": self.rejected[tx_hash]}}
+            return self._response(url, 400, {"status": 400, "title": "Transaction Failed", "extras": extras})
+        self.sequence += 1
+        return self._response(url, 200, {"hash": tx_hash, "successful": True})
+
+
+@override_settings(
+    STELLAR_NETWORK_PASSPHRASE=NETWORK,
+    ANCHOR_ASSETS={"TEST": {"hot_wallet_public": HOT_WALLET.public_key, "hot_wallet_secret": HOT_WALLET.secret}},
+)
+class PayoutTestCase(TestCase):
+    horizon_client = RecordingHorizonClient
+
+    def setUp(self):
+        self.asset = Asset.objects.create(code="TEST", issuer=ISSUER)
+        registry.clear()
+        signer.clear()
+        cache.clear()
+        forget_source_account(HOT_WALLET.public_key)
+        self.horizon = self.horizon_client({f"TEST:{ISSUER}": "1000000.0000000"})
+        servers = [endpoint.server for endpoint in horizon_pool.endpoints]
+        for endpoint in horizon_pool.endpoints:
+            endpoint.server = Server(horizon_url=endpoint.url, client=self.horizon)
+        self.addCleanup(self._restore, servers)
+
+    def _restore(self, servers):
+        for endpoint, server in zip(horizon_pool.endpoints, servers):
+            endpoint.server = server
+        registry.clear()
+        signer.clear()
+
+    def create_deposit(self, status=Transaction.STATUS.pending_anchor) -> Transaction:
+        return Transaction.objects.create(
+            kind=Transaction.KIND.deposit,
+            protocol=Transaction.PROTOCOL.sep24,
+            status=status,
+            asset=self.asset,
+            stellar_account=Keypair.random().public_key,
+            amount_in=Decimal("100"),
+            amount_out=Decimal("99"),
+            amount_fee=Decimal("1"),
+        )
+
+    def get_status(self, transaction: Transaction) -> str:
+        return Transaction.objects.values_list("status", flat=True).get(id=transaction.id)
+
+    def store_payout(self, transaction: Transaction) -> PayoutEnvelope:
+        """Complete ``transaction`` up to a submission whose outcome is unknown."""
+        with mock.patch.object(deposit, "submit_envelope", side_effect=ConnectionError("timeout")):
+            self.assertFalse(deposit.complete_deposit(str(transaction.id)))
+        return PayoutEnvelope.objects.get(transaction_id=transaction.id)
+
+
+class CompleteDepositTests(PayoutTestCase):
+    def test_completes_deposit(self):
+        transaction = self.create_deposit()
+
+        self.assertTrue(deposit.complete_deposit(str(transaction.id)))
+
+        envelope = PayoutEnvelope.objects.get(transaction_id=transaction.id)
+        self.assertEqual(self.horizon.submitted, [envelope.tx_hash])
+        self.assertEqual(envelope.status, PayoutEnvelope.STATUS.confirmed)
+        self.assertEqual(self.get_status(transaction), Transaction.STATUS.completed)
+
+    def test_funds_deposit_awaiting_user_transfer(self):
+        transaction = self.create_deposit(status=Transaction.STATUS.pending_user_transfer_start)
+
+        self.assertTrue(deposit.complete_deposit(str(transaction.id)))
+
+        self.assertEqual(len(self.horizon.submitted), 1)
+        self.assertEqual(self.get_status(transaction), Transaction.STATUS.completed)
+
+    def test_concurrent_calls_submit_one_payout(self):
+        transaction = self.create_deposit()
+        results = []
+        sign_envelope = deposit.sign_envelope
+
+        def sign_and_race(account, envelope):
+            # A second caller completes the deposit while the first is signing
+            if not results:
+                results.append(None)
+                results.append(deposit.complete_deposit(str(transaction.id)))
+            sign_envelope(account, envelope)
+
+        with mock.patch.object(deposit, "sign_envelope", side_effect=sign_and_race):
+            results.append(deposit.complete_deposit(str(transaction.id)))
+
+        self.assertTrue(all(results[1:]))
+        self.assertEqual(len(set(self.horizon.submitted)), 1)
+        self.assertEqual(PayoutEnvelope.objects.get(transaction_id=transaction.id).tx_hash, self.horizon.submitted[0])
+        self.assertEqual(self.get_status(transaction), Transaction.STATUS.completed)
+
+    def test_signs_without_holding_the_row_lock(self):
+        transaction = self.create_deposit()
+        depth = len(connection.atomic_blocks)
+        sign_envelope = deposit.sign_envelope
+        nested = []
+
+        def sign(account, envelope):
+            nested.append(len(connection.atomic_blocks) - depth)
+            sign_envelope(account, envelope)
+
+        with mock.patch.object(deposit, "sign_envelope", side_effect=sign):
+            self.assertTrue(deposit.complete_deposit(str(transaction.id)))
+
+        self.assertEqual(nested, [0])
+
+    def test_discards_payout_when_deposit_moved_on_while_building(self):
+        transaction = self.create_deposit()
+        sign_envelope = deposit.sign_envelope
+
+        def sign_and_cancel(account, envelope):
+            Transaction.objects.filter(id=transaction.id).update(status=Transaction.STATUS.error)
+            sign_envelope(account, envelope)
+
+        with mock.patch.object(deposit, "sign_envelope", side_effect=sign_and_cancel):
+            self.assertFalse(deposit.complete_deposit(str(transaction.id)))
+
+        self.assertEqual(self.horizon.submitted, [])
+        self.assertFalse(PayoutEnvelope.objects.filter(transaction_id=transaction.id).exists())
+
+    def test_retry_resubmits_stored_envelope(self):
+        transaction = self.create_deposit()
+        stored = self.store_payout(transaction)
+
+        self.assertTrue(deposit.complete_deposit(str(transaction.id)))
+
+        self.assertEqual(self.horizon.submitted, [stored.tx_hash])
+
+    def test_rejects_unpayable_status(self):
+        transaction = self.create_deposit(status=Transaction.STATUS.completed)
+
+        self.assertFalse(deposit.complete_deposit(str(transaction.id)))
+
+        self.assertEqual(self.horizon.submitted, [])
+        self.assertFalse(PayoutEnvelope.objects.filter(transaction_id=transaction.id).exists())
+
+
+class StalePayoutTests(PayoutTestCase):
+    def ledger_closed(self, timestamp: float):
+        self.horizon.closed_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+    def test_not_rebuilt_before_it_expires(self):
+        transaction = self.create_deposit()
+        stored = self.store_payout(transaction)
+        self.horizon.rejected[stored.tx_hash] = "tx_bad_seq"
+        self.ledger_closed(envelope_max_time(stored) - 1)
+
+        self.assertFalse(deposit.complete_deposit(str(transaction.id)))
+
+        envelope = PayoutEnvelope.objects.get(transaction_id=transaction.id)
+        self.assertEqual(envelope.tx_hash, stored.tx_hash)
+        self.assertNotEqual(envelope.status, PayoutEnvelope.STATUS.failed)
+        self.assertEqual(self.get_status(transaction), Transaction.STATUS.pending_anchor)
+
+    def test_rebuilt_once_a_ledger_closes_past_its_time_bounds(self):
+        transaction = self.create_deposit()
+        stored = self.store_payout(transaction)
+        self.horizon.rejected[stored.tx_hash] = "tx_too_late"
+        self.ledger_closed(envelope_max_time(stored) + 1)
+        # The hot wallet paid other deposits meanwhile
+        self.horizon.sequence += 5
+
+        self.assertTrue(deposit.complete_deposit(str(transaction.id)))
+
+        envelope = PayoutEnvelope.objects.get(transaction_id=transaction.id)
+        self.assertNotEqual(envelope.tx_hash, stored.tx_hash)
+        self.assertEqual(self.horizon.submitted, [stored.tx_hash, envelope.tx_hash])
+        self.assertEqual(self.get_status(transaction), Transaction.STATUS.completed)
+
+    def test_not_rebuilt_when_it_landed(self):
+        transaction = self.create_deposit()
+        stored = self.store_payout(transaction)
+        self.horizon.rejected[stored.tx_hash] = "tx_bad_seq"
+        self.horizon.applied[stored.tx_hash] = {"hash": stored.tx_hash, "successful": True}
+        self.ledger_closed(envelope_max_time(stored) + 1)
+
+        self.assertTrue(deposit.complete_deposit(str(transaction.id)))
+
+        self.assertEqual(PayoutEnvelope.objects.get(transaction_id=transaction.id).tx_hash, stored.tx_hash)
+        self.assertEqual(
+            Transaction.objects.values_list("stellar_transaction_id", flat=True).get(id=transaction.id),
+            stored.tx_hash,
+        )
+
+
+class CompleteDepositsTests(PayoutTestCase):
+    def test_one_pipeline_per_hot_wallet(self):
+        with self.settings(ANCHOR_ASSETS={
+            "TEST": {"hot_wallet_public": HOT_WALLET.public_key, "hot_wallet_secret": HOT_WALLET.secret},
+            "TEST2": {"hot_wallet_public": HOT_WALLET.public_key, "hot_wallet_secret": HOT_WALLET.secret},
+        }):
+            other = Asset.objects.create(code="TEST2", issuer=ISSUER)
+            first, second = self.create_deposit(), self.create_deposit()
+            Transaction.objects.filter(id=second.id).update(asset=other)
+            ids = [str(first.id), str(second.id)]
+
+            with mock.patch.object(deposit, "_complete_wallet_deposits", return_value={}) as pipeline:
+                deposit.complete_deposits(ids)
+
+        pipeline.assert_called_once_with(ids)
+
+    def test_asset_without_hot_wallet_is_not_paid(self):
+        unanchored = Asset.objects.create(code="NOPE", issuer=ISSUER)
+        transaction = self.create_deposit()
+        Transaction.objects.filter(id=transaction.id).update(asset=unanchored)
+
+        self.assertEqual(deposit.complete_deposits([str(transaction.id)]), {str(transaction.id): False})
+        self.assertEqual(self.horizon.submitted, [])
+
+
+class RecoverPayoutsTests(PayoutTestCase):
+    def record(self, tx_hash: str, successful: bool = True, **fields) -> dict:
+        return {
+            "hash": tx_hash,
+            "successful": successful,
+            "created_at": "2100-01-01T00:00:00Z",
+            "paging_token": "1",
+            **fields,
+        }
+
+    def test_confirms_fee_bumped_payout(self):
+        transaction = self.create_deposit()
+        stored = self.store_payout(transaction)
+        self.horizon.history = [self.record("f" * 64, inner_transaction={"hash": stored.tx_hash})]
+
+        self.assertEqual(recover_payouts(), {"confirmed": 1, "failed": 0, "pending": 0})
+
+        self.assertEqual(self.get_status(transaction), Transaction.STATUS.completed)
+
+    def test_fails_payout_failed_on_ledger(self):
+        transaction = self.create_deposit()
+        stored = self.store_payout(transaction)
+        self.horizon.history = [self.record(stored.tx_hash, successful=False)]
+
+        self.assertEqual(recover_payouts(), {"confirmed": 0, "failed": 1, "pending": 0})
+
+        self.assertEqual(PayoutEnvelope.objects.get(tx_hash=stored.tx_hash).status, PayoutEnvelope.STATUS.failed)
+
+    def test_skips_payout_of_deleted_transaction(self):
+        transaction = self.create_deposit()
+        stored = self.store_payout(transaction)
+        PayoutEnvelope.objects.create(
+            transaction_id=uuid.uuid4(), tx_hash="e" * 64, sequence=1, envelope_xdr=stored.envelope_xdr
+        )
+
+        self.assertEqual(recover_payouts(), {"confirmed": 0, "failed": 0, "pending": 2})
+
+
+@override_settings(FEE_BUMP_AFTER=0, FEE_BUMP_INTERVAL=0, FEE_ACCOUNT="")
+class BumpStalledPayoutsTests(PayoutTestCase):
+    def stall_payout(self, transaction: Transaction) -> PayoutEnvelope:
+        stored = self.store_payout(transaction)
+        PayoutEnvelope.objects.filter(tx_hash=stored.tx_hash).update(status=PayoutEnvelope.STATUS.submitted)
+        return stored
+
+    def rebuild_jobs(self, transaction: Transaction) -> int:
+        return Job.objects.filter(kind="complete_deposit", payload__transaction_id=str(transaction.id)).count()
+
+    def test_failed_payout_is_rebuilt(self):
+        transaction = self.create_deposit()
+        stored = self.stall_payout(transaction)
+        self.horizon.applied[stored.tx_hash] = {"hash": stored.tx_hash, "successful": False}
+
+        self.assertEqual(jobs._bump_payouts({})["failed"], 1)
+
+        self.assertEqual(PayoutEnvelope.objects.get(tx_hash=stored.tx_hash).status, PayoutEnvelope.STATUS.failed)
+        self.assertEqual(self.rebuild_jobs(transaction), 1)
+
+    def test_expired_payout_is_rebuilt(self):
+        transaction = self.create_deposit()
+        stored = self.stall_payout(transaction)
+        self.horizon.closed_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(envelope_max_time(stored) + 1))
+
+        self.assertEqual(jobs._bump_payouts({})["expired"], 1)
+
+        self.assertEqual(self.rebuild_jobs(transaction), 1)
+
+    def test_payout_not_yet_expired_stays_pending(self):
+        transaction = self.create_deposit()
+        self.stall_payout(transaction)
+
+        self.assertEqual(jobs._bump_payouts({})["pending"], 1)
+
+        self.assertEqual(self.rebuild_jobs(transaction), 0)
+
+    def test_skips_payout_of_deleted_transaction(self):
+        stored = self.stall_payout(self.create_deposit())
+        PayoutEnvelope.objects.create(
+            transaction_id=uuid.uuid4(),
+            tx_hash="e" * 64,
+            sequence=1,
+            envelope_xdr=stored.envelope_xdr,
+            status=PayoutEnvelope.STATUS.submitted,
+        )
+
+        self.assertEqual(jobs._bump_payouts({})["pending"], 2)
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from polaris.models import Asset, Transaction
+from stellar_sdk import Keypair
+
+from anchor.integrations.expiry import EXPIRED_MESSAGE, expire_transactions
+from anchor.integrations.status_updates import apply_status_updates
+from anchor.models import Job
+
+S = Transaction.STATUS
+
+
+class ExpireTransactionsTests(TestCase):
+    def setUp(self):
+        self.asset = Asset.objects.create(code="TEST", issuer=Keypair.random().public_key)
+
+    def create(self, kind, status, hours_ago):
+        transaction = Transaction.objects.create(
+            asset=self.asset, kind=kind, status=status, stellar_account=Keypair.random().public_key
+        )
+        Transaction.objects.filter(id=transaction.id).update(started_at=timezone.now() - timedelta(hours=hours_ago))
+        return transaction
+
+    def status_of(self, transaction):
+        return Transaction.objects.values_list("status", "status_message").get(id=transaction.id)
+
+    def test_expires_abandoned_transactions(self):
+        deposit = self.create(Transaction.KIND.deposit, S.incomplete, 100)
+        withdrawal = self.create(Transaction.KIND.withdrawal, S.pending_user_transfer_start, 100)
+        recent = self.create(Transaction.KIND.deposit, S.incomplete, 1)
+
+        self.assertEqual(expire_transactions(72, 500, deposit_transfer_hours=0), 2)
+
+        self.assertEqual(self.status_of(deposit), (S.error, EXPIRED_MESSAGE))
+        self.assertEqual(self.status_of(withdrawal), (S.error, EXPIRED_MESSAGE))
+        self.assertEqual(self.status_of(recent)[0], S.incomplete)
+
+    def test_late_bank_confirmation_after_the_sweep(self):
+        deposit = self.create(Transaction.KIND.deposit, S.pending_user_transfer_start, 100)
+
+        self.assertEqual(expire_transactions(72, 500, deposit_transfer_hours=0), 0)
+        result = apply_status_updates(
+            [{"id": str(deposit.id), "expected_status": S.pending_user_transfer_start, "new_status": S.pending_anchor}],
+            max_batch=10,
+        )[0]
+
+        self.assertEqual(result["result"], "updated")
+        self.assertEqual(self.status_of(deposit)[0], S.pending_anchor)
+        self.assertTrue(Job.objects.filter(kind="complete_deposit", payload__transaction_id=str(deposit.id)).exists())
+
+    def test_deposits_awaiting_fiat_expire_after_the_opt_in_cutoff(self):
+        stale = self.create(Transaction.KIND.deposit, S.pending_user_transfer_start, 800)
+        waiting = self.create(Transaction.KIND.deposit, S.pending_user_transfer_start, 100)
+
+        self.assertEqual(expire_transactions(72, 500, dry_run=True, deposit_transfer_hours=720), 1)
+        self.assertEqual(expire_transactions(72, 500, deposit_transfer_hours=720), 1)
+
+        self.assertEqual(self.status_of(stale)[0], S.error)
+        self.assertEqual(self.status_of(waiting)[0], S.pending_user_transfer_start)
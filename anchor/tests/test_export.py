@@ -0,0 +1,24 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from anchor.integrations.export import csv_chunks
+
+
+class CsvChunksTests(SimpleTestCase):
+    def rows(self, *values):
+        return "".join(csv_chunks([values])).splitlines()[1]
+
+    def test_quotes_formulas(self):
+        for value in ("=HYPERLINK(\"http://x\")", "+1", "-1+2", "@SUM(A1)", "\tx", "\rx"):
+            with self.subTest(value=value):
+                self.assertTrue(self.rows(value).lstrip('"').startswith("'"))
+
+    def test_leaves_other_values(self):
+        self.assertEqual(self.rows("GABC", Decimal("-1.5"), None), "GABC,-1.5,")
+
+    def test_chunks(self):
+        chunks = list(csv_chunks([("a",)] * 5, rows_per_chunk=2))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual("".join(chunks).count("\n"), 6)
@@ -0,0 +1,53 @@
+import uuid
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from anchor.integrations.handoff import HandoffError, create_handoff, sign_return, verify_return
+
+
+def make_transaction():
+    return SimpleNamespace(id=uuid.uuid4(), stellar_account="GWALLET")
+
+
+@override_settings(INTERACTIVE_HANDOFF_SECRET="handoff-secret")
+class HandoffTests(SimpleTestCase):
+    def returned(self, transaction, **fields):
+        params = {
+            "handoff": create_handoff("deposit", transaction, "USDC", None),
+            "transaction_id": str(transaction.id),
+            **fields,
+        }
+        params["signature"] = sign_return(params)
+        return params
+
+    def test_verifies_signed_return(self):
+        transaction = make_transaction()
+
+        verify_return(self.returned(transaction, amount="10"), "deposit", transaction)
+
+    def test_rejects_altered_value(self):
+        transaction = make_transaction()
+        params = self.returned(transaction, amount="10")
+        params["amount"] = "1000"
+
+        with self.assertRaises(HandoffError):
+            verify_return(params, "deposit", transaction)
+
+    def test_values_cannot_shift_field_boundaries(self):
+        signed = sign_return({"amount": "10&amount_out=5", "amount_out": ""})
+
+        self.assertNotEqual(signed, sign_return({"amount": "10", "amount_out": "5"}))
+
+    def test_rejects_other_transaction(self):
+        params = self.returned(make_transaction(), amount="10")
+
+        with self.assertRaises(HandoffError):
+            verify_return(params, "deposit", make_transaction())
+
+    @override_settings(INTERACTIVE_HANDOFF_SECRET="")
+    def test_disabled_without_secret(self):
+        with self.assertRaises(HandoffError):
+            create_handoff("deposit", make_transaction(), "USDC", None)
+        with self.assertRaises(HandoffError):
+            sign_return({"amount": "10"})
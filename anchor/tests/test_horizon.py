@@ -0,0 +1,88 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from stellar_sdk.exceptions import ConnectionError
+
+from anchor.integrations.horizon import PRIORITY_BACKGROUND, PRIORITY_PAYOUT, Endpoint, HorizonPool
+
+
+@override_settings(HORIZON_BREAKER_THRESHOLD=2, HORIZON_BREAKER_COOLDOWN=30)
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.endpoint = Endpoint("https://horizon.example")
+        self.endpoint.record_failure()
+        self.endpoint.record_failure()
+        self.reopens = self.endpoint.open_until
+
+    def test_refuses_requests_while_open(self):
+        self.assertFalse(self.endpoint.admit(self.reopens - 1))
+
+    def test_half_open_admits_a_single_trial(self):
+        self.assertTrue(self.endpoint.admit(self.reopens))
+        self.assertFalse(self.endpoint.admit(self.reopens))
+        self.assertFalse(self.endpoint.available(self.reopens))
+
+    def test_successful_trial_closes_the_circuit(self):
+        self.endpoint.admit(self.reopens)
+        self.endpoint.record_success(0.1)
+
+        self.assertTrue(self.endpoint.admit(self.reopens))
+        self.assertTrue(self.endpoint.admit(self.reopens))
+
+    def test_failed_trial_opens_it_again(self):
+        self.endpoint.admit(self.reopens)
+        self.endpoint.record_failure()
+
+        self.assertGreater(self.endpoint.open_until, self.reopens)
+        self.assertFalse(self.endpoint.admit(self.reopens))
+
+
+@override_settings(HORIZON_BREAKER_THRESHOLD=1, HORIZON_BREAKER_COOLDOWN=30)
+class HorizonPoolTests(SimpleTestCase):
+    def test_open_circuit_fails_fast_without_a_request(self):
+        pool = HorizonPool(["https://horizon.example"])
+        pool.endpoints[0].record_failure()
+        request = mock.Mock()
+
+        with self.assertRaises(ConnectionError):
+            pool.read(request)
+
+        request.assert_not_called()
+
+    def test_read_all_asks_every_node(self):
+        pool = HorizonPool(["https://a.example", "https://b.example"])
+
+        answers = pool.read_all(lambda server: server.horizon_url)
+
+        self.assertEqual(sorted(answers), ["https://a.example", "https://b.example"])
+
+    def test_read_all_skips_failed_nodes(self):
+        pool = HorizonPool(["https://a.example", "https://b.example"])
+
+        def request(server):
+            if server.horizon_url.startswith("https://a."):
+                raise ConnectionError("timeout")
+            return server.horizon_url
+
+        self.assertEqual(pool.read_all(request), ["https://b.example"])
+
+    def test_payout_reads_not_starved_by_background_reads(self):
+        pool = HorizonPool(["https://a.example", "https://b.example"])
+        release = threading.Event()
+        self.addCleanup(release.set)
+        # Fill every background thread with reads stuck waiting, as in a rate limiter
+        blocked = [
+            pool._executors[PRIORITY_BACKGROUND].submit(pool._call, endpoint, lambda server: release.wait())
+            for endpoint in pool.endpoints * 4
+        ]
+        answer = []
+        reader = threading.Thread(target=lambda: answer.append(pool.read(lambda server: "ok", PRIORITY_PAYOUT)))
+
+        reader.start()
+        reader.join(timeout=5)
+
+        self.assertEqual(answer, ["ok"])
+        release.set()
+        for future in blocked:
+            future.result(timeout=5)
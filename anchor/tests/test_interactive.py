@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from polaris.models import Asset, Transaction
+from stellar_sdk import Keypair
+
+from anchor.integrations.assets import registry
+from anchor.integrations.context import InteractiveContext
+from anchor.integrations.deposit import AnchorDeposit
+from anchor.integrations.withdraw import AnchorWithdraw
+
+
+# No ANCHOR_ASSETS entry: the asset has no hot wallet, so it is not anchored
+@override_settings(ANCHOR_ASSETS={}, USDC_HOT_WALLET_PUBLIC=None, INTERACTIVE_HANDOFF_SECRET="")
+class UnanchoredAssetTests(TestCase):
+    def setUp(self):
+        self.asset = Asset.objects.create(code="TEST", issuer=Keypair.random().public_key)
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def complete(self, integration, kind):
+        transaction = Transaction.objects.create(
+            asset=self.asset, kind=kind, status=Transaction.STATUS.incomplete,
+            stellar_account=Keypair.random().public_key,
+        )
+        request = RequestFactory().get("/sep24/transactions/interactive/complete", {"amount": "100"})
+
+        integration.after_interactive_flow(request, transaction)
+
+        return Transaction.objects.values("status", "status_message").get(id=transaction.id)
+
+    def test_deposit_ends_in_error(self):
+        transaction = self.complete(AnchorDeposit(), Transaction.KIND.deposit)
+
+        self.assertEqual(transaction["status"], Transaction.STATUS.error)
+        self.assertIn("not anchored", transaction["status_message"])
+
+    def test_withdrawal_ends_in_error(self):
+        transaction = self.complete(AnchorWithdraw(), Transaction.KIND.withdrawal)
+
+        self.assertEqual(transaction["status"], Transaction.STATUS.error)
+        self.assertIn("not anchored", transaction["status_message"])
+
+
+class InteractiveContextTests(SimpleTestCase):
+    def test_hooks_of_one_request_share_the_context(self):
+        request = RequestFactory().get("/sep24/transactions/deposit/webapp", {"token": "jwt"})
+        request.session = {}
+        transaction = SimpleNamespace(id="transaction")
+
+        InteractiveContext.for_request(request).bind(transaction)
+        context = InteractiveContext.for_request(SimpleNamespace(_request=request))
+
+        self.assertIs(context.transaction, transaction)
+        self.assertEqual(context.token, "jwt")
+        self.assertEqual(request.session, {})
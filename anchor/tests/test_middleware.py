@@ -0,0 +1,36 @@
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+
+from anchor.middleware import ReplicaReadMiddleware, TransactionETagMiddleware
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+SHARED = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost"}}
+
+
+def get_response(request):
+    return HttpResponse()
+
+
+class SharedCacheTests(SimpleTestCase):
+    @override_settings(CACHES=LOCMEM)
+    def test_etags_off_with_process_local_cache(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            TransactionETagMiddleware(get_response)
+
+    @override_settings(CACHES=SHARED)
+    def test_etags_on_with_shared_cache(self):
+        TransactionETagMiddleware(get_response)
+
+    @override_settings(CACHES=LOCMEM)
+    @mock.patch("anchor.middleware.replica_enabled", return_value=True)
+    def test_replica_reads_off_with_process_local_cache(self, replica_enabled):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaReadMiddleware(get_response)
+
+    @override_settings(CACHES=SHARED)
+    @mock.patch("anchor.middleware.replica_enabled", return_value=True)
+    def test_replica_reads_on_with_shared_cache(self, replica_enabled):
+        ReplicaReadMiddleware(get_response)
@@ -0,0 +1,27 @@
+from importlib import import_module
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+migration = import_module("anchor.migrations.0002_transaction_status_indexes")
+
+
+class PartialIndexTests(SimpleTestCase):
+    def sql(self, vendor, backwards=False):
+        schema_editor = mock.Mock()
+        schema_editor.connection.vendor = vendor
+        operation = migration.partial_index("idx", "kind", ("completed",))
+        code = operation.reverse_code if backwards else operation.code
+        code(None, schema_editor)
+        return schema_editor.execute.call_args[0][0]
+
+    def test_concurrent_on_postgresql(self):
+        self.assertIs(migration.Migration.atomic, False)
+        self.assertEqual(
+            self.sql("postgresql"),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx ON polaris_transaction (kind) WHERE status IN ('completed')",
+        )
+        self.assertEqual(self.sql("postgresql", backwards=True), "DROP INDEX CONCURRENTLY IF EXISTS idx")
+
+    def test_plain_on_sqlite(self):
+        self.assertTrue(self.sql("sqlite").startswith("CREATE INDEX IF NOT EXISTS idx "))
@@ -0,0 +1,69 @@
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from polaris.models import Quote
+
+from anchor.integrations.assets import AnchoredAsset
+from anchor.integrations.rates import deposit_amounts, rate_service, withdraw_amounts
+
+USDC = AnchoredAsset(
+    id=1,
+    code="USDC",
+    issuer="GISSUER",
+    hot_wallet_public=None,
+    hot_wallet_secret=None,
+    receiving_account=None,
+    treasury_account=None,
+    min_balance=Decimal(0),
+    target_balance=Decimal(0),
+    deposit_fee_fixed=Decimal("0.5"),
+    deposit_fee_percent=Decimal("1"),
+    withdrawal_fee_fixed=Decimal("1"),
+    withdrawal_fee_percent=Decimal(0),
+)
+
+
+def firm_quote(price: str, expires_in: int = 60):
+    return SimpleNamespace(
+        id="quote", type=Quote.TYPE.firm, price=Decimal(price), expires_at=timezone.now() + timedelta(seconds=expires_in)
+    )
+
+
+@override_settings(NGN_RATES={"USDC": "1500"}, RATE_PROVIDER="anchor.integrations.rates.StaticRateProvider")
+class AmountTests(SimpleTestCase):
+    def setUp(self):
+        rate_service.invalidate()
+        self.addCleanup(rate_service.invalidate)
+
+    def test_deposit_converts_then_takes_fee(self):
+        fee, amount_out = deposit_amounts(USDC, Decimal("150000"))
+
+        self.assertEqual(fee, Decimal("1.5"))
+        self.assertEqual(amount_out, Decimal("98.5"))
+
+    def test_deposit_below_fee(self):
+        with self.assertRaises(ValueError):
+            deposit_amounts(USDC, Decimal("500"))
+
+    def test_withdraw_takes_fee_then_converts(self):
+        fee, amount_out = withdraw_amounts(USDC, Decimal("11"))
+
+        self.assertEqual(fee, Decimal("1"))
+        self.assertEqual(amount_out, Decimal("15000.00"))
+
+    def test_firm_quote_price_wins(self):
+        fee, amount_out = deposit_amounts(USDC, Decimal("160000"), firm_quote("1600"))
+
+        self.assertEqual(amount_out, Decimal("98.5"))
+
+    def test_expired_quote(self):
+        with self.assertRaises(ValueError):
+            withdraw_amounts(USDC, Decimal("11"), firm_quote("0.0006", expires_in=-1))
+
+    @override_settings(NGN_RATES={})
+    def test_no_rate(self):
+        with self.assertRaises(RuntimeError):
+            deposit_amounts(USDC, Decimal("150000"))
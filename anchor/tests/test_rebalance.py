@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from polaris.models import Asset, Transaction
+from stellar_sdk import Keypair
+
+from anchor.integrations.assets import registry
+from anchor.integrations.rebalance import payout_demand
+
+ISSUER = Keypair.random().public_key
+
+
+@override_settings(ANCHOR_ASSETS={"TEST": {"hot_wallet_public": Keypair.random().public_key}})
+class PayoutDemandTests(TestCase):
+    def setUp(self):
+        self.asset = Asset.objects.create(code="TEST", issuer=ISSUER)
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.anchored = registry.get(self.asset.id)
+
+    def deposit(self, status, amount_out):
+        Transaction.objects.create(
+            asset=self.asset,
+            kind=Transaction.KIND.deposit,
+            status=status,
+            amount_out=Decimal(amount_out),
+            stellar_account=Keypair.random().public_key,
+        )
+
+    def test_funded_deposits_are_owed_now(self):
+        self.deposit(Transaction.STATUS.pending_anchor, "10")
+        self.deposit(Transaction.STATUS.pending_trust, "5")
+
+        self.assertEqual(payout_demand(self.anchored), (Decimal("15"), Decimal("15")))
+
+    def test_forecast_adds_deposits_awaiting_fiat(self):
+        self.deposit(Transaction.STATUS.pending_anchor, "10")
+        self.deposit(Transaction.STATUS.pending_user_transfer_start, "7")
+        self.deposit(Transaction.STATUS.completed, "100")
+
+        self.assertEqual(payout_demand(self.anchored), (Decimal("10"), Decimal("17")))
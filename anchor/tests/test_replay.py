@@ -0,0 +1,82 @@
+import uuid
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from polaris.models import Asset, Transaction
+from stellar_sdk import Keypair
+
+from anchor.integrations.assets import registry
+from anchor.management.commands.replay_traces import Replayer
+from anchor.traces import trace_record
+
+ISSUER = Keypair.random().public_key
+
+
+def poll(transaction_id, status=200, **fields):
+    return {
+        "t": 0,
+        "method": "GET",
+        "path": "/sep24/transaction",
+        "query": {"id": transaction_id},
+        "token": "a1b2c3d4e5f6",
+        "status": status,
+        **fields,
+    }
+
+
+@override_settings(ANCHOR_ASSETS={"TEST": {"hot_wallet_public": Keypair.random().public_key}})
+class ReplayTests(TestCase):
+    def setUp(self):
+        Asset.objects.create(code="TEST", issuer=ISSUER, sep24_enabled=True)
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.replayer = Replayer()
+
+    def test_seeds_captured_transactions_for_their_session(self):
+        transaction_id = str(uuid.uuid4())
+
+        self.assertEqual(self.replayer.seed([poll(transaction_id), poll(transaction_id)]), 1)
+
+        transaction = Transaction.objects.values("stellar_account", "protocol").get(id=transaction_id)
+        self.assertEqual(transaction["stellar_account"], self.replayer.accounts["token:a1b2c3d4e5f6"])
+        self.assertEqual(transaction["protocol"], Transaction.PROTOCOL.sep24)
+
+    def test_does_not_seed_lookups_that_failed(self):
+        self.assertEqual(self.replayer.seed([poll(str(uuid.uuid4()), status=404)]), 0)
+
+    def test_replayed_poll_finds_the_seeded_transaction(self):
+        record = poll(str(uuid.uuid4()), token_valid=True)
+        self.replayer.seed([record])
+
+        status, elapsed = self.replayer.send(record)
+
+        self.assertEqual(status, 200)
+
+    def test_invalid_token_stays_invalid(self):
+        record = poll(str(uuid.uuid4()), token_valid=False)
+        self.replayer.seed([record])
+
+        status, elapsed = self.replayer.send(record)
+
+        self.assertEqual(status, 403)
+
+    def test_old_traces_infer_validity_from_status(self):
+        self.assertFalse(Replayer.token_valid(poll(str(uuid.uuid4()), status=403)))
+        self.assertTrue(Replayer.token_valid(poll(str(uuid.uuid4()))))
+
+
+class CaptureTests(SimpleTestCase):
+    def capture(self, token):
+        request = RequestFactory().get("/sep24/transaction", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return trace_record(request, HttpResponse(), 0, 0)
+
+    def test_records_valid_token(self):
+        record = self.capture(Replayer()._token("a1b2c3d4e5f6"))
+
+        self.assertTrue(record["token_valid"])
+
+    def test_records_invalid_token(self):
+        record = self.capture(Replayer()._token("a1b2c3d4e5f6", valid=False))
+
+        self.assertFalse(record["token_valid"])
+        self.assertNotIn("Bearer", str(record))
@@ -0,0 +1,110 @@
+import uuid
+
+from django.test import TestCase
+from polaris.models import Asset, Transaction
+from stellar_sdk import Keypair
+
+from anchor.integrations.status_updates import StatusUpdateError, apply_status_updates
+from anchor.models import Job
+
+S = Transaction.STATUS
+
+
+class ApplyStatusUpdatesTests(TestCase):
+    def setUp(self):
+        self.asset = Asset.objects.create(code="TEST", issuer=Keypair.random().public_key)
+
+    def create(self, kind, status, **fields):
+        return Transaction.objects.create(
+            asset=self.asset, kind=kind, status=status, stellar_account=Keypair.random().public_key, **fields
+        )
+
+    def status_of(self, transaction):
+        return Transaction.objects.values_list("status", flat=True).get(id=transaction.id)
+
+    def update(self, transaction, expected_status, new_status, **fields):
+        item = {"id": str(transaction.id), "expected_status": expected_status, "new_status": new_status, **fields}
+        return apply_status_updates([item], max_batch=10)[0]
+
+    def test_funded_deposit_queues_its_payout(self):
+        deposit = self.create(Transaction.KIND.deposit, S.pending_user_transfer_start)
+
+        result = self.update(deposit, S.pending_user_transfer_start, S.pending_anchor)
+
+        self.assertEqual(result["result"], "updated")
+        self.assertEqual(self.status_of(deposit), S.pending_anchor)
+        self.assertTrue(Job.objects.filter(kind="complete_deposit", payload__transaction_id=str(deposit.id)).exists())
+
+    def test_deposit_cannot_be_completed_by_the_backend(self):
+        deposit = self.create(Transaction.KIND.deposit, S.pending_anchor)
+
+        result = self.update(deposit, S.pending_anchor, S.completed)
+
+        self.assertEqual(result["result"], "invalid")
+        self.assertEqual(self.status_of(deposit), S.pending_anchor)
+
+    def test_withdrawal_completes_with_backend_fields(self):
+        withdrawal = self.create(Transaction.KIND.withdrawal, S.pending_external)
+
+        result = self.update(withdrawal, S.pending_external, S.completed, external_transaction_id="bank-1")
+
+        self.assertEqual(result, {"id": str(withdrawal.id), "result": "updated", "status": S.completed})
+        withdrawal = Transaction.objects.values("external_transaction_id", "completed_at").get(id=withdrawal.id)
+        self.assertEqual(withdrawal["external_transaction_id"], "bank-1")
+        self.assertIsNotNone(withdrawal["completed_at"])
+
+    def test_queues_callbacks_for_changed_transactions(self):
+        notified = self.create(Transaction.KIND.withdrawal, S.pending_external, on_change_callback="https://w.example")
+        post_message = self.create(Transaction.KIND.withdrawal, S.pending_external, on_change_callback="postMessage")
+        conflict = self.create(Transaction.KIND.withdrawal, S.completed, on_change_callback="https://w.example")
+        items = [
+            {"id": str(t.id), "expected_status": S.pending_external, "new_status": S.completed}
+            for t in (notified, post_message, conflict)
+        ]
+
+        apply_status_updates(items, max_batch=10)
+
+        jobs = Job.objects.filter(kind="transaction_callbacks")
+        self.assertEqual([job.payload for job in jobs], [{"transaction_ids": [str(notified.id)]}])
+
+    def test_no_callback_job_without_callbacks(self):
+        withdrawal = self.create(Transaction.KIND.withdrawal, S.pending_external)
+
+        self.update(withdrawal, S.pending_external, S.completed)
+
+        self.assertFalse(Job.objects.filter(kind="transaction_callbacks").exists())
+
+    def test_stale_expected_status_conflicts(self):
+        withdrawal = self.create(Transaction.KIND.withdrawal, S.completed)
+
+        result = self.update(withdrawal, S.pending_external, S.completed)
+
+        self.assertEqual(result["result"], "conflict")
+        self.assertEqual(result["status"], S.completed)
+
+    def test_replaying_a_batch_is_harmless(self):
+        deposit = self.create(Transaction.KIND.deposit, S.pending_user_transfer_start)
+
+        self.update(deposit, S.pending_user_transfer_start, S.pending_anchor)
+        result = self.update(deposit, S.pending_user_transfer_start, S.pending_anchor)
+
+        self.assertEqual(result["result"], "conflict")
+        self.assertEqual(Job.objects.filter(kind="complete_deposit").count(), 1)
+
+    def test_items_are_independent(self):
+        withdrawal = self.create(Transaction.KIND.withdrawal, S.pending_anchor)
+        items = [
+            {"id": "not-a-uuid", "expected_status": S.pending_anchor, "new_status": S.completed},
+            {"id": str(uuid.uuid4()), "expected_status": S.pending_anchor, "new_status": S.completed},
+            {"id": str(withdrawal.id), "expected_status": S.pending_anchor, "new_status": S.pending_external},
+            {"id": str(withdrawal.id), "expected_status": S.pending_anchor, "new_status": S.completed},
+        ]
+
+        results = apply_status_updates(items, max_batch=10)
+
+        self.assertEqual([r["result"] for r in results], ["invalid", "not_found", "updated", "invalid"])
+        self.assertEqual(self.status_of(withdrawal), S.pending_external)
+
+    def test_rejects_oversized_batch(self):
+        with self.assertRaises(StatusUpdateError):
+            apply_status_updates([{}, {}], max_batch=1)
@@ -0,0 +1,80 @@
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import jwt
+import polaris.sep10.utils
+from django.test import RequestFactory, SimpleTestCase
+from polaris import settings as polaris_settings
+from stellar_sdk import Keypair
+
+from anchor import tokens
+from anchor.tokens import TokenCache
+
+
+def make_token(expires_in: int = 3600) -> str:
+    now = int(time.time())
+    claims = {
+        "iss": "https://anchor.example/auth",
+        "sub": Keypair.random().public_key,
+        "iat": now,
+        "exp": now + expires_in,
+    }
+    return jwt.encode(claims, polaris_settings.SERVER_JWT_KEY, algorithm="HS256")
+
+
+class TokenCacheTests(SimpleTestCase):
+    def test_caches_verified_token(self):
+        cache = TokenCache(10)
+        token = make_token()
+
+        verified = cache.verify(token)
+
+        self.assertIs(cache.verify(token), verified)
+
+    def test_expired_token_rejected_while_cached(self):
+        cache = TokenCache(10)
+        token = make_token(expires_in=-60)
+        # As if it had been verified before it expired
+        cache._entries[cache._key(token)] = SimpleNamespace(payload={"exp": time.time() - 60})
+
+        self.assertIsNone(cache.get(token))
+        with self.assertRaises(ValueError):
+            cache.verify(token)
+
+    def test_not_reused_after_key_rotation(self):
+        cache = TokenCache(10)
+        token = make_token()
+        cache.verify(token)
+
+        with mock.patch.object(polaris_settings, "SERVER_JWT_KEY", "rotated-key"):
+            self.assertIsNone(cache.get(token))
+            with self.assertRaises(ValueError):
+                cache.verify(token)
+
+    def test_evicts_least_recently_used(self):
+        cache = TokenCache(2)
+        first, second, third = make_token(), make_token(), make_token()
+        cache.verify(first)
+        cache.verify(second)
+        cache.get(first)
+
+        cache.verify(third)
+
+        self.assertIsNotNone(cache.get(first))
+        self.assertIsNone(cache.get(second))
+        self.assertIsNotNone(cache.get(third))
+
+
+class InstallTests(SimpleTestCase):
+    def test_polaris_views_verify_through_the_cache(self):
+        self.assertIs(polaris.sep10.utils.validate_jwt_request, tokens.validate_jwt_request)
+
+        view = polaris.sep10.utils.validate_sep10_token()(lambda token, request: token)
+        encoded = make_token()
+        request = RequestFactory().get("/sep24/transaction", HTTP_AUTHORIZATION=f"Bearer {encoded}")
+        with mock.patch.object(tokens.token_cache, "verify", wraps=tokens.token_cache.verify) as verify:
+            token = view(request)
+
+        verify.assert_called_once_with(encoded)
+        self.assertIs(tokens.token_cache.get(encoded), token)
@@ -0,0 +1,102 @@
+"""
+Cache of verified SEP-10 tokens.
+
+Polaris verifies the JWT of every authenticated request (HS256 signature,
+JSON parsing and the Stellar address checks in ``SEP10Token``), and wallets
+poll with the same token many times a minute. ``install`` makes Polaris look
+tokens up in ``token_cache`` first, so each token is verified once per process
+until it expires or is evicted.
+
+Entries are keyed by a hash of the verification key and the token, so after
+``SERVER_JWT_KEY`` is rotated no token verified with the old key is found.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import polaris.sep10.utils
+from django.conf import settings
+from polaris import settings as polaris_settings
+from polaris.sep10.token import SEP10Token
+
+
+class TokenCache:
+    """Thread-safe LRU of verified ``SEP10Token`` objects, each kept until its ``exp``."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(f"{polaris_settings.SERVER_JWT_KEY}\0{token}".encode()).digest()
+
+    def get(self, token: str) -> Optional[SEP10Token]:
+        """The verified token for ``token`` if it was cached and has not expired."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.payload["exp"] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def verify(self, token: str) -> SEP10Token:
+        """
+        Return the verified token, from the cache or by verifying it.
+
+        Raises:
+            ValueError: if the token does not verify, as SEP10Token does
+        """
+        entry = self.get(token)
+        if entry is not None:
+            return entry
+        entry = SEP10Token(token)
+        if self.max_size > 0:
+            key = self._key(token)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.JWT_CACHE_SIZE)
+
+
+def validate_jwt_request(request) -> SEP10Token:
+    """``polaris.sep10.utils.validate_jwt_request``, verifying through ``token_cache``."""
+    jwt_header = request.headers.get("Authorization")
+    if not jwt_header:
+        raise ValueError("JWT must be passed as 'Authorization' header")
+    bad_format_error = ValueError("'Authorization' header must be formatted as 'Bearer <token>'")
+    if "Bearer" not in jwt_header:
+        raise bad_format_error
+    try:
+        encoded_jwt = jwt_header.split(" ")[1]
+    except IndexError:
+        raise bad_format_error
+    if not encoded_jwt:
+        raise bad_format_error
+
+    try:
+        return token_cache.verify(encoded_jwt)
+    except ValueError as e:
+        raise ValueError(f"SEP-10 token error: {str(e)}")
+
+
+def install():
+    """Make every ``@validate_sep10_token`` view verify through ``token_cache``."""
+    polaris.sep10.utils.validate_jwt_request = validate_jwt_request
@@ -0,0 +1,172 @@
+"""
+Request traces for load testing: sanitized capture of production SEP-10 and
+SEP-24 traffic (``TraceCaptureMiddleware``) and the pieces ``manage.py
+replay_traces`` needs to play it back locally.
+
+A trace is JSONL, one request per line::
+
+    {"t": 1718000000.123, "method": "GET", "path": "/sep24/transaction",
+     "query": {"id": "..."}, "token": "a1b2c3d4", "token_valid": true,
+     "language": "en", "content_type": "", "body": null, "status": 200,
+     "duration_ms": 12.5}
+
+Nothing that authenticates a user or identifies their bank account is
+written. Bearer tokens are replaced by a short salted hash, so replay can
+tell which requests shared a session, and whether they verified. Stellar addresses are pseudonymized
+the same way. Values of sensitive fields (``TRACE_REDACTED_FIELDS``) are
+replaced by "[redacted]".
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+from django.conf import settings
+from stellar_sdk.client.base_sync_client import BaseSyncClient
+from stellar_sdk.client.response import Response
+
+from .tokens import token_cache
+
+REDACTED = "[redacted]"
+
+
+def _alias(value: str) -> str:
+    return hashlib.sha256(f"{settings.SECRET_KEY}\0{value}".encode()).hexdigest()[:12]
+
+
+def _is_stellar_address(value: str) -> bool:
+    return len(value) in (56, 69) and value[0] in "GM" and value.isalnum() and value.isupper()
+
+
+def sanitize(value, key: str = ""):
+    """Copy of ``value`` (parsed JSON or form data) with sensitive fields redacted."""
+    if key.lower() in settings.TRACE_REDACTED_FIELDS:
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: sanitize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize(v, key) for v in value]
+    if isinstance(value, str) and _is_stellar_address(value):
+        return f"{value[0]}:{_alias(value)}"
+    return value
+
+
+def _token_valid(token: str) -> bool:
+    try:
+        token_cache.verify(token)
+    except ValueError:
+        return False
+    return True
+
+
+def trace_record(request, response, started: float, duration: float) -> Dict:
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    token = header[7:] if header.startswith("Bearer ") else None
+    body = None
+    if request.method in ("POST", "PUT", "PATCH"):
+        content_type = request.content_type or ""
+        try:
+            if content_type == "application/json":
+                body = sanitize(json.loads(request.body or b"null"))
+            elif content_type in ("application/x-www-form-urlencoded", "multipart/form-data"):
+                body = sanitize({k: v for k, v in request.POST.items() if k != "csrfmiddlewaretoken"})
+        except ValueError:
+            body = REDACTED
+    return {
+        "t": round(started, 3),
+        "method": request.method,
+        "path": request.path,
+        "query": sanitize(dict(request.GET.items())),
+        "token": _alias(token) if token else None,
+        "token_valid": _token_valid(token) if token else None,
+        "language": request.META.get("HTTP_ACCEPT_LANGUAGE", ""),
+        "content_type": request.content_type if body is not None else "",
+        "body": body,
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 2),
+    }
+
+
+class TraceWriter:
+    """Appends trace records to a JSONL file, one line per write."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def read_trace(path: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class StubHorizonClient(BaseSyncClient):
+    """
+    Horizon stand-in for replays: every account exists with plenty of every
+    anchored asset, every submission succeeds, and nothing is found on the
+    ledger. ``latency`` seconds are added to each call to mimic the network.
+    """
+
+    def __init__(self, balances: Dict[str, str], latency: float = 0.0):
+        self.balances = balances
+        self.latency = latency
+        self.sequence = 1000
+
+    def _response(self, url: str, status: int, body: Optional[Dict]) -> Response:
+        if self.latency:
+            time.sleep(self.latency)
+        return Response(status, json.dumps(body or {"status": status}), {}, url)
+
+    def get(self, url: str, params: Dict[str, str] = None) -> Response:
+        parts = urlparse(url).path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "accounts":
+            balances = [{"asset_type": "native", "balance": "10000.0000000"}] + [
+                {
+                    "asset_type": "credit_alphanum4",
+                    "asset_code": asset.split(":")[0],
+                    "asset_issuer": asset.split(":")[1],
+                    "balance": amount,
+                    "is_authorized": True,
+                }
+                for asset, amount in self.balances.items()
+            ]
+            account = {
+                "id": parts[1],
+                "account_id": parts[1],
+                "sequence": str(self.sequence),
+                "balances": balances,
+                "signers": [{"key": parts[1], "weight": 1, "type": "ed25519_public_key"}],
+                "thresholds": {"low_threshold": 0, "med_threshold": 0, "high_threshold": 0},
+            }
+            return self._response(url, 200, account)
+        if parts == ["ledgers"]:
+            ledger = {
+                "sequence": self.sequence,
+                "closed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "base_fee_in_stroops": 100,
+            }
+            return self._response(url, 200, {"_embedded": {"records": [ledger]}})
+        if parts == ["fee_stats"]:
+            fee_charged = dict.fromkeys(["min", "mode", "max"] + [f"p{p}" for p in (*range(10, 100, 10), 95, 99)], "100")
+            return self._response(url, 200, {"last_ledger_base_fee": "100", "fee_charged": fee_charged})
+        return self._response(url, 404, None)
+
+    def post(self, url: str, data: Dict[str, str] = None, json_data: Dict = None) -> Response:
+        self.sequence += 1
+        return self._response(url, 200, {"hash": "0" * 64, "successful": True})
+
+    def stream(self, url: str, params: Dict[str, str] = None):
+        raise NotImplementedError("streaming is not stubbed")
+
+    def close(self):
+        pass
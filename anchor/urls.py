@@ -19,8 +19,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 
+from anchor import views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('internal/transactions/status', views.update_statuses),
     path("", include(polaris.urls)),
 ]
 
@@ -0,0 +1,42 @@
+import hmac
+import json
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .integrations.status_updates import StatusUpdateError, apply_status_updates
+
+
+def _internal_token_ok(request) -> bool:
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    return header.startswith("Bearer ") and hmac.compare_digest(header[7:], settings.INTERNAL_API_TOKEN)
+
+
+@csrf_exempt
+@require_POST
+def update_statuses(request):
+    """
+    Batch status updates from the fiat backend.
+
+    POST {"updates": [{"id", "expected_status", "new_status",
+    "external_transaction_id"?, "message"?}, ...]} with
+    ``Authorization: Bearer <INTERNAL_API_TOKEN>``. Responds with
+    {"results": [...]}, one per update (see apply_status_updates).
+    """
+    if not settings.INTERNAL_API_TOKEN:
+        raise Http404()
+    if not _internal_token_ok(request):
+        return JsonResponse({"error": "invalid token"}, status=401)
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "invalid JSON body"}, status=400)
+    try:
+        results = apply_status_updates(
+            body.get("updates") if isinstance(body, dict) else None, settings.INTERNAL_API_MAX_BATCH
+        )
+    except StatusUpdateError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({"results": results})
@@ -0,0 +1,55 @@
+"""
+Benchmark the fast-lane middleware stack (anchor.middleware.FastLaneMiddleware).
+
+Sends the same GET through the full MIDDLEWARE stack and through the
+FAST_LANE_MIDDLEWARE stack, in process with Django's test client, and prints
+the mean time per request for each. Run it against a replica or a copy of the
+database: the views run for real.
+
+Usage:
+    python scripts/bench_middleware.py [PATH] [REQUESTS]
+
+Example:
+    python scripts/bench_middleware.py /sep24/info 5000
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "anchor.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+
+def bench(path: str, requests: int, fast: bool):
+    """Mean seconds per request for ``path`` with the fast lane on or off, and the status code."""
+    with override_settings(FAST_LANE_PATHS=[path] if fast else []):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        status = client.get(path).status_code  # builds the middleware chain
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(path)
+        return (time.perf_counter() - started) / requests, status
+
+
+def main(argv):
+    path = argv[0] if argv else "/sep24/info"
+    requests = int(argv[1]) if len(argv) > 1 else 2000
+
+    full, status = bench(path, requests, fast=False)
+    fast, _ = bench(path, requests, fast=True)
+    print(f"GET {path} (HTTP {status}), {requests} requests")
+    print(f"  Full stack: {full * 1e6:8.1f} us/request")
+    print(f"  Fast lane:  {fast * 1e6:8.1f} us/request")
+    print(f"  Saving:     {(full - fast) * 1e6:8.1f} us/request ({(full - fast) / full:.0%})")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,47 @@
+"""
+Client for the ops shell (`python manage.py ops_shell`).
+
+Runs management commands in the already booted ops shell instead of starting
+Django for each one. Only the standard library is imported, so a call costs a
+socket round trip.
+
+Usage:
+    python scripts/ops.py complete_deposit <transaction_id>
+    python scripts/ops.py - < commands.txt    (one command line per line)
+
+The socket path comes from OPS_SHELL_SOCKET (default data/ops.sock). The exit
+status is 1 if any command failed.
+"""
+
+import json
+import os
+import shlex
+import socket
+import sys
+
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ops.sock")
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 2
+    if argv == ["-"]:
+        commands = [shlex.split(line) for line in sys.stdin if line.strip() and not line.startswith("#")]
+    else:
+        commands = [argv]
+
+    status = 0
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(os.environ.get("OPS_SHELL_SOCKET", DEFAULT_SOCKET))
+        replies = sock.makefile("rb")
+        for command in commands:
+            sock.sendall(json.dumps(command).encode() + b"\n")
+            reply = json.loads(replies.readline())
+            sys.stdout.write(reply["output"])
+            status = max(status, reply["status"])
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))